@@ -0,0 +1,353 @@
+"""Bulk-load users (and their profiles) from CSV, NDJSON or a synthetic generator.
+
+Bypasses the signup path entirely: rows are streamed in batches, passwords are
+hashed in a process pool while the previous batch is being written, and each
+batch is loaded with COPY on Postgres or a batched executemany elsewhere. Memory
+stays at roughly two batches no matter how large the input is.
+
+Input columns (CSV header or NDJSON keys):
+    email (required), password or hashed_password (one required), username,
+    first_name, last_name, phone, is_client, is_active, is_verified, and the
+    profile fields bio, skills, profile_image, street, city, state, country, zip,
+    website, linkedin, github, twitter. A profile row is written when any
+    profile field is set, and its skills are linked in user_skills for search.
+    username defaults to the email's local part and must be unique, like email
+    and phone; a duplicate aborts the import at its batch (earlier batches stay
+    committed).
+
+Usage:
+    python -m app.cli.bulk_import users.csv
+    python -m app.cli.bulk_import users.ndjson [--batch 5000] [--workers 8]
+    python -m app.cli.bulk_import --synthetic 1000000 [--start 0] [--password Benchmark1!]
+        [--bcrypt-rounds 4] [--reuse-hash]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from ..core.database import engine
+from ..core.migrations import upgrade_to_head
+from ..core.passwords import configured_policy, crypt_context
+from ..models.skill import UserSkill
+from ..models.user import User, UserProfile
+from ..services.skills import ensure_skill_ids, parse_skills
+from ..services.usernames import username_base_from_email
+
+SEED = 1337
+USER_FIELDS = (
+    "id", "username", "email", "hashed_password", "first_name", "last_name", "phone",
+    "is_active", "is_verified", "profile_completed", "is_client",
+)
+PROFILE_FIELDS = (
+    "bio", "skills", "profile_image", "street", "city", "state", "country", "zip",
+    "website", "linkedin", "github", "twitter",
+)
+TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+
+SKILLS = [
+    "python", "django", "fastapi", "react", "vue", "node", "typescript", "go", "rust", "java",
+    "kotlin", "swift", "flutter", "sql", "postgres", "aws", "docker", "kubernetes", "figma",
+    "photoshop", "illustrator", "copywriting", "seo", "translation", "video-editing", "data-entry",
+]
+CITIES = [
+    ("Kathmandu", "Nepal"), ("Pokhara", "Nepal"), ("Lalitpur", "Nepal"), ("Biratnagar", "Nepal"),
+    ("Delhi", "India"), ("Bengaluru", "India"), ("Dhaka", "Bangladesh"), ("London", "United Kingdom"),
+]
+
+
+# Sources: each yields plain dicts in the input format described above
+
+def read_csv(path: str) -> Iterator[dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield {key: value for key, value in row.items() if value not in (None, "")}
+
+def read_ndjson(path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise SystemExit(f"{path}:{line_number}: invalid JSON ({e})")
+
+def synthetic(count: int, start: int = 0, password: str = "Benchmark1!") -> Iterator[dict]:
+    """user{start}..user{start+count-1}; the same index always produces the same row"""
+    for i in range(start, start + count):
+        rng = random.Random(SEED * 1_000_003 + i)
+        city, country = rng.choice(CITIES)
+        yield {
+            "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+            "username": f"user{i}",
+            "email": f"user{i}@example.com",
+            "password": password,
+            "first_name": f"First{i}",
+            "last_name": f"Last{i}",
+            "phone": f"+977{9800000000 + i}",
+            "is_client": i % 3 == 0,
+            "bio": f"Hi, I'm First{i}.",
+            "skills": ",".join(rng.sample(SKILLS, rng.randint(1, 6))),
+            "city": city,
+            "country": country,
+        }
+
+
+# Row preparation
+
+def _flag(value, default: bool) -> bool:
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+def prepare(record: dict, hashed_password: str) -> tuple:
+    """(user row, profile row or None) ready for insertion"""
+    email = record["email"].strip().lower()
+    user = {
+        "id": record.get("id") or uuid.uuid4(),
+        "username": record.get("username") or username_base_from_email(email),
+        "email": email,
+        "hashed_password": hashed_password,
+        "first_name": record.get("first_name"),
+        "last_name": record.get("last_name"),
+        "phone": record.get("phone"),
+        # Imported accounts are treated as already having confirmed their email
+        "is_active": _flag(record.get("is_active"), True),
+        "is_verified": _flag(record.get("is_verified"), False),
+        "is_client": _flag(record.get("is_client"), False),
+    }
+    if isinstance(user["id"], str):
+        user["id"] = uuid.UUID(user["id"])
+
+    profile = {field: record[field] for field in PROFILE_FIELDS if record.get(field) not in (None, "")}
+    user["profile_completed"] = bool(profile)
+    if not profile:
+        return user, None
+    profile["id"] = uuid.uuid4()
+    profile["user_id"] = user["id"]
+    return user, profile
+
+
+# Hashing: module-level so the process pool can pickle it
+
+def hash_passwords(passwords: List[str], rounds: Optional[int]) -> List[str]:
+    policy = configured_policy()
+    if rounds:
+        # Cheap bcrypt for fixtures; real logins upgrade these hashes in the background
+        policy = policy._replace(scheme="bcrypt", bcrypt_rounds=rounds)
+    context = crypt_context(policy)
+    return [context.hash(password) for password in passwords]
+
+
+class Hasher:
+    """Hashes batches of passwords on a process pool without blocking the loader"""
+
+    def __init__(self, workers: int, rounds: Optional[int], reuse_hash: bool):
+        self.workers = workers
+        self.rounds = rounds
+        self.reuse_hash = reuse_hash
+        self._known: Dict[str, str] = {}
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+
+    def submit(self, records: List[dict]) -> List:
+        """Per record: a hash string, or a (future, index) pair to resolve later"""
+        results, pending = [], []
+        for record in records:
+            if record.get("hashed_password"):
+                results.append(record["hashed_password"])
+            elif "password" not in record:
+                raise SystemExit(f"row for {record.get('email')!r} has neither password nor hashed_password")
+            elif self.reuse_hash and record["password"] in self._known:
+                results.append(self._known[record["password"]])
+            else:
+                results.append(None)
+                pending.append((len(results) - 1, record["password"]))
+
+        if self.reuse_hash:
+            # Hash each distinct password once (the first batch pays for it)
+            distinct = sorted({password for _, password in pending})
+            for password, hashed in zip(distinct, hash_passwords(distinct, self.rounds)):
+                self._known[password] = hashed
+            for index, password in pending:
+                results[index] = self._known[password]
+            return results
+
+        # Split the batch into one chunk per worker
+        size = max(1, -(-len(pending) // self.workers))
+        for offset in range(0, len(pending), size):
+            chunk = pending[offset:offset + size]
+            future = self._executor.submit(hash_passwords, [password for _, password in chunk], self.rounds)
+            for position, (index, _) in enumerate(chunk):
+                results[index] = (future, position)
+        return results
+
+    @staticmethod
+    def resolve(results: List) -> List[str]:
+        return [
+            item if isinstance(item, str) else item[0].result()[item[1]]
+            for item in results
+        ]
+
+    def close(self):
+        self._executor.shutdown()
+
+
+# Loaders
+
+def _copy_value(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value)
+
+def _copy_rows(cursor, table: str, fields, rows: List[dict]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # csv writes None as an empty unquoted field, which COPY ... CSV reads as NULL
+        writer.writerow([_copy_value(row.get(field)) for field in fields])
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(fields)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+def load_batch_copy(users: List[dict], profiles: List[dict], user_skills: List[dict]):
+    """Postgres: one COPY stream per table in one transaction"""
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        _copy_rows(cursor, User.__tablename__, USER_FIELDS, users)
+        if profiles:
+            _copy_rows(cursor, UserProfile.__tablename__, ("id", "user_id") + PROFILE_FIELDS, profiles)
+        if user_skills:
+            _copy_rows(cursor, UserSkill.__tablename__, ("skill_id", "user_id"), user_skills)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+def load_batch_executemany(users: List[dict], profiles: List[dict], user_skills: List[dict]):
+    """Everything else: one executemany per table in one transaction"""
+    # executemany needs the same keys in every row
+    profiles = [{field: profile.get(field) for field in ("id", "user_id") + PROFILE_FIELDS} for profile in profiles]
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), users)
+        if profiles:
+            conn.execute(insert(UserProfile.__table__), profiles)
+        if user_skills:
+            conn.execute(insert(UserSkill.__table__), user_skills)
+
+
+def batches(records: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    iterator = iter(records)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def run(records: Iterable[dict], batch_size: int, hasher: Hasher, report_every: float = 5.0) -> int:
+    """Load every record; returns the number of users written"""
+    load = load_batch_copy if engine.dialect.name == "postgresql" else load_batch_executemany
+    started = last_report = time.perf_counter()
+    loaded = 0
+    skill_ids: Dict[str, int] = {}
+
+    # Hash batch N+1 in the pool while batch N is written
+    pending = None
+    for batch in batches(records, batch_size):
+        submitted = (batch, hasher.submit(batch))
+        if pending is not None:
+            loaded += _write(load, *pending, skill_ids)
+        pending = submitted
+
+        now = time.perf_counter()
+        if now - last_report >= report_every:
+            print(f"{loaded} users ({loaded / (now - started):.0f} rows/s)", file=sys.stderr)
+            last_report = now
+    if pending is not None:
+        loaded += _write(load, *pending, skill_ids)
+
+    duration = time.perf_counter() - started
+    print(f"imported {loaded} users in {duration:.1f} s ({loaded / duration if duration else 0:.0f} rows/s)")
+    return loaded
+
+def _write(load, records: List[dict], hashes: List, skill_ids: Dict[str, int]) -> int:
+    users, profiles, links = [], [], []
+    for record, hashed_password in zip(records, Hasher.resolve(hashes)):
+        user, profile = prepare(record, hashed_password)
+        users.append(user)
+        if profile is not None:
+            profiles.append(profile)
+            links.extend((user["id"], name) for name in parse_skills(profile.get("skills")))
+
+    # Skills are shared between batches, so they are created (and committed) up front
+    new = {name for _, name in links} - skill_ids.keys()
+    if new:
+        with engine.begin() as conn:
+            skill_ids.update(ensure_skill_ids(conn, new))
+    user_skills = [{"skill_id": skill_ids[name], "user_id": user_id} for user_id, name in links]
+
+    try:
+        load(users, profiles, user_skills)
+    except (IntegrityError, engine.dialect.loaded_dbapi.IntegrityError) as e:
+        # COPY goes through the raw DBAPI connection, so its errors aren't wrapped
+        raise SystemExit(f"batch starting at {users[0]['email']} was rejected: {getattr(e, 'orig', e)}")
+    return len(users)
+
+
+def open_source(args) -> Iterable[dict]:
+    if args.synthetic is not None:
+        return synthetic(args.synthetic, args.start, args.password)
+    if args.path is None:
+        raise SystemExit("give an input file or --synthetic N")
+    extension = os.path.splitext(args.path)[1].lower()
+    if args.format == "csv" or (args.format is None and extension == ".csv"):
+        return read_csv(args.path)
+    if args.format == "ndjson" or (args.format is None and extension in (".ndjson", ".jsonl")):
+        return read_ndjson(args.path)
+    raise SystemExit(f"can't tell the format of {args.path}; pass --format csv or --format ndjson")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", help="CSV or NDJSON file")
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="Defaults to the file extension")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="Generate N users instead of reading a file")
+    parser.add_argument("--start", type=int, default=0, help="First synthetic user index")
+    parser.add_argument("--password", default="Benchmark1!", help="Synthetic users' password")
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Hashing processes")
+    parser.add_argument("--bcrypt-rounds", type=int,
+                        help="Cheap bcrypt hashes for test data; logins still verify and upgrade them")
+    parser.add_argument("--reuse-hash", action="store_true",
+                        help="Hash each distinct password once and share the hash between rows "
+                             "(for synthetic data; keeps one hash per distinct password in memory)")
+    parser.add_argument("--no-migrate", dest="migrate", action="store_false",
+                        help="Don't run alembic upgrade head first")
+    args = parser.parse_args()
+
+    records = open_source(args)
+    if args.migrate:
+        upgrade_to_head()
+    hasher = Hasher(args.workers, args.bcrypt_rounds, args.reuse_hash)
+    try:
+        run(records, args.batch, hasher)
+    finally:
+        hasher.close()
+
+
+if __name__ == "__main__":
+    main()
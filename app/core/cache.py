@@ -0,0 +1,158 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from .config import settings
+
+
+class CacheBackend:
+    """Async key/value cache interface; values must be JSON-serializable"""
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """In-process cache with per-entry TTL and LRU eviction"""
+
+    def __init__(self, max_entries: int = 10000, default_ttl: float = 60):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.default_ttl)
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+
+class RedisCache(CacheBackend):
+    """Cache backed by any redis.asyncio-compatible client"""
+
+    def __init__(self, client, prefix: str = "lanceraa:", default_ttl: float = 60):
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.default_ttl
+        # Redis expiries are whole milliseconds and must be positive
+        await self.client.set(self.prefix + key, json.dumps(value), px=max(int(ttl * 1000), 1))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for redis.asyncio.Redis (get/set/delete/incr/eval)"""
+
+    # No Lua here: callers register a Python equivalent for each script they run,
+    # called as fn(client, keys, args)
+    scripts: Dict[str, Callable] = {}
+
+    def __init__(self):
+        self._data = {}
+
+    def _alive(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    async def get(self, key):
+        entry = self._alive(key)
+        return entry[0] if entry else None
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and self._alive(key):
+            return None
+        if isinstance(value, str):
+            value = value.encode()
+        expires_at = None
+        if px is not None:
+            expires_at = time.monotonic() + px / 1000
+        elif ex is not None:
+            expires_at = time.monotonic() + ex
+        self._data[key] = (value, expires_at)
+        return True
+
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._data.pop(key, None) is not None:
+                removed += 1
+        return removed
+
+    async def incr(self, key):
+        entry = self._alive(key)
+        value = int(entry[0]) + 1 if entry else 1
+        self._data[key] = (str(value).encode(), entry[1] if entry else None)
+        return value
+
+    async def eval(self, script, numkeys, *keys_and_args):
+        return self.scripts[script](self, list(keys_and_args[:numkeys]), list(keys_and_args[numkeys:]))
+
+    async def flushdb(self):
+        self._data.clear()
+
+
+def create_cache(backend: str = "memory") -> CacheBackend:
+    """Build the cache backend named by settings.CACHE_BACKEND"""
+    if backend == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        return RedisCache(redis.from_url(settings.REDIS_URL))
+
+    if backend == "fakeredis":
+        return RedisCache(FakeRedis())
+
+    return MemoryCache(max_entries=settings.CACHE_MAX_ENTRIES)
+
+
+cache = create_cache(settings.CACHE_BACKEND)
@@ -1,10 +1,12 @@
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
+import logging
 import os
 from dotenv import load_dotenv
+from functools import lru_cache
 from typing import List
 
-# Load environment variables
+# Load .env once, here: the os.getenv defaults below read it (other modules use `settings`)
 load_dotenv()
 
 class Settings(BaseSettings):
@@ -13,7 +15,16 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api"
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # Access tokens are checked without the database, so they are kept short; clients
+    # renew them at /auth/refresh with a single-use refresh token
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+    # Each process re-reads new revocations at this interval, so a logout takes up to this
+    # long to reach the other processes (immediate in the one that handled it)
+    REVOCATION_SYNC_SECONDS: float = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+    # Sizing of the in-memory Bloom filter in front of the exact revocation set
+    REVOCATION_BLOOM_CAPACITY: int = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+    REVOCATION_BLOOM_ERROR_RATE: float = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.001"))
     
     # CORS settings
     ALLOWED_ORIGINS_STR: str = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://localhost:8000,https://abhinavgyawali07.pythonanywhere.com")
@@ -23,6 +34,21 @@ class Settings(BaseSettings):
     
     # Database settings
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./lanceraa.db")
+    # Async driver URL used by the routes; derived from DATABASE_URL when unset
+    # (postgresql -> postgresql+asyncpg, sqlite -> sqlite+aiosqlite)
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    # Schema migrations: run `alembic upgrade head` on startup (handy for local SQLite),
+    # otherwise only compare the stored revision with the head ("warn", "error" or "off")
+    DATABASE_AUTO_MIGRATE: bool = os.getenv("DATABASE_AUTO_MIGRATE", "False").lower() == "true"
+    DATABASE_MIGRATION_CHECK: str = os.getenv("DATABASE_MIGRATION_CHECK", "warn")
+
+    # Comma-separated read replica URLs; read-only routes use them when set
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_CHECK_SECONDS: float = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+    # Replicas further behind than this are taken out of rotation until they catch up
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    # After a client's write, its reads stay on the primary for this long
+    READ_YOUR_WRITES_SECONDS: float = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
 
     # Email settings
     EMAIL_HOST: str = os.getenv("EMAIL_HOST", "smtp.gmail.com")
@@ -31,16 +57,123 @@ class Settings(BaseSettings):
     EMAIL_PASSWORD: str = os.getenv("EMAIL_PASSWORD", "your-app-password")
     EMAIL_FROM: str = os.getenv("EMAIL_FROM", "Lanceraa <your-email@gmail.com>")
     SUPPORT_EMAIL: str = os.getenv("SUPPORT_EMAIL", "support@lanceraa.com")
+    # Disable STARTTLS/AUTH to talk to a local SMTP stand-in such as aiosmtpd
+    EMAIL_USE_STARTTLS: bool = os.getenv("EMAIL_USE_STARTTLS", "True").lower() == "true"
+    EMAIL_USE_AUTH: bool = os.getenv("EMAIL_USE_AUTH", "True").lower() == "true"
+    EMAIL_TIMEOUT_SECONDS: int = int(os.getenv("EMAIL_TIMEOUT_SECONDS", "30"))
+    # Compiled template cache (defaults to the system temp dir) and optional text/plain part
+    EMAIL_TEMPLATE_CACHE_DIR: str = os.getenv("EMAIL_TEMPLATE_CACHE_DIR", "")
+    EMAIL_PLAIN_TEXT_PART: bool = os.getenv("EMAIL_PLAIN_TEXT_PART", "False").lower() == "true"
+    # Persistent SMTP connections kept open by EmailClient
+    EMAIL_POOL_SIZE: int = int(os.getenv("EMAIL_POOL_SIZE", "3"))
+    EMAIL_POOL_HEALTH_CHECK_SECONDS: float = float(os.getenv("EMAIL_POOL_HEALTH_CHECK_SECONDS", "30"))
 
     # For testing: if True, prints emails to console instead of sending
     EMAIL_TEST_MODE: bool = os.getenv("EMAIL_TEST_MODE", "False").lower() == "true"
+
+    # Email outbox dispatcher
+    EMAIL_OUTBOX_ENABLED: bool = os.getenv("EMAIL_OUTBOX_ENABLED", "True").lower() == "true"
+    EMAIL_OUTBOX_CONCURRENCY: int = int(os.getenv("EMAIL_OUTBOX_CONCURRENCY", "4"))
+    EMAIL_OUTBOX_BATCH_SIZE: int = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+    EMAIL_OUTBOX_POLL_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+    EMAIL_OUTBOX_BACKOFF_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "30"))
+    EMAIL_OUTBOX_BACKOFF_MAX_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+    # Sent and dead-lettered rows are deleted this long after they were queued
+    EMAIL_OUTBOX_RETENTION_DAYS: float = float(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", "7"))
+    EMAIL_OUTBOX_PURGE_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_PURGE_SECONDS", "3600"))
+
+    # Logging: "json" lines or the classic "text" format; LOG_FILE="" logs to stderr only
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "DEBUG")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    LOG_FILE: str = os.getenv("LOG_FILE", "logs/app.log")
+    # Keep a fraction of sub-WARNING records per logger, e.g. "lanceraa.auth=0.1"
+    LOG_SAMPLING: str = os.getenv("LOG_SAMPLING", "")
+
+    # Request/DB/email timing middleware and the Prometheus /metrics endpoint
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # SQL audit: "off", "dev" (every request) or "sampled" (SQL_AUDIT_SAMPLE_RATE of requests)
+    SQL_AUDIT_MODE: str = os.getenv("SQL_AUDIT_MODE", "off")
+    SQL_AUDIT_SAMPLE_RATE: float = float(os.getenv("SQL_AUDIT_SAMPLE_RATE", "0.01"))
+    SQL_SLOW_QUERY_MS: float = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+    SQL_REPEAT_THRESHOLD: int = int(os.getenv("SQL_REPEAT_THRESHOLD", "2"))
+    # Fail requests that exceed their declared query_budget() (for test runs)
+    SQL_BUDGET_ENFORCE: bool = os.getenv("SQL_BUDGET_ENFORCE", "false").lower() == "true"
+
+    # Readiness checks are cached and refreshed in the background at this interval
+    HEALTH_CACHE_SECONDS: float = float(os.getenv("HEALTH_CACHE_SECONDS", "10"))
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "3"))
+
+    # Cache backend: "memory" (in-process), "redis" or "fakeredis" (in-memory Redis stand-in)
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # How long verified tokens and user snapshots are served from cache
+    AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+
+    # users.last_login is written behind: at most this many seconds late, or sooner once
+    # this many users logged in since the last write
+    LAST_LOGIN_FLUSH_SECONDS: float = float(os.getenv("LAST_LOGIN_FLUSH_SECONDS", "10"))
+    LAST_LOGIN_FLUSH_MAX_ENTRIES: int = int(os.getenv("LAST_LOGIN_FLUSH_MAX_ENTRIES", "1000"))
+
+    # One-time codes (email verification): "table", "memory" (single process only),
+    # "redis" or "fakeredis"; codes are stored as HMACs keyed by SECRET_KEY
+    OTP_BACKEND: str = os.getenv("OTP_BACKEND", "table")
+    OTP_TTL_SECONDS: int = int(os.getenv("OTP_TTL_SECONDS", "1800"))
+    # Wrong guesses allowed before the code is burned and a new one must be requested
+    OTP_MAX_ATTEMPTS: int = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+    # Expired codes are deleted in bulk at this interval (Redis expires them itself)
+    OTP_PURGE_SECONDS: float = float(os.getenv("OTP_PURGE_SECONDS", "600"))
+
+    # Freelancer search facet counts are cached per filter set for this long
+    SEARCH_FACET_CACHE_SECONDS: int = int(os.getenv("SEARCH_FACET_CACHE_SECONDS", "300"))
+
+    # Uploaded media: "local" (files under STORAGE_LOCAL_DIR), "s3" (needs boto3; any
+    # S3-compatible endpoint, e.g. MinIO via S3_ENDPOINT_URL) or "fakes3" (in-process)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    STORAGE_LOCAL_DIR: str = os.getenv("STORAGE_LOCAL_DIR", "media")
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "")
+    S3_PREFIX: str = os.getenv("S3_PREFIX", "")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")
+    S3_REGION: str = os.getenv("S3_REGION", "")
+    # Public base URL of the stored objects (a CDN or the bucket); empty serves them
+    # through the API at /media
+    MEDIA_BASE_URL: str = os.getenv("MEDIA_BASE_URL", "")
+
+    # Profile images: upload limits, square thumbnail edge lengths, and the process
+    # pool that decodes and resizes them
+    IMAGE_MAX_BYTES: int = int(os.getenv("IMAGE_MAX_BYTES", str(5 * 1024 * 1024)))
+    IMAGE_MAX_PIXELS: int = int(os.getenv("IMAGE_MAX_PIXELS", str(40_000_000)))
+    IMAGE_THUMBNAIL_SIZES_STR: str = os.getenv("IMAGE_THUMBNAIL_SIZES", "64,256,512")
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "2"))
+    IMAGE_MAX_QUEUE: int = int(os.getenv("IMAGE_MAX_QUEUE", "16"))
+
+    # Password hashing policy: "bcrypt" or "argon2" (argon2id, needs argon2-cffi). Stored
+    # hashes from another scheme or a lower cost are redone in the background on login
+    PASSWORD_HASH_SCHEME: str = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt")
+    PASSWORD_BCRYPT_ROUNDS: int = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+    PASSWORD_ARGON2_TIME_COST: int = int(os.getenv("PASSWORD_ARGON2_TIME_COST", "3"))
+    PASSWORD_ARGON2_MEMORY_KIB: int = int(os.getenv("PASSWORD_ARGON2_MEMORY_KIB", "65536"))
+    PASSWORD_ARGON2_PARALLELISM: int = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", "2"))
+    # Measure this host at startup and pick the cost (bcrypt rounds / argon2 passes) that
+    # hashes in about PASSWORD_HASH_TARGET_MS; `python -m app.core.passwords` does it offline
+    PASSWORD_HASH_CALIBRATE: bool = os.getenv("PASSWORD_HASH_CALIBRATE", "False").lower() == "true"
+    PASSWORD_HASH_TARGET_MS: float = float(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))
+    PASSWORD_REHASH_ON_LOGIN: bool = os.getenv("PASSWORD_REHASH_ON_LOGIN", "True").lower() == "true"
+
+    # Password hashing worker pool ("thread" or "process")
+    PASSWORD_HASH_EXECUTOR: str = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+    # Max hash jobs allowed to wait for a free worker before we shed load with 503
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
     
     # New validation using Pydantic v2 syntax
     @field_validator("EMAIL_USERNAME", "EMAIL_PASSWORD")
     @classmethod
     def validate_email_credentials(cls, v, info):
         if not v:
-            print(f"Warning: {info.field_name} not set")
+            logging.getLogger("lanceraa.config").warning("%s not set", info.field_name)
         return v
 
     # Configuration for Pydantic v2
@@ -54,8 +187,13 @@ class Settings(BaseSettings):
     def ALLOWED_ORIGINS(self) -> List[str]:
         return self.ALLOWED_ORIGINS_STR.split(",")
 
-# Create settings instance
-settings = Settings()
+    @property
+    def IMAGE_THUMBNAIL_SIZES(self) -> List[int]:
+        return sorted({int(size) for size in self.IMAGE_THUMBNAIL_SIZES_STR.split(",") if size.strip()})
+
+@lru_cache
+def get_settings() -> Settings:
+    """The process-wide settings, parsed once"""
+    return Settings()
 
-print(f"ALLOWED_ORIGINS: {settings.ALLOWED_ORIGINS}")
-print(f"ENVIRONMENT: {settings.ENVIRONMENT}")
+settings = get_settings()
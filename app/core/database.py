@@ -1,12 +1,12 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
 import os
 from .config import settings
-
-# Load environment variables
-load_dotenv()
+from .metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, instrument_engine
+from .sql_audit import audit_engine
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -29,8 +29,10 @@ engine = create_engine(
     max_overflow=20,  # Increased for peak loads
     pool_timeout=30,
     pool_recycle=1800,  # Recycle connections every 30 minutes
-    connect_args=connect_args
+    connect_args=connect_args,
+    poolclass=InstrumentedQueuePool,
 )
+instrument_engine(engine, "sync")
 
 # Create session with optimized settings
 SessionLocal = sessionmaker(
@@ -40,6 +42,52 @@ SessionLocal = sessionmaker(
     expire_on_commit=False  # Better performance for read-heavy operations
 )
 
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL onto the matching async driver"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+
+    if backend in ("postgresql", "postgres"):
+        # asyncpg doesn't understand libpq-only params such as Neon's sslmode/channel_binding
+        query = dict(url.query)
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode and "ssl" not in query:
+            query["ssl"] = sslmode
+        return url.set(drivername="postgresql+asyncpg", query=query).render_as_string(hide_password=False)
+
+    return url.render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or get_async_database_url(settings.DATABASE_URL)
+
+# Async engine used by the request handlers so DB round-trips don't block the event loop
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20,
+    pool_timeout=30,
+    pool_recycle=1800,
+    poolclass=InstrumentedAsyncQueuePool,
+)
+instrument_engine(async_engine.sync_engine, "async")
+
+# Per-request statement recording, only hooked up when auditing can be switched on
+if settings.SQL_AUDIT_MODE != "off" or settings.SQL_BUDGET_ENFORCE:
+    audit_engine(engine)
+    audit_engine(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 # Database dependency
@@ -48,4 +96,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Async database dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,14 +1,34 @@
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from jinja2 import Environment, FileSystemLoader
+import html
 import os
+import re
+import secrets
+import time
 from pathlib import Path
+from typing import Optional
 from ..core.config import settings
-import aiosmtplib
 import asyncio
 from email.utils import formatdate
 import datetime
+from .logging import get_logger
+from .metrics import email_send_duration
+
+logger = get_logger("email")
+
+
+def _now(fmt):
+    return datetime.datetime.now().strftime(fmt)
+
+def html_to_text_template(source: str) -> str:
+    """Derive a plain-text Jinja template from an HTML one, keeping {{ }} / {% %} intact"""
+    text = re.sub(r"(?is)<(head|style|script)\b.*?</\1>", "", source)
+    text = re.sub(r"(?i)<br\s*/?>", "\n", text)
+    text = re.sub(r"(?i)</(p|div|h[1-6]|li|tr|ul|ol)>", "\n", text)
+    text = re.sub(r"(?s)<[^>]+>", "", text)
+    text = html.unescape(text)
+    lines = [line.strip() for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip() + "\n"
 
 
 class EmailClient:
@@ -18,19 +38,73 @@ class EmailClient:
         self.smtp_server = settings.EMAIL_HOST
         self.smtp_port = settings.EMAIL_PORT
         self.templates_dir = os.path.join(Path(__file__).parent.parent, "templates", "email")
-        self.template_env = Environment(loader=FileSystemLoader(self.templates_dir))
-        
+        self._template_env = None
+        self._html_templates = {}
+        self._text_templates = {}
+        self._boundaries = {}
+        from .smtp_pool import SMTPPool
+        self.pool = SMTPPool(
+            hostname=self.smtp_server,
+            port=self.smtp_port,
+            username=self.sender_email if settings.EMAIL_USE_AUTH else None,
+            password=self.password if settings.EMAIL_USE_AUTH else None,
+            start_tls=settings.EMAIL_USE_STARTTLS,
+            size=settings.EMAIL_POOL_SIZE,
+            timeout=settings.EMAIL_TIMEOUT_SECONDS,
+            health_check_after=settings.EMAIL_POOL_HEALTH_CHECK_SECONDS,
+        )
+
+    @property
+    def template_env(self):
+        """Jinja environment, created (and jinja2 imported) on first render"""
+        if self._template_env is None:
+            from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+            # Templates never change at runtime: skip mtime checks and cache compiled bytecode on disk
+            bytecode_cache = (
+                FileSystemBytecodeCache(settings.EMAIL_TEMPLATE_CACHE_DIR)
+                if settings.EMAIL_TEMPLATE_CACHE_DIR else FileSystemBytecodeCache()
+            )
+            self._template_env = Environment(
+                loader=FileSystemLoader(self.templates_dir),
+                auto_reload=False,
+                bytecode_cache=bytecode_cache,
+                cache_size=-1,
+            )
+            self._template_env.globals["now"] = _now
+        return self._template_env
+
+    def warm_up(self):
+        """Compile every email template once, plus its plain-text counterpart"""
+        for filename in sorted(os.listdir(self.templates_dir)):
+            name, ext = os.path.splitext(filename)
+            if ext != ".html":
+                continue
+            self._html_templates[name] = self.template_env.get_template(filename)
+            # A fixed multipart boundary per template saves the generator from scanning
+            # the body with a freshly compiled regex for every message
+            self._boundaries[name] = f"===============lanceraa-{name}-{secrets.token_hex(8)}=="
+
+            if settings.EMAIL_PLAIN_TEXT_PART:
+                # A hand-written .txt template wins over one derived from the HTML
+                text_file = os.path.join(self.templates_dir, f"{name}.txt")
+                if os.path.exists(text_file):
+                    self._text_templates[name] = self.template_env.get_template(f"{name}.txt")
+                else:
+                    source = self.template_env.loader.get_source(self.template_env, filename)[0]
+                    self._text_templates[name] = self.template_env.from_string(html_to_text_template(source))
+        return list(self._html_templates)
+
     def render_template(self, template_name, **context):
         """Render an HTML template with the given context"""
         try:
-            # Add now function to context if not provided
-            if 'now' not in context:
-                context['now'] = lambda fmt: datetime.datetime.now().strftime(fmt)
-            
-            template = self.template_env.get_template(f"{template_name}.html")
+            template = self._html_templates.get(template_name)
+            if template is None:
+                template = self.template_env.get_template(f"{template_name}.html")
+                self._html_templates[template_name] = template
             return template.render(**context)
         except Exception as e:
-            print(f"Template rendering error: {str(e)}")
+            logger.exception("Template rendering error in %s: %s", template_name, e)
             # Fallback to a simple template
             if template_name == "verification_code":
                 return f"""
@@ -55,46 +129,58 @@ class EmailClient:
                 </html>
                 """
         
-    async def send_email_async(self, to_email, subject, template_name, **context):
-        """Send an email asynchronously"""
-        try:
-            # Existing code for template rendering...
-            html_content = self.render_template(template_name, **context)
+    def build_message(self, to_email, subject, template_name, **context):
+        """Render a template into a ready-to-send MIME message"""
+        html_content = self.render_template(template_name, **context)
 
+        text_content = None
+        text_template = self._text_templates.get(template_name)
+        if text_template is not None:
+            text_content = re.sub(r"\n{3,}", "\n\n", text_template.render(**context))
 
-            # Create the email message
-            message = MIMEMultipart("alternative")
-            message["Subject"] = subject
-            message["From"] = self.sender_email
-            message["To"] = to_email
-            message["Date"] = formatdate(localtime=True)
+        # Reuse the precomputed boundary unless the rendered content happens to contain it
+        boundary = self._boundaries.get(template_name)
+        if boundary and (boundary in html_content or (text_content and boundary in text_content)):
+            boundary = None
 
-            # Attach HTML content
-            part = MIMEText(html_content, "html")
-            message.attach(part)
+        # Create the email message
+        message = MIMEMultipart("alternative", boundary=boundary)
+        message["Subject"] = subject
+        message["From"] = self.sender_email
+        message["To"] = to_email
+        message["Date"] = formatdate(localtime=True)
 
-            print(f"Connecting to SMTP server: {self.smtp_server}:{self.smtp_port}")
-            print(f"Using TLS: True")
+        # Plain-text alternative goes first so clients prefer the HTML part
+        if text_content is not None:
+            message.attach(MIMEText(text_content, "plain"))
 
-            # Modified SMTP connection parameters:
-            await aiosmtplib.send(
-            message,
-            hostname=self.smtp_server,
-            port=self.smtp_port,
-            username=self.sender_email,
-            password=self.password,
-            start_tls=True,  # Use start_tls (STARTTLS) for port 587
-            validate_certs=True,
-            timeout=30
-            )
+        # Attach HTML content
+        part = MIMEText(html_content, "html")
+        message.attach(part)
+        return message
 
-            print(f"Email sent successfully to {to_email}")
+    async def deliver(self, to_email, subject, template_name, **context):
+        """Send an email asynchronously, raising on failure"""
+        message = self.build_message(to_email, subject, template_name, **context)
+
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            await self.pool.send(message)
+            outcome = "sent"
+        finally:
+            email_send_duration.observe(time.perf_counter() - started, template_name, outcome)
+
+    async def send_email_async(self, to_email, subject, template_name, **context):
+        """Send an email asynchronously"""
+        try:
+            await self.deliver(to_email, subject, template_name, **context)
+
+            logger.info("Email %s sent to %s", template_name, to_email)
             return True
         
         except Exception as e:
-            print(f"Failed to send email: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Failed to send email %s to %s: %s", template_name, to_email, e)
             return False
     def send_email_sync(self, to_email, subject, template_name, **context):
         """Send an email synchronously"""
@@ -112,25 +198,46 @@ class EmailClient:
             part = MIMEText(html_content, "html")
             message.attach(part)
             
+            import smtplib
+
             # Connect to SMTP server
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender_email, self.password)
+            with smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=settings.EMAIL_TIMEOUT_SECONDS) as server:
+                if settings.EMAIL_USE_STARTTLS:
+                    server.starttls()
+                if settings.EMAIL_USE_AUTH:
+                    server.login(self.sender_email, self.password)
                 server.sendmail(self.sender_email, to_email, message.as_string())
                 
             return True
         except Exception as e:
-            print(f"Failed to send email: {str(e)}")
+            logger.error("Failed to send email %s to %s: %s", template_name, to_email, e)
             return False
 
+_email_client: Optional[EmailClient] = None
+
+def get_email_client() -> EmailClient:
+    """The shared client, built on first use so importing this module stays cheap"""
+    global _email_client
+    if _email_client is None:
+        _email_client = EmailClient()
+    return _email_client
+
+def peek_email_client() -> Optional[EmailClient]:
+    """The shared client if something has built it; reporting never builds one"""
+    return _email_client
+
+async def close_email_client():
+    """Close pooled SMTP connections, if the client was ever built"""
+    if _email_client is not None:
+        await _email_client.pool.close()
+
 # Helper functions for common emails
-email_client = EmailClient()
 
 async def send_verification_email(to_email, code, user_id=None):
     """Send verification code email"""
     try:
         # Try async first
-        result = await email_client.send_email_async(
+        result = await get_email_client().send_email_async(
             to_email=to_email,
             subject="Your Lanceraa Verification Code",
             template_name="verification_code",
@@ -142,8 +249,9 @@ async def send_verification_email(to_email, code, user_id=None):
         
         # If async fails, try sync as fallback
         if not result:
-            print("Async email failed, trying synchronous method...")
-            result = email_client.send_email_sync(
+            logger.warning("Async email failed, trying synchronous method")
+            result = await asyncio.to_thread(
+                get_email_client().send_email_sync,
                 to_email=to_email,
                 subject="Your Lanceraa Verification Code",
                 template_name="verification_code",
@@ -155,14 +263,14 @@ async def send_verification_email(to_email, code, user_id=None):
             
         return result
     except Exception as e:
-        print(f"Error in send_verification_email: {str(e)}")
+        logger.exception("Error in send_verification_email: %s", e)
         return False
 
 async def send_welcome_email(to_email, user_name, otp=None):
     """Send welcome email after verification"""
     try:
         # Try async first
-        result = await email_client.send_email_async(
+        result = await get_email_client().send_email_async(
             to_email=to_email,
             subject="Welcome to Lanceraa!",
             template_name="welcome",
@@ -174,8 +282,9 @@ async def send_welcome_email(to_email, user_name, otp=None):
         
         # If async fails, try sync as fallback
         if not result:
-            print("Async email failed, trying synchronous method...")
-            result = email_client.send_email_sync(
+            logger.warning("Async email failed, trying synchronous method")
+            result = await asyncio.to_thread(
+                get_email_client().send_email_sync,
                 to_email=to_email,
                 subject="Welcome to Lanceraa!",
                 template_name="welcome",
@@ -187,14 +296,14 @@ async def send_welcome_email(to_email, user_name, otp=None):
             
         return result
     except Exception as e:
-        print(f"Error in send_welcome_email: {str(e)}")
+        logger.exception("Error in send_welcome_email: %s", e)
         return False
 
 async def send_password_reset_email(to_email, reset_code):
     """Send password reset email"""
     try:
         # Try async first
-        result = await email_client.send_email_async(
+        result = await get_email_client().send_email_async(
             to_email=to_email,
             subject="Reset Your Lanceraa Password",
             template_name="password_reset",
@@ -205,8 +314,9 @@ async def send_password_reset_email(to_email, reset_code):
         
         # If async fails, try sync as fallback
         if not result:
-            print("Async email failed, trying synchronous method...")
-            result = email_client.send_email_sync(
+            logger.warning("Async email failed, trying synchronous method")
+            result = await asyncio.to_thread(
+                get_email_client().send_email_sync,
                 to_email=to_email,
                 subject="Reset Your Lanceraa Password",
                 template_name="password_reset",
@@ -217,5 +327,5 @@ async def send_password_reset_email(to_email, reset_code):
             
         return result
     except Exception as e:
-        print(f"Error in send_password_reset_email: {str(e)}")
+        logger.exception("Error in send_password_reset_email: %s", e)
         return False
\ No newline at end of file
@@ -0,0 +1,36 @@
+from typing import Callable, Optional
+from fastapi import Depends, HTTPException, Request, Response, status
+
+# Part of every ETag so a change to a response's shape invalidates clients' copies
+ETAG_SCHEMA_VERSION = 1
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from values that change whenever the representation does"""
+    return '"' + "-".join(str(part) for part in (ETAG_SCHEMA_VERSION, *parts)) + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison, so W/"x" matches "x" (RFC 9110 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def conditional_get(etag_dependency: Callable, cache_control: str = "private, no-cache"):
+    """
+    Dependency factory for conditional GETs. `etag_dependency` is any dependency returning
+    the current ETag, ideally without loading the full resource. A matching If-None-Match
+    ends the request with 304 before the endpoint runs; otherwise the ETag is returned
+    (and set on the injected response) for the endpoint to use.
+
+        @router.get("/thing", dependencies=[Depends(conditional_get(thing_etag))])
+    """
+    async def check(request: Request, response: Response, etag: str = Depends(etag_dependency)) -> str:
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return etag
+    return check
@@ -0,0 +1,159 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Set, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from .config import settings
+from .database import async_engine
+from .logging import get_logger
+from .metrics import password_hash_duration, password_hash_queue_wait
+from .passwords import HashPolicy, calibrate, configured_policy, get_password_hash, verify_password_and_check
+from ..models.user import User
+
+logger = get_logger("hashing")
+
+
+# Worker functions live at module level so they can be pickled for a process pool.
+# Each returns (result, started_at, duration) so the caller can measure queue wait.
+# The policy travels with the job: process workers never see a calibrated one otherwise.
+def _hash_job(password: str, policy: HashPolicy):
+    started = time.time()
+    result = get_password_hash(password, policy)
+    return result, started, time.time() - started
+
+def _verify_job(plain_password: str, hashed_password: str, policy: HashPolicy):
+    started = time.time()
+    result = verify_password_and_check(plain_password, hashed_password, policy)
+    return result, started, time.time() - started
+
+
+class PasswordHasher:
+    """Runs password hashing off the event loop on a bounded thread or process pool"""
+
+    def __init__(self, executor_type: str = "thread", workers: int = 4, max_queue: int = 32,
+                 policy: Optional[HashPolicy] = None):
+        self.executor_type = executor_type
+        self.workers = workers
+        self.max_queue = max_queue
+        self.policy = policy or HashPolicy()
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._rehashes: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.hash_time_total = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        # Created on first use so importing the app never spawns workers
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def _run(self, operation: str, fn, *args):
+        # Shed load once everything is busy and the wait queue is full
+        if self._pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self._pending += 1
+        submitted = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, duration = await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+        wait = max(started - submitted, 0.0)
+        self.completed += 1
+        self.queue_wait_total += wait
+        self.queue_wait_max = max(self.queue_wait_max, wait)
+        self.hash_time_total += duration
+        password_hash_queue_wait.observe(wait, operation)
+        password_hash_duration.observe(duration, operation)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password on the worker pool"""
+        return await self._run("hash", _hash_job, password, self.policy)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash on the worker pool"""
+        valid, _ = await self.verify_and_check(plain_password, hashed_password)
+        return valid
+
+    async def verify_and_check(self, plain_password: str, hashed_password: str) -> Tuple[bool, bool]:
+        """(valid, needs_update) for a stored hash, on the worker pool"""
+        return await self._run("verify", _verify_job, plain_password, hashed_password, self.policy)
+
+    async def calibrate(self, target_ms: float):
+        """Re-pick the cost for this host; takes a few hashes' worth of one worker thread"""
+        self.policy = await asyncio.to_thread(calibrate, self.policy, target_ms)
+        logger.info("Password hashing calibrated to %s for %.0f ms", self.policy.describe(), target_ms)
+
+    def rehash_later(self, user_id, plain_password: str, old_hash: str):
+        """Replace an outdated hash after the response is sent; skipped when busy or changed"""
+        # A fresh context: the request's SQL audit and read routing end with the response
+        task = asyncio.create_task(self._rehash(user_id, plain_password, old_hash), context=contextvars.Context())
+        # The loop only keeps weak references to tasks
+        self._rehashes.add(task)
+        task.add_done_callback(self._rehashes.discard)
+
+    async def _rehash(self, user_id, plain_password: str, old_hash: str):
+        try:
+            new_hash = await self.hash(plain_password)
+            users = User.__table__
+            async with async_engine.begin() as conn:
+                # Only if the password wasn't changed in the meantime
+                await conn.execute(
+                    update(users)
+                    .where(users.c.id == user_id, users.c.hashed_password == old_hash)
+                    .values(hashed_password=new_hash)
+                )
+        except HTTPException:
+            pass  # Pool saturated: the next login tries again
+        except Exception as e:
+            logger.exception("Password rehash failed for %s: %s", user_id, e)
+
+    def stats(self) -> dict:
+        """Queue depth and timing counters for monitoring"""
+        return {
+            "executor": self.executor_type,
+            "policy": self.policy.describe(),
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_avg_ms": round(self.queue_wait_total / self.completed * 1000, 3) if self.completed else 0.0,
+            "queue_wait_max_ms": round(self.queue_wait_max * 1000, 3),
+            "hash_time_avg_ms": round(self.hash_time_total / self.completed * 1000, 3) if self.completed else 0.0,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    executor_type=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    policy=configured_policy(),
+)
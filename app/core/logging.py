@@ -1,28 +1,167 @@
+import atexit
+import json
 import logging
+import queue
+import random
+import re
 import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-import os
-
-# Create logs directory if it doesn't exist
-logs_dir = Path("logs")
-logs_dir.mkdir(exist_ok=True)
-
-# Configure logging
-def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler(os.path.join("logs", "app.log"))
-        ]
-    )
-    
-    # Setup specific loggers
-    logger = logging.getLogger("lanceraa")
-    logger.setLevel(logging.DEBUG)
-    
+from typing import Dict, Optional
+from .config import settings
+
+EMAIL_RE = re.compile(r"\b([A-Za-z0-9._%+-])[A-Za-z0-9._%+-]*@([A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+)\b")
+# A 4-8 digit number shortly after "code"/"otp", e.g. "verification code for x: 123456"
+OTP_RE = re.compile(r"(?i)\b(code|otp)\b([^\d\n]{0,40}?)\b\d{4,8}\b")
+# Structured fields that are never logged as-is
+SENSITIVE_FIELDS = {"code", "otp", "verification_code", "password", "token", "access_token"}
+
+# Attributes every LogRecord has; anything else came from `extra=` and is logged as a field
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+
+logger = logging.getLogger("lanceraa")
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Child of the app logger, e.g. get_logger("auth") -> "lanceraa.auth" (sampled separately)"""
+    return logger.getChild(name)
+
+def redact(text: str) -> str:
+    """Mask email addresses (j***@example.com) and verification codes"""
+    text = EMAIL_RE.sub(r"\1***@\2", text)
+    return OTP_RE.sub(r"\1\2******", text)
+
+def _redact_field(key, value):
+    if key.lower() in SENSITIVE_FIELDS:
+        return "[redacted]"
+    if isinstance(value, str):
+        return redact(value)
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields become top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = _redact_field(key, value)
+        if record.exc_info:
+            payload["exc_info"] = redact(self.formatException(record.exc_info))
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str)
+
+
+class RedactingFormatter(logging.Formatter):
+    """The classic text format, with the same redaction as the JSON output"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records below WARNING for the configured loggers"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Longest prefix first so "lanceraa.auth.login" beats "lanceraa.auth"
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        for name, rate in self.rates:
+            if record.name == name or record.name.startswith(name + "."):
+                if rate >= 1 or random.random() < rate:
+                    return True
+                self.dropped += 1
+                return False
+        return True
+
+
+class LazyQueueHandler(QueueHandler):
+    """Enqueue the record untouched; message formatting happens on the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock handler formats here, on the caller's thread (the event loop).
+        # In-process queues don't need the record to be picklable, so skip that.
+        return record
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """Parse "lanceraa.auth=0.1,lanceraa.email=0.5" into {logger: rate}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+def setup_logging(
+    level: Optional[str] = None,
+    fmt: Optional[str] = None,
+    log_file: Optional[str] = None,
+    sampling: Optional[str] = None,
+) -> logging.Logger:
+    """Route all logging through a queue drained by one background thread"""
+    global _listener
+    if _listener is not None:
+        return logger
+
+    level = level or settings.LOG_LEVEL
+    fmt = fmt or settings.LOG_FORMAT
+    log_file = settings.LOG_FILE if log_file is None else log_file
+    sampling = settings.LOG_SAMPLING if sampling is None else sampling
+
+    if fmt == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = RedactingFormatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    # stderr, so a process that writes results to stdout (the benchmarks) keeps it parseable
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if log_file:
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(-1)
+    queue_handler = LazyQueueHandler(log_queue)
+    rates = parse_sampling(sampling)
+    if rates:
+        queue_handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    # Third-party loggers follow LOG_LEVEL too, but never below INFO: their DEBUG output
+    # (httpcore, asyncio, multipart) drowns the app's own
+    level = logging.getLevelName(level.upper())
+    root.setLevel(max(level, logging.INFO))
+    logger.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
     return logger
 
-# Create logger instance
-logger = setup_logging()
\ No newline at end of file
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
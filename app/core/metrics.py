@@ -0,0 +1,254 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        # Copy under the lock: a worker thread adding a label set would break the iteration
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        # Entries are updated in place, so copy the counts too for a consistent snapshot
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = Registry()
+
+# HTTP
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests currently being served"))
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "Requests served", ("method", "route", "status")))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency", ("method", "route")))
+http_request_db_queries = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("method", "route"), COUNT_BUCKETS))
+http_request_db_duration = registry.register(Histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL per request", ("method", "route")))
+
+# Database
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement latency", ("engine",)))
+db_pool_checkout_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("engine",),
+    (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)))
+db_pool_checked_out = registry.register(Gauge(
+    "db_pool_checked_out", "Connections currently checked out", ("engine",)))
+db_pool_overflow = registry.register(Gauge(
+    "db_pool_overflow", "Connections open beyond pool_size", ("engine",)))
+
+# Email and password hashing
+email_send_duration = registry.register(Histogram(
+    "email_send_duration_seconds", "SMTP delivery latency", ("template", "outcome")))
+password_hash_duration = registry.register(Histogram(
+    "password_hash_duration_seconds", "bcrypt time on the worker pool", ("operation",)))
+password_hash_queue_wait = registry.register(Histogram(
+    "password_hash_queue_wait_seconds", "Time hash jobs waited for a free worker", ("operation",)))
+password_hash_pending = registry.register(Gauge(
+    "password_hash_pending", "Hash jobs running or queued"))
+email_pool_open = registry.register(Gauge(
+    "email_pool_open_connections", "Open pooled SMTP connections"))
+
+
+class RequestStats:
+    """SQL counters for the request being served, shared through a context variable"""
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Stored on the per-statement execution context, so a failed statement leaves nothing behind
+    context._metrics_started = time.perf_counter()
+
+def instrument_engine(engine, label: str):
+    """Time every statement on a sync Engine (use async_engine.sync_engine for async ones)"""
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - context._metrics_started
+        db_query_duration.observe(duration, label)
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += duration
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+class _PoolMetrics:
+    """Measures how long checkouts wait for a connection and how far the pool overflows"""
+    metrics_label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        conn = super()._do_get()
+        db_pool_checkout_wait.observe(time.perf_counter() - started, self.metrics_label)
+        db_pool_checked_out.set(self.checkedout(), self.metrics_label)
+        db_pool_overflow.set(max(self.overflow(), 0), self.metrics_label)
+        return conn
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        db_pool_checked_out.set(self.checkedout(), self.metrics_label)
+
+
+class InstrumentedQueuePool(_PoolMetrics, QueuePool):
+    metrics_label = "sync"
+
+
+class InstrumentedAsyncQueuePool(_PoolMetrics, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and SQL usage per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            current_request_stats.reset(token)
+
+            # The route template (set by the router) keeps label cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests_total.inc(method, path, status_code)
+            http_request_duration.observe(duration, method, path)
+            http_request_db_queries.observe(stats.queries, method, path)
+            http_request_db_duration.observe(stats.query_seconds, method, path)
@@ -0,0 +1,68 @@
+import asyncio
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from .config import settings
+from .database import async_engine
+from .logging import logger
+
+# Alembic is imported inside the functions below: it is only needed at startup
+if TYPE_CHECKING:
+    from alembic.config import Config
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def alembic_config() -> "Config":
+    """Alembic config that works regardless of the current working directory"""
+    from alembic.config import Config
+
+    config = Config(str(PROJECT_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(PROJECT_ROOT / "migrations"))
+    # Don't let env.py replace the app's logging configuration
+    config.attributes["configure_logger"] = False
+    return config
+
+@lru_cache
+def head_revision() -> str:
+    """Newest revision shipped with this build"""
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+async def current_revision() -> Optional[str]:
+    """Revision recorded in the database, or None if it was never migrated"""
+    async with async_engine.connect() as conn:
+        try:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        except DBAPIError:
+            return None
+        return result.scalar()
+
+def upgrade_to_head():
+    from alembic import command
+
+    command.upgrade(alembic_config(), "head")
+
+async def ensure_schema_current():
+    """Startup check: compare one revision id instead of reflecting the schema"""
+    if settings.DATABASE_AUTO_MIGRATE:
+        await asyncio.to_thread(upgrade_to_head)
+        return
+
+    if settings.DATABASE_MIGRATION_CHECK == "off":
+        return
+
+    current, head = await current_revision(), head_revision()
+    if current == head:
+        return
+
+    message = (
+        f"Database schema is at revision {current or 'none'} but this build expects {head}; "
+        "run `alembic upgrade head`"
+    )
+    if settings.DATABASE_MIGRATION_CHECK == "error":
+        raise RuntimeError(message)
+    logger.warning(message)
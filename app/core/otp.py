@@ -0,0 +1,299 @@
+import asyncio
+import hashlib
+import hmac
+import secrets
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, update
+from sqlalchemy.dialects import postgresql, sqlite
+from .cache import FakeRedis
+from .config import settings
+from .database import async_engine
+from .logging import get_logger
+from ..models.otp import OneTimeCode
+
+logger = get_logger("otp")
+
+# Outcomes of OneTimeCodes.verify
+VALID = "valid"
+INVALID = "invalid"
+EXPIRED = "expired"  # Also: never issued, already used, or burned by too many attempts
+LOCKED = "locked"    # This guess used up the last attempt
+
+
+class OTPStore:
+    """Storage for hashed one-time codes: key -> (digest, attempts) until it expires"""
+
+    async def put(self, key: str, digest: str, ttl: float) -> None:
+        """Store a code, replacing any earlier one for the key (and its attempt count)"""
+        raise NotImplementedError
+
+    async def attempt(self, key: str) -> Optional[Tuple[str, int]]:
+        """
+        Reserve one guess at the live code: count it and return (digest, attempts
+        including this one) in one atomic step, so concurrent guesses each get their own
+        number. None if there is no live code.
+        """
+        raise NotImplementedError
+
+    async def consume(self, key: str, digest: str) -> bool:
+        """Delete the code if it is still this one; only one caller gets True"""
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def purge_expired(self) -> int:
+        """Delete expired codes in bulk; returns how many went"""
+        return 0
+
+
+class MemoryOTPStore(OTPStore):
+    """In-process store; only correct when one process serves every request"""
+
+    def __init__(self):
+        self._codes: Dict[str, List] = {}  # key -> [digest, attempts, expires_at]
+
+    def _live(self, key: str) -> Optional[List]:
+        entry = self._codes.get(key)
+        if entry is not None and entry[2] < time.monotonic():
+            del self._codes[key]
+            return None
+        return entry
+
+    async def put(self, key: str, digest: str, ttl: float) -> None:
+        self._codes[key] = [digest, 0, time.monotonic() + ttl]
+
+    async def attempt(self, key: str) -> Optional[Tuple[str, int]]:
+        entry = self._live(key)
+        if entry is None:
+            return None
+        entry[1] += 1
+        return entry[0], entry[1]
+
+    async def consume(self, key: str, digest: str) -> bool:
+        entry = self._live(key)
+        if entry is None or entry[0] != digest:
+            return False
+        del self._codes[key]
+        return True
+
+    async def delete(self, key: str) -> None:
+        self._codes.pop(key, None)
+
+    async def purge_expired(self) -> int:
+        now = time.monotonic()
+        expired = [key for key, entry in self._codes.items() if entry[2] < now]
+        for key in expired:
+            del self._codes[key]
+        return len(expired)
+
+
+# Lua runs atomically on the server, so each check-and-write below is a single step.
+# KEYS[1] is the digest key, KEYS[2] its attempt counter.
+_ATTEMPT_SCRIPT = """
+local digest = redis.call('GET', KEYS[1])
+if not digest then return false end
+local attempts = redis.call('INCR', KEYS[2])
+if redis.call('PTTL', KEYS[2]) < 0 then
+    redis.call('PEXPIRE', KEYS[2], math.max(redis.call('PTTL', KEYS[1]), 1))
+end
+return {digest, attempts}
+"""
+_CONSUME_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+redis.call('DEL', KEYS[1], KEYS[2])
+return 1
+"""
+
+def _fake_attempt(client, keys, args):
+    entry = client._alive(keys[0])
+    if entry is None:
+        return None
+    counter = client._alive(keys[1])
+    attempts = int(counter[0]) + 1 if counter else 1
+    client._data[keys[1]] = (str(attempts).encode(), entry[1])
+    return [entry[0], attempts]
+
+def _fake_consume(client, keys, args):
+    entry = client._alive(keys[0])
+    if entry is None or entry[0] != args[0].encode():
+        return 0
+    client._data.pop(keys[0], None)
+    client._data.pop(keys[1], None)
+    return 1
+
+# Python equivalents for the in-process stand-in; atomic there since they never await
+FakeRedis.scripts[_ATTEMPT_SCRIPT] = _fake_attempt
+FakeRedis.scripts[_CONSUME_SCRIPT] = _fake_consume
+
+
+class RedisOTPStore(OTPStore):
+    """Store backed by any redis.asyncio-compatible client; Redis expires the keys itself"""
+
+    def __init__(self, client, prefix: str = "lanceraa:otp:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def put(self, key: str, digest: str, ttl: float) -> None:
+        px = max(int(ttl * 1000), 1)
+        # INCR keeps the counter's expiry, so both keys go away together
+        await self.client.set(f"{self.prefix}{key}:attempts", "0", px=px)
+        await self.client.set(self.prefix + key, digest, px=px)
+
+    async def attempt(self, key: str) -> Optional[Tuple[str, int]]:
+        result = await self.client.eval(_ATTEMPT_SCRIPT, 2, self.prefix + key, f"{self.prefix}{key}:attempts")
+        if not result:
+            return None
+        digest, attempts = result
+        return (digest.decode() if isinstance(digest, bytes) else digest), int(attempts)
+
+    async def consume(self, key: str, digest: str) -> bool:
+        # Only if it is still this code: a resend in the meantime must survive
+        removed = await self.client.eval(_CONSUME_SCRIPT, 2, self.prefix + key, f"{self.prefix}{key}:attempts", digest)
+        return removed == 1
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self.prefix + key, f"{self.prefix}{key}:attempts")
+
+
+class TableOTPStore(OTPStore):
+    """Store in the narrow one_time_codes table, away from the hot users rows"""
+
+    def __init__(self, engine=async_engine):
+        self.engine = engine
+        self.table = OneTimeCode.__table__
+
+    async def put(self, key: str, digest: str, ttl: float) -> None:
+        dialect = postgresql if self.engine.dialect.name == "postgresql" else sqlite
+        values = {"digest": digest, "attempts": 0, "expires_at": datetime.utcnow() + timedelta(seconds=ttl)}
+        stmt = dialect.insert(self.table).values(key=key, **values)
+        async with self.engine.begin() as conn:
+            await conn.execute(stmt.on_conflict_do_update(index_elements=[self.table.c.key], set_=values))
+
+    async def attempt(self, key: str) -> Optional[Tuple[str, int]]:
+        table = self.table
+        async with self.engine.begin() as conn:
+            row = (await conn.execute(
+                update(table)
+                .where(table.c.key == key, table.c.expires_at > datetime.utcnow())
+                .values(attempts=table.c.attempts + 1)
+                .returning(table.c.digest, table.c.attempts)
+            )).first()
+        return (row.digest, row.attempts) if row else None
+
+    async def consume(self, key: str, digest: str) -> bool:
+        table = self.table
+        async with self.engine.begin() as conn:
+            result = await conn.execute(delete(table).where(table.c.key == key, table.c.digest == digest))
+        return result.rowcount == 1
+
+    async def delete(self, key: str) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(delete(self.table).where(self.table.c.key == key))
+
+    async def purge_expired(self) -> int:
+        async with self.engine.begin() as conn:
+            result = await conn.execute(delete(self.table).where(self.table.c.expires_at < datetime.utcnow()))
+        return result.rowcount
+
+
+class OneTimeCodes:
+    """
+    Numeric one-time codes keyed by purpose and subject. Only an HMAC of each code is
+    stored, guesses are compared in constant time, and a code is burned after
+    `max_attempts` wrong guesses or its first successful use.
+    """
+
+    def __init__(self, store: OTPStore, secret: str, ttl: float = 1800, max_attempts: int = 5,
+                 length: int = 6, purge_seconds: float = 600):
+        self.store = store
+        self.secret = secret.encode()
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.length = length
+        self.purge_seconds = purge_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def _digest(self, key: str, code: str) -> str:
+        # The key is part of the message, so a digest is useless for any other user
+        return hmac.new(self.secret, f"{key}:{code}".encode(), hashlib.sha256).hexdigest()
+
+    async def issue(self, purpose: str, subject: str) -> str:
+        """A fresh code for (purpose, subject); any earlier one stops working"""
+        key = f"{purpose}:{subject}"
+        code = str(secrets.randbelow(10 ** self.length)).zfill(self.length)
+        await self.store.put(key, self._digest(key, code), self.ttl)
+        return code
+
+    async def verify(self, purpose: str, subject: str, code: str) -> str:
+        key = f"{purpose}:{subject}"
+        # The guess is counted before it is compared: however many arrive at once, only
+        # max_attempts of them are ever checked against the code
+        entry = await self.store.attempt(key)
+        if entry is None:
+            return EXPIRED
+        digest, attempts = entry
+        if attempts > self.max_attempts:
+            await self.store.consume(key, digest)
+            return EXPIRED
+
+        if hmac.compare_digest(digest, self._digest(key, code or "")):
+            return VALID if await self.store.consume(key, digest) else EXPIRED
+
+        if attempts == self.max_attempts:
+            # Burn this code only; a resend since then stays usable
+            await self.store.consume(key, digest)
+            return LOCKED
+        return INVALID
+
+    async def _purge_forever(self):
+        while True:
+            await asyncio.sleep(self.purge_seconds)
+            try:
+                purged = await self.store.purge_expired()
+                if purged:
+                    logger.info("Purged %d expired one-time codes", purged)
+            except Exception as e:
+                logger.exception("One-time code purge failed: %s", e)
+
+    def start(self):
+        if self._task is None and not isinstance(self.store, RedisOTPStore):
+            self._task = asyncio.create_task(self._purge_forever(), name="otp-purge")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def create_otp_store(backend: str = "table") -> OTPStore:
+    """Build the store named by settings.OTP_BACKEND"""
+    if backend == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("OTP_BACKEND=redis requires the 'redis' package")
+        return RedisOTPStore(redis.from_url(settings.REDIS_URL))
+
+    if backend == "fakeredis":
+        return RedisOTPStore(FakeRedis())
+
+    if backend == "memory":
+        return MemoryOTPStore()
+
+    return TableOTPStore()
+
+
+one_time_codes = OneTimeCodes(
+    create_otp_store(settings.OTP_BACKEND),
+    secret=settings.SECRET_KEY,
+    ttl=settings.OTP_TTL_SECONDS,
+    max_attempts=settings.OTP_MAX_ATTEMPTS,
+    purge_seconds=settings.OTP_PURGE_SECONDS,
+)
@@ -0,0 +1,155 @@
+"""Password hashing policy: which algorithm new hashes use, and at what cost.
+
+bcrypt is the default; argon2id needs the optional argon2-cffi package. Hashes made
+under an older policy (the other scheme, or a lower cost) still verify and are
+reported as needing an update, so logins can upgrade them in the background.
+
+The cost can be calibrated to a target latency on this host, at startup
+(PASSWORD_HASH_CALIBRATE=true) or ahead of time:
+
+    python -m app.core.passwords [--scheme argon2] [--target-ms 250]
+
+which prints the settings to pin in the environment.
+"""
+import math
+import statistics
+import time
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+from passlib.context import CryptContext
+from .config import settings
+
+# Below these no target latency is accepted
+MIN_BCRYPT_ROUNDS = 10
+MIN_ARGON2_TIME_COST = 2
+
+
+class HashPolicy(NamedTuple):
+    """Hashable and picklable, so process-pool workers can build the same context"""
+    scheme: str = "bcrypt"  # "bcrypt" or "argon2" (argon2id)
+    bcrypt_rounds: int = 12
+    argon2_time_cost: int = 3
+    argon2_memory_kib: int = 65536
+    argon2_parallelism: int = 2
+
+    def describe(self) -> str:
+        if self.scheme == "argon2":
+            return (f"argon2id t={self.argon2_time_cost} m={self.argon2_memory_kib}KiB "
+                    f"p={self.argon2_parallelism}")
+        return f"bcrypt rounds={self.bcrypt_rounds}"
+
+
+def configured_policy() -> HashPolicy:
+    return HashPolicy(
+        scheme=settings.PASSWORD_HASH_SCHEME,
+        bcrypt_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+        argon2_time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+        argon2_memory_kib=settings.PASSWORD_ARGON2_MEMORY_KIB,
+        argon2_parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+    )
+
+@lru_cache(maxsize=8)
+def crypt_context(policy: HashPolicy) -> CryptContext:
+    """The passlib context for a policy, built once per process"""
+    if policy.scheme not in ("bcrypt", "argon2"):
+        raise ValueError(f"Unknown password hash scheme {policy.scheme!r}")
+    if policy.scheme == "argon2":
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            raise RuntimeError("PASSWORD_HASH_SCHEME=argon2 requires the 'argon2-cffi' package")
+
+    # Both schemes stay verifiable; the one not in use is deprecated, so its hashes need an update
+    schemes = ["argon2", "bcrypt"] if policy.scheme == "argon2" else ["bcrypt", "argon2"]
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        # Hashes cheaper than the current cost need an update too
+        bcrypt__rounds=policy.bcrypt_rounds,
+        bcrypt__min_rounds=policy.bcrypt_rounds,
+        argon2__type="ID",
+        argon2__rounds=policy.argon2_time_cost,
+        argon2__min_rounds=policy.argon2_time_cost,
+        argon2__memory_cost=policy.argon2_memory_kib,
+        argon2__parallelism=policy.argon2_parallelism,
+    )
+
+
+def get_password_hash(password: str, policy: Optional[HashPolicy] = None) -> str:
+    """Hash a password for storing."""
+    return crypt_context(policy or configured_policy()).hash(password)
+
+def verify_password(plain_password: str, hashed_password: str, policy: Optional[HashPolicy] = None) -> bool:
+    """Verify a stored password against a provided password"""
+    return crypt_context(policy or configured_policy()).verify(plain_password, hashed_password)
+
+def verify_password_and_check(
+    plain_password: str, hashed_password: str, policy: Optional[HashPolicy] = None
+) -> Tuple[bool, bool]:
+    """(valid, needs_update): whether the stored hash should be redone under the current policy"""
+    context = crypt_context(policy or configured_policy())
+    if not context.verify(plain_password, hashed_password):
+        return False, False
+    return True, context.needs_update(hashed_password)
+
+
+def time_hash(policy: HashPolicy, samples: int = 3) -> float:
+    """Median seconds to hash one password under `policy` on this host"""
+    context = crypt_context(policy)
+    durations = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash("calibration-password")
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+def calibrate(policy: HashPolicy, target_ms: float) -> HashPolicy:
+    """
+    The most expensive variant of `policy` that still hashes within `target_ms` here,
+    but never cheaper than `policy` itself: calibration only raises the configured cost.
+    bcrypt doubles per round, so one measurement fixes the rounds; argon2 time grows
+    linearly with passes at the configured memory and parallelism.
+    """
+    target = target_ms / 1000
+    if policy.scheme == "argon2":
+        # Fit fixed cost (filling the memory) + per-pass cost from two measurements
+        one, two = (time_hash(policy._replace(argon2_time_cost=passes)) for passes in (1, 2))
+        per_pass = max(two - one, 1e-6)
+        time_cost = max(MIN_ARGON2_TIME_COST, int((target - (one - per_pass)) / per_pass))
+        calibrated = policy._replace(argon2_time_cost=time_cost)
+        # Timing noise can put the estimate a pass or two over
+        floor = max(MIN_ARGON2_TIME_COST, policy.argon2_time_cost)
+        while calibrated.argon2_time_cost > floor and time_hash(calibrated) > target:
+            calibrated = calibrated._replace(argon2_time_cost=calibrated.argon2_time_cost - 1)
+        return calibrated._replace(argon2_time_cost=max(calibrated.argon2_time_cost, floor))
+
+    base = MIN_BCRYPT_ROUNDS
+    elapsed = time_hash(policy._replace(bcrypt_rounds=base))
+    rounds = base + max(0, math.floor(math.log2(target / elapsed))) if elapsed < target else base
+    return policy._replace(bcrypt_rounds=max(min(rounds, 31), policy.bcrypt_rounds))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pick a password hashing cost for this host")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default=settings.PASSWORD_HASH_SCHEME)
+    parser.add_argument("--target-ms", type=float, default=settings.PASSWORD_HASH_TARGET_MS)
+    parser.add_argument("--memory-kib", type=int, default=settings.PASSWORD_ARGON2_MEMORY_KIB)
+    parser.add_argument("--parallelism", type=int, default=settings.PASSWORD_ARGON2_PARALLELISM)
+    args = parser.parse_args()
+
+    policy = configured_policy()._replace(
+        scheme=args.scheme, argon2_memory_kib=args.memory_kib, argon2_parallelism=args.parallelism
+    )
+    print(f"current: {policy.describe()} takes {time_hash(policy) * 1000:.0f} ms")
+    calibrated = calibrate(policy, args.target_ms)
+    print(f"calibrated for {args.target_ms:.0f} ms: {calibrated.describe()} takes {time_hash(calibrated) * 1000:.0f} ms")
+    print()
+    print(f"PASSWORD_HASH_SCHEME={calibrated.scheme}")
+    if calibrated.scheme == "argon2":
+        print(f"PASSWORD_ARGON2_TIME_COST={calibrated.argon2_time_cost}")
+        print(f"PASSWORD_ARGON2_MEMORY_KIB={calibrated.argon2_memory_kib}")
+        print(f"PASSWORD_ARGON2_PARALLELISM={calibrated.argon2_parallelism}")
+    else:
+        print(f"PASSWORD_BCRYPT_ROUNDS={calibrated.bcrypt_rounds}")
@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import itertools
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+from typing import Dict, List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import AsyncSessionLocal, get_async_database_url
+from .logging import get_logger
+from .metrics import Gauge, instrument_engine, registry
+from .sql_audit import audit_engine
+
+logger = get_logger("replicas")
+
+STICKY_COOKIE = "lanceraa_read_primary"
+
+# Seconds the replica is behind; 0 when it has replayed everything it received, so an
+# idle primary doesn't look like lag
+LAG_QUERIES = {
+    "postgresql": """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """,
+}
+
+db_replica_lag = registry.register(Gauge(
+    "db_replica_lag_seconds", "Replication lag measured by the last replica check", ("replica",)))
+db_replica_healthy = registry.register(Gauge(
+    "db_replica_healthy", "1 while a replica is serving reads", ("replica",)))
+
+
+class Replica:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = create_async_engine(
+            get_async_database_url(url),
+            echo=False,
+            pool_pre_ping=True,
+            pool_size=10,
+            max_overflow=20,
+            pool_timeout=30,
+            pool_recycle=1800,
+        )
+        instrument_engine(self.engine.sync_engine, name)
+        if settings.SQL_AUDIT_MODE != "off" or settings.SQL_BUDGET_ENFORCE:
+            audit_engine(self.engine.sync_engine)
+        self.sessionmaker = async_sessionmaker(
+            bind=self.engine, class_=AsyncSession, autoflush=False, expire_on_commit=False,
+            info={"read_only": True},
+        )
+        # Out of rotation until the first check passes
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+
+    async def check(self, timeout: float, max_lag: float):
+        try:
+            async with self.engine.connect() as conn:
+                query = LAG_QUERIES.get(self.engine.dialect.name, "SELECT 0")
+                lag = await asyncio.wait_for(conn.scalar(text(query)), timeout)
+            self.lag = float(lag or 0)
+            self.error = None if self.lag <= max_lag else f"lagging {self.lag:.1f}s (limit {max_lag}s)"
+        except Exception as e:
+            self.lag = None
+            self.error = str(e) or type(e).__name__
+
+        healthy = self.error is None
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Replica %s back in rotation", self.name)
+            else:
+                logger.warning("Replica %s out of rotation: %s", self.name, self.error)
+        self.healthy = healthy
+        db_replica_lag.set(self.lag if self.lag is not None else -1, self.name)
+        db_replica_healthy.set(1 if healthy else 0, self.name)
+
+    def stats(self) -> dict:
+        return {
+            "status": "healthy" if self.healthy else "unhealthy",
+            "lag_seconds": None if self.lag is None else round(self.lag, 3),
+            "error": self.error,
+        }
+
+
+class ReplicaPool:
+    """Read replicas with background health and lag checks; round-robin over healthy ones"""
+
+    def __init__(self, urls: List[str], check_seconds: float = 5, max_lag: float = 5, timeout: float = 3):
+        self.replicas = [Replica(f"replica{i}", url) for i, url in enumerate(urls)]
+        self.check_seconds = check_seconds
+        self.max_lag = max_lag
+        self.timeout = timeout
+        self._next = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    async def refresh(self):
+        await asyncio.gather(*(replica.check(self.timeout, self.max_lag) for replica in self.replicas))
+
+    async def _refresh_forever(self):
+        while True:
+            await asyncio.sleep(self.check_seconds)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.exception("Replica check failed: %s", e)
+
+    async def start(self):
+        """Check once before serving, then keep checking in the background"""
+        if self.enabled and self._task is None:
+            await self.refresh()
+            self._task = asyncio.create_task(self._refresh_forever(), name="replica-monitor")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> Dict[str, dict]:
+        return {replica.name: replica.stats() for replica in self.replicas}
+
+
+class StickyClients:
+    """
+    In-process read-your-writes memory for clients that don't keep cookies (API clients
+    with bearer tokens): token hash -> time until which its reads go to the primary.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._until: Dict[str, float] = {}
+
+    def mark(self, key: str, seconds: float):
+        if len(self._until) >= self.max_entries:
+            now = time.time()
+            self._until = {k: until for k, until in self._until.items() if until > now}
+            if len(self._until) >= self.max_entries:
+                # Still full of live entries: forget the oldest half
+                for k in sorted(self._until, key=self._until.get)[: self.max_entries // 2]:
+                    del self._until[k]
+        self._until[key] = time.time() + seconds
+
+    def is_sticky(self, key: str) -> bool:
+        until = self._until.get(key)
+        return until is not None and until > time.time()
+
+
+class ReadRouting:
+    """Per-request routing state shared between the middleware, sessions and get_read_db"""
+    __slots__ = ("sticky", "wrote")
+
+    def __init__(self, sticky: bool = False):
+        self.sticky = sticky
+        self.wrote = False
+
+
+current_read_routing: ContextVar[Optional[ReadRouting]] = ContextVar("current_read_routing", default=None)
+
+replica_pool = ReplicaPool(
+    [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()],
+    check_seconds=settings.REPLICA_CHECK_SECONDS,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+)
+sticky_clients = StickyClients()
+
+
+# A committed write pins the rest of the request, and the client's next requests, to the primary
+
+@event.listens_for(Session, "after_flush")
+def _note_flush(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(Session, "before_flush")
+def _refuse_replica_writes(session, flush_context, instances):
+    if session.info.get("read_only") and (session.new or session.dirty or session.deleted):
+        raise RuntimeError("Attempted to write through a read-replica session")
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop("wrote", False):
+        routing = current_read_routing.get()
+        if routing is not None:
+            routing.wrote = True
+            routing.sticky = True
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("wrote", None)
+
+
+def _client_key(headers: Dict[bytes, bytes]) -> Optional[str]:
+    authorization = headers.get(b"authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization).hexdigest()
+
+def _cookie_sticky(headers: Dict[bytes, bytes]) -> bool:
+    raw = headers.get(b"cookie")
+    if not raw:
+        return False
+    morsel = SimpleCookie(raw.decode("latin-1")).get(STICKY_COOKIE)
+    try:
+        return morsel is not None and float(morsel.value) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadRoutingMiddleware:
+    """
+    Decides per request whether reads may use a replica. Requests from a client that
+    wrote within READ_YOUR_WRITES_SECONDS (cookie, or bearer token seen by this process)
+    read from the primary; a request that commits a write tells the client so.
+    """
+
+    def __init__(self, app, window: float = 10):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        client_key = _client_key(headers)
+        sticky = _cookie_sticky(headers) or (client_key is not None and sticky_clients.is_sticky(client_key))
+        routing = ReadRouting(sticky)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and routing.wrote:
+                until = time.time() + self.window
+                if client_key is not None:
+                    sticky_clients.mark(client_key, self.window)
+                cookie = f"{STICKY_COOKIE}={until:.0f}; Max-Age={self.window:.0f}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        token = current_read_routing.set(routing)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_read_routing.reset(token)
+
+
+def read_sessionmaker() -> async_sessionmaker:
+    """A healthy replica's sessionmaker, or the primary's when sticky or none is healthy"""
+    routing = current_read_routing.get()
+    if routing is not None and routing.sticky:
+        return AsyncSessionLocal
+    replica = replica_pool.choose()
+    return replica.sessionmaker if replica is not None else AsyncSessionLocal
+
+# Read-only database dependency: a replica when one can serve this request
+async def get_read_db():
+    async with read_sessionmaker()() as db:
+        yield db
@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from .config import settings
+from .database import async_engine
+from .logging import get_logger
+from ..models.token import RevokedToken
+
+logger = get_logger("revocation")
+
+# Each sync re-reads this far back, so a revocation committed late (or stamped by a host
+# whose clock is a little behind) is still picked up; re-adding an id is a no-op
+SYNC_LOOKBACK = timedelta(seconds=60)
+# Expired ids are dropped from memory and from the table at most this often
+PRUNE_SECONDS = 600
+
+
+def _epoch(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class BloomFilter:
+    """
+    Fixed-size set of strings: no false negatives, and about `error_rate` false
+    positives once `capacity` items are in. Items can't be removed; rebuild instead.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Both halves of one digest generate all k positions (double hashing)
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """
+    Revoked session ("sid") and token ("jti") ids, mirrored in memory from the
+    revoked_tokens table so checking a bearer token needs no I/O. The Bloom filter
+    settles the usual case, not revoked, and the exact set settles its rare positives.
+    An id is kept only until the tokens it covers have expired, and the table is
+    re-read incrementally every `sync_interval` seconds.
+    """
+
+    def __init__(self, engine=async_engine, sync_interval: float = 5,
+                 capacity: int = 100000, error_rate: float = 0.001):
+        self.engine = engine
+        self.sync_interval = sync_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.table = RevokedToken.__table__
+        self._revoked: Dict[str, float] = {}  # id -> epoch seconds after which it no longer matters
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._synced_at: Optional[datetime] = None
+        self._pruned_at = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self.false_positives = 0
+
+    def is_revoked(self, *token_ids: Optional[str]) -> bool:
+        """Whether any of the ids (None is skipped) has been revoked; pure CPU"""
+        for token_id in token_ids:
+            if token_id and token_id in self._bloom:
+                if token_id in self._revoked:
+                    return True
+                self.false_positives += 1
+        return False
+
+    def _remember(self, token_id: str, expires: float):
+        if token_id in self._revoked:
+            self._revoked[token_id] = max(self._revoked[token_id], expires)
+            return
+        self._revoked[token_id] = expires
+        if self._bloom.count >= self._bloom.capacity:
+            # Past capacity the error rate climbs; rebuild with room to spare
+            self._rebuild()
+        else:
+            self._bloom.add(token_id)
+
+    def _rebuild(self):
+        bloom = BloomFilter(max(self.capacity, 2 * len(self._revoked)), self.error_rate)
+        for token_id in self._revoked:
+            bloom.add(token_id)
+        self._bloom = bloom
+
+    def _prune(self):
+        now = time.time()
+        expired = [token_id for token_id, expires in self._revoked.items() if expires < now]
+        for token_id in expired:
+            del self._revoked[token_id]
+        if expired:
+            self._rebuild()
+        self._pruned_at = time.monotonic()
+
+    def remember(self, token_id: str, expires_at: datetime):
+        """Apply a committed revocation in this process without waiting for the next sync"""
+        self._remember(token_id, _epoch(expires_at))
+
+    async def revoke(self, token_id: str, expires_at: datetime, conn=None):
+        """
+        Record a revocation. On its own it commits and applies here at once. On `conn` it
+        commits with the caller's transaction, which must call remember() once that has
+        committed: a rollback would otherwise leave the id revoked in this process only.
+        Other processes pick it up on their next sync either way.
+        """
+        dialect = postgresql if self.engine.dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(self.table).values(
+            token_id=token_id, revoked_at=datetime.utcnow(), expires_at=expires_at
+        ).on_conflict_do_nothing(index_elements=[self.table.c.token_id])
+        if conn is not None:
+            await conn.execute(stmt)
+            return
+        async with self.engine.begin() as own:
+            await own.execute(stmt)
+        self.remember(token_id, expires_at)
+
+    async def sync(self) -> int:
+        """Pull revocations made since the last sync (all live ones the first time)"""
+        table = self.table
+        started = datetime.utcnow()
+        query = select(table.c.token_id, table.c.expires_at).where(table.c.expires_at > started)
+        if self._synced_at is not None:
+            query = query.where(table.c.revoked_at >= self._synced_at - SYNC_LOOKBACK)
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(query)).all()
+        for row in rows:
+            self._remember(row.token_id, _epoch(row.expires_at))
+        self._synced_at = started
+        return len(rows)
+
+    async def purge_expired(self) -> int:
+        """Delete rows whose tokens have all expired; returns how many went"""
+        async with self.engine.begin() as conn:
+            result = await conn.execute(delete(self.table).where(self.table.c.expires_at < datetime.utcnow()))
+        return result.rowcount
+
+    async def _sync_forever(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+                if time.monotonic() - self._pruned_at >= PRUNE_SECONDS:
+                    self._prune()
+                    purged = await self.purge_expired()
+                    if purged:
+                        logger.info("Purged %d expired token revocations", purged)
+            except Exception as e:
+                # Keep the last known list; the next interval tries again
+                logger.exception("Revocation sync failed: %s", e)
+
+    async def start(self):
+        """Load the live revocations before serving, then follow the table"""
+        if self._task is None:
+            loaded = await self.sync()
+            logger.info("Loaded %d token revocations", loaded)
+            self._task = asyncio.create_task(self._sync_forever(), name="revocation-sync")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "revoked": len(self._revoked),
+            "bloom_bits": self._bloom.size,
+            "bloom_hashes": self._bloom.hashes,
+            "false_positives": self.false_positives,
+            "synced_at": self._synced_at.isoformat() if self._synced_at else None,
+        }
+
+
+revocation_list = RevocationList(
+    sync_interval=settings.REVOCATION_SYNC_SECONDS,
+    capacity=settings.REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+)
@@ -1,35 +1,28 @@
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Any, Optional, Union
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from .config import settings
+from .cache import cache
 from ..models.user import User
-from ..core.database import get_db
-
-# Password hashing context
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__rounds=12
-)
+from ..schemas.user import CurrentUser
+from .database import get_async_db
+from .revocation import revocation_list
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-def get_password_hash(password: str) -> str:
-    """Hash a password for storing."""
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a stored password against a provided password"""
-    return pwd_context.verify(plain_password, hashed_password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    """Create a new access token"""
+    """Create a new access token; pass "sid" in `data` to tie it to a refresh session"""
     to_encode = data.copy()
+    # Its own id, so this one token can be revoked
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -39,29 +32,101 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """Decode JWT token and return current user"""
-    credentials_exception = HTTPException(
+def create_refresh_token(subject: str, session_id: str, jti: str, expires_at: datetime) -> str:
+    """A signed refresh token; it is only honoured while its refresh_tokens row is unspent"""
+    return jwt.encode(
+        {"sub": subject, "sid": session_id, "jti": jti, "exp": expires_at, "type": "refresh"},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+
+def decode_refresh_token(token: str) -> dict:
+    """Claims of a valid, unexpired refresh token, or a 401"""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise _credentials_exception()
+    if payload.get("type") != "refresh" or not payload.get("sid") or not payload.get("jti"):
+        raise _credentials_exception()
+    return payload
+
+def _token_cache_key(token: str) -> str:
+    # Never use the raw bearer token as a cache key
+    return "auth:token:" + hashlib.sha256(token.encode()).hexdigest()
+
+def _user_cache_key(username: str) -> str:
+    return f"auth:user:{username}"
+
+async def invalidate_user_cache(username: str) -> None:
+    """Drop the cached snapshot after the user row changes"""
+    await cache.delete(_user_cache_key(username))
+
+async def cache_user_snapshot(user: CurrentUser) -> None:
+    """Store the snapshot get_current_user serves until the TTL or the next invalidation"""
+    await cache.set(_user_cache_key(user.username), user.model_dump(mode="json"), settings.AUTH_CACHE_TTL_SECONDS)
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    try:
-        # Decode JWT
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        username: str = payload.get("sub")
-        if username is None:
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    """Validate the bearer token and return its claims without touching the database"""
+    credentials_exception = _credentials_exception()
+
+    # Reuse claims from a previous successful decode of the same token
+    token_key = _token_cache_key(token)
+    payload = await cache.get(token_key)
+    if payload is None:
+        try:
+            # Decode JWT
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            )
+        except JWTError:
             raise credentials_exception
-    except JWTError:
+        # A refresh token is only good at /auth/refresh
+        if payload.get("sub") is None or payload.get("type") == "refresh":
+            raise credentials_exception
+
+        # Never cache a token past its own expiry
+        ttl = settings.AUTH_CACHE_TTL_SECONDS
+        if payload.get("exp"):
+            ttl = min(ttl, payload["exp"] - time.time())
+        if ttl > 0:
+            payload = {key: payload.get(key) for key in ("sub", "exp", "jti", "sid")}
+            await cache.set(token_key, payload, ttl)
+    elif payload.get("exp") and payload["exp"] < time.time():
         raise credentials_exception
 
-    # Get user from database
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    # Logged out (the session) or revoked (the token); an in-memory check
+    if revocation_list.is_revoked(payload.get("sid"), payload.get("jti")):
         raise credentials_exception
+
+    return payload
+
+async def get_token_subject(claims: dict = Depends(get_token_claims)) -> str:
+    """The bearer token's subject (the username)"""
+    return claims["sub"]
+
+async def get_current_user(username: str = Depends(get_token_subject), db: AsyncSession = Depends(get_async_db)) -> CurrentUser:
+    """Decode JWT token and return current user"""
+    # Get user snapshot from cache, falling back to the database. The fallback reads the
+    # primary: the snapshot is shared by every request for its TTL, and a lagging replica
+    # would put back a row that invalidate_user_cache just dropped (e.g. still active)
+    user_key = _user_cache_key(username)
+    snapshot = await cache.get(user_key)
+    if snapshot is not None:
+        user = CurrentUser(**snapshot)
+    else:
+        result = await db.execute(select(User).where(User.username == username))
+        db_user = result.scalars().first()
+        if db_user is None:
+            raise _credentials_exception()
+        user = CurrentUser.model_validate(db_user)
+        await cache_user_snapshot(user)
     
     # Check if user is active
     if not user.is_active:
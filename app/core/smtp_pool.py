@@ -0,0 +1,171 @@
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import aiosmtplib
+
+
+class PooledConnection:
+    """An authenticated SMTP connection plus its usage counters"""
+
+    def __init__(self, conn_id: int, smtp: aiosmtplib.SMTP):
+        self.id = conn_id
+        self.smtp = smtp
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+        self.sent = 0
+        self.sent_since_connect = 0
+        self.errors = 0
+        self.reconnects = 0
+
+    def stats(self) -> dict:
+        return {
+            "id": self.id,
+            "connected": self.smtp.is_connected,
+            "age_seconds": round(time.time() - self.created_at, 1),
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+            "sent": self.sent,
+            "errors": self.errors,
+            "reconnects": self.reconnects,
+        }
+
+
+class SMTPPool:
+    """Small pool of persistent SMTP connections shared by all sends"""
+
+    # Errors that mean the connection is gone and the message can be retried on a fresh one
+    RETRYABLE = (
+        aiosmtplib.SMTPServerDisconnected,
+        aiosmtplib.SMTPConnectError,
+        aiosmtplib.SMTPTimeoutError,
+        ConnectionError,
+    )
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        start_tls: bool = True,
+        size: int = 3,
+        timeout: float = 30,
+        health_check_after: float = 30,
+        max_messages_per_connection: int = 100,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.size = size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.max_messages_per_connection = max_messages_per_connection
+
+        self._idle: List[PooledConnection] = []
+        self._all: List[PooledConnection] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._ids = itertools.count(1)
+
+    async def _connect(self, conn: Optional[PooledConnection] = None) -> PooledConnection:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            start_tls=self.start_tls,
+            validate_certs=True,
+            timeout=self.timeout,
+        )
+        await smtp.connect()
+        if self.username:
+            await smtp.login(self.username, self.password)
+
+        if conn is None:
+            conn = PooledConnection(next(self._ids), smtp)
+            self._all.append(conn)
+        else:
+            conn.smtp = smtp
+            conn.reconnects += 1
+        conn.sent_since_connect = 0
+        return conn
+
+    async def _reconnect(self, conn: PooledConnection) -> PooledConnection:
+        await self._quit(conn)
+        try:
+            return await self._connect(conn)
+        except Exception:
+            # Forget the dead connection; the next checkout opens a new one
+            self._all.remove(conn)
+            raise
+
+    async def _quit(self, conn: PooledConnection):
+        if conn.smtp.is_connected:
+            try:
+                await conn.smtp.quit()
+            except Exception:
+                conn.smtp.close()
+
+    async def _checkout(self) -> PooledConnection:
+        if not self._idle:
+            return await self._connect()
+
+        # Most recently used first keeps a few connections warm instead of all of them cold
+        conn = self._idle.pop()
+        if not conn.smtp.is_connected or conn.sent_since_connect >= self.max_messages_per_connection:
+            return await self._reconnect(conn)
+
+        # Servers drop idle sessions; probe with NOOP before trusting an old connection
+        if time.monotonic() - conn.last_used > self.health_check_after:
+            try:
+                await conn.smtp.noop()
+            except Exception:
+                conn.errors += 1
+                return await self._reconnect(conn)
+        return conn
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrow a healthy connection; at most `size` are in use at once"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+
+        async with self._semaphore:
+            conn = await self._checkout()
+            try:
+                yield conn
+            finally:
+                conn.last_used = time.monotonic()
+                if conn in self._all:
+                    self._idle.append(conn)
+
+    async def send(self, message) -> None:
+        """Send one message, retrying once on a fresh connection if the old one died"""
+        async with self.connection() as conn:
+            try:
+                await conn.smtp.send_message(message)
+            except self.RETRYABLE:
+                conn.errors += 1
+                await self._reconnect(conn)
+                await conn.smtp.send_message(message)
+            except Exception:
+                conn.errors += 1
+                raise
+            conn.sent += 1
+            conn.sent_since_connect += 1
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "open": sum(1 for conn in self._all if conn.smtp.is_connected),
+            "idle": len(self._idle),
+            "connections": [conn.stats() for conn in self._all],
+        }
+
+    async def close(self):
+        """Close every connection; the pool reconnects lazily if used again"""
+        for conn in self._all:
+            await self._quit(conn)
+        self._idle.clear()
+        self._all.clear()
+        self._semaphore = None
@@ -0,0 +1,126 @@
+import random
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from sqlalchemy import event
+from .config import settings
+from .logging import get_logger
+
+logger = get_logger("sql")
+
+# Statements are logged truncated; bound parameters are never recorded
+STATEMENT_PREVIEW = 300
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised (with SQL_BUDGET_ENFORCE on) by the statement that goes over a route's budget"""
+
+
+class SQLAudit:
+    """Every statement one request executed, with timings"""
+
+    def __init__(self, enforce: bool = False):
+        self.enforce = enforce
+        self.budget: Optional[int] = None
+        self.statements: List[Tuple[str, float]] = []
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(duration for _, duration in self.statements)
+
+    def repeated(self, threshold: int = 2) -> List[Tuple[str, int]]:
+        """Identical statements run `threshold` or more times: usually an N+1 or a loop"""
+        counts = Counter(statement for statement, _ in self.statements)
+        return [(statement, count) for statement, count in counts.most_common() if count >= threshold]
+
+    def slow(self, threshold_ms: float) -> List[Tuple[str, float]]:
+        return [(statement, duration) for statement, duration in self.statements if duration * 1000 >= threshold_ms]
+
+    def report(self, method: str, route: str) -> dict:
+        repeated = self.repeated(settings.SQL_REPEAT_THRESHOLD)
+        slow = self.slow(settings.SQL_SLOW_QUERY_MS)
+        return {
+            "route": f"{method} {route}",
+            "queries": len(self.statements),
+            "sql_ms": round(self.total_seconds * 1000, 3),
+            "budget": self.budget,
+            "over_budget": self.budget is not None and len(self.statements) > self.budget,
+            "repeated": [
+                {"statement": statement[:STATEMENT_PREVIEW], "count": count} for statement, count in repeated
+            ],
+            "slow": [
+                {"statement": statement[:STATEMENT_PREVIEW], "ms": round(duration * 1000, 3)} for statement, duration in slow
+            ],
+        }
+
+
+current_sql_audit: ContextVar[Optional[SQLAudit]] = ContextVar("current_sql_audit", default=None)
+
+
+def query_budget(limit: int):
+    """
+    Route dependency declaring how many SQL statements the route may run, e.g.
+    `@router.get("/me", dependencies=[Depends(query_budget(1))])`.
+    """
+    def declare_budget():
+        audit = current_sql_audit.get()
+        if audit is not None:
+            audit.budget = limit
+    return declare_budget
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    audit = current_sql_audit.get()
+    if audit is None:
+        return
+    if audit.enforce and audit.budget is not None and len(audit.statements) >= audit.budget:
+        raise QueryBudgetExceeded(
+            f"Query budget of {audit.budget} exceeded by: {statement[:STATEMENT_PREVIEW]}"
+        )
+    context._audit_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    audit = current_sql_audit.get()
+    if audit is not None:
+        audit.statements.append((statement, time.perf_counter() - context._audit_started))
+
+def audit_engine(engine):
+    """Record statements on a sync Engine (use async_engine.sync_engine for async ones)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class SQLAuditMiddleware:
+    """
+    Audits every request (SQL_AUDIT_MODE=dev) or a sample of them (SQL_AUDIT_MODE=sampled)
+    and logs a per-request SQL report.
+    """
+
+    def __init__(self, app, mode: str = "dev", sample_rate: float = 0.01, enforce: bool = False):
+        self.app = app
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.enforce = enforce
+
+    async def __call__(self, scope, receive, send):
+        # Budgets can only be enforced on requests we audit, so enforcing audits everything
+        if scope["type"] != "http" or (
+            self.mode != "dev" and not self.enforce and random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        audit = SQLAudit(enforce=self.enforce)
+        token = current_sql_audit.set(audit)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_sql_audit.reset(token)
+            if audit.statements:
+                route = getattr(scope.get("route"), "path", None) or scope["path"]
+                report = audit.report(scope["method"], route)
+                if report["over_budget"] or report["repeated"] or report["slow"]:
+                    logger.warning("SQL budget report for %s", report["route"], extra={"sql": report})
+                else:
+                    logger.debug("SQL budget report for %s", report["route"], extra={"sql": report})
@@ -0,0 +1,238 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from typing import AsyncIterator, Dict, NamedTuple, Optional
+from .config import settings
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StoredObject(NamedTuple):
+    size: int
+    content_type: str
+    chunks: AsyncIterator[bytes]
+
+
+class ObjectStorage:
+    """
+    Write-once object storage for uploaded media. Keys are content-addressed, so an
+    object never changes once written and writing an existing key is a no-op.
+    """
+
+    def temp_dir(self) -> str:
+        """Where uploads are spooled before put_file; the same filesystem when that matters"""
+        return tempfile.gettempdir()
+
+    async def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def put_file(self, key: str, path: str, content_type: str) -> None:
+        """Store a copy of a local file; `path` is left in place for the caller"""
+        raise NotImplementedError
+
+    async def get(self, key: str) -> Optional[StoredObject]:
+        """Stream an object, or None if there is no such key"""
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[str]:
+        """A filesystem path the web server can send directly, if the backend has one"""
+        return None
+
+
+class LocalStorage(ObjectStorage):
+    """Objects as files under `root`; nothing is created until the first write"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Storage key escapes the storage root: {key!r}")
+        return path
+
+    def temp_dir(self) -> str:
+        # Next to the objects, so storing an upload is a hard link rather than a copy
+        path = os.path.join(self.root, ".tmp")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    async def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def _put(self, key: str, path: str):
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(path, target)
+        except FileExistsError:
+            pass  # Same content already stored
+        except OSError:
+            # Another filesystem: copy beside the target, then rename into place atomically
+            staging = f"{target}.{os.getpid()}.tmp"
+            shutil.copyfile(path, staging)
+            os.replace(staging, target)
+
+    async def put_file(self, key: str, path: str, content_type: str) -> None:
+        await asyncio.to_thread(self._put, key, path)
+
+    async def get(self, key: str) -> Optional[StoredObject]:
+        path = self._path(key)
+        try:
+            handle = await asyncio.to_thread(open, path, "rb")
+        except FileNotFoundError:
+            return None
+
+        async def chunks():
+            try:
+                while chunk := await asyncio.to_thread(handle.read, CHUNK_SIZE):
+                    yield chunk
+            finally:
+                handle.close()
+
+        return StoredObject(os.fstat(handle.fileno()).st_size, content_type_for(key), chunks())
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        return path if os.path.exists(path) else None
+
+
+def _missing(error: Exception) -> bool:
+    # botocore's ClientError (and FakeS3Error) carry the S3 error code here
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+class S3Storage(ObjectStorage):
+    """
+    Objects in an S3-compatible bucket through a boto3-style client (AWS, MinIO, or the
+    in-process FakeS3). The client is synchronous, so every call runs on a worker thread.
+    """
+
+    def __init__(self, client, bucket: str, prefix: str = ""):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self.prefix + key)
+            return True
+        except Exception as e:
+            if _missing(e):
+                return False
+            raise
+
+    async def put_file(self, key: str, path: str, content_type: str) -> None:
+        # upload_file streams from disk, switching to a multipart upload for large files
+        await asyncio.to_thread(
+            self.client.upload_file, path, self.bucket, self.prefix + key,
+            ExtraArgs={"ContentType": content_type, "CacheControl": IMMUTABLE_CACHE_CONTROL},
+        )
+
+    async def get(self, key: str) -> Optional[StoredObject]:
+        try:
+            response = await asyncio.to_thread(self.client.get_object, Bucket=self.bucket, Key=self.prefix + key)
+        except Exception as e:
+            if _missing(e):
+                return None
+            raise
+        body = response["Body"]
+
+        async def chunks():
+            try:
+                while chunk := await asyncio.to_thread(body.read, CHUNK_SIZE):
+                    yield chunk
+            finally:
+                body.close()
+
+        return StoredObject(
+            response["ContentLength"], response.get("ContentType") or content_type_for(key), chunks()
+        )
+
+
+class FakeS3Error(Exception):
+    """Shaped like botocore's ClientError so S3Storage handles both alike"""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeS3:
+    """Minimal in-memory stand-in for a boto3 S3 client (head/get_object, upload_file)"""
+
+    def __init__(self):
+        self._objects: Dict[tuple, tuple] = {}  # (bucket, key) -> (data, content type)
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self._objects:
+            raise FakeS3Error("404")
+        data, content_type = self._objects[(Bucket, Key)]
+        return {"ContentLength": len(data), "ContentType": content_type}
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None):
+        with open(Filename, "rb") as f:
+            self._objects[(Bucket, Key)] = (f.read(), (ExtraArgs or {}).get("ContentType"))
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self._objects:
+            raise FakeS3Error("NoSuchKey")
+        data, content_type = self._objects[(Bucket, Key)]
+
+        class Body:
+            def __init__(self):
+                self.offset = 0
+
+            def read(self, size=-1):
+                end = len(data) if size < 0 else self.offset + size
+                chunk, self.offset = data[self.offset:end], min(end, len(data))
+                return chunk
+
+            def close(self):
+                pass
+
+        return {"Body": Body(), "ContentLength": len(data), "ContentType": content_type}
+
+
+# Keys name their content, so caches may keep a response for good
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+CONTENT_TYPES = {
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+    "gif": "image/gif",
+}
+
+def content_type_for(key: str) -> str:
+    return CONTENT_TYPES.get(key.rsplit(".", 1)[-1], "application/octet-stream")
+
+
+def create_storage(backend: str = "local") -> ObjectStorage:
+    """Build the storage named by settings.STORAGE_BACKEND"""
+    if backend == "s3":
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires the 'boto3' package")
+        client = boto3.client(
+            "s3", endpoint_url=settings.S3_ENDPOINT_URL or None, region_name=settings.S3_REGION or None
+        )
+        return S3Storage(client, settings.S3_BUCKET, settings.S3_PREFIX)
+
+    if backend == "fakes3":
+        return S3Storage(FakeS3(), settings.S3_BUCKET or "lanceraa", settings.S3_PREFIX)
+
+    return LocalStorage(settings.STORAGE_LOCAL_DIR)
+
+
+_storage: Optional[ObjectStorage] = None
+
+def get_storage() -> ObjectStorage:
+    """The shared storage backend, built on first use (boto3 is slow to import)"""
+    global _storage
+    if _storage is None:
+        _storage = create_storage(settings.STORAGE_BACKEND)
+    return _storage
@@ -1,35 +1,70 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
-from pydantic import BaseModel, EmailStr, Field, validator
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 from .core.config import settings
-from .core.database import Base, engine
-from .models import User
-from typing import Optional
-import re
-from dotenv import load_dotenv
-import os
-from .routes import auth, health
-from .core.logging import logger
-from .core import database
+from .core.database import async_engine
+from .routes import auth, freelancers, health, media, metrics, profile
+from .core.logging import logger, setup_logging
+from .core.metrics import MetricsMiddleware
+from .core.sql_audit import SQLAuditMiddleware
+from .core.replicas import ReadRoutingMiddleware, replica_pool
+from .core.hashing import password_hasher
+from .core.migrations import ensure_schema_current
+from .core.otp import one_time_codes
+from .core.revocation import revocation_list
+from .core.email import close_email_client, get_email_client
+from .services.email_outbox import email_dispatcher
+from .services.health_monitor import health_monitor
+from .services.last_login import last_login_buffer
+from .services.sessions import refresh_sessions
+from .services.images import image_processor
 
-# Load environment variables
-load_dotenv()
+
+# Importing this module only builds the app; anything that touches the filesystem,
+# the database or the network happens here, once the server starts
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Queue-backed logging: handlers run on a background thread, not the event loop
+    setup_logging()
+    logger.info("Starting Lanceraa API")
+    await ensure_schema_current()
+    if settings.PASSWORD_HASH_CALIBRATE:
+        await password_hasher.calibrate(settings.PASSWORD_HASH_TARGET_MS)
+    await replica_pool.start()
+    # Bearer tokens are checked against this in memory, so it is loaded before serving
+    await revocation_list.start()
+    refresh_sessions.start()
+    if settings.EMAIL_OUTBOX_ENABLED:
+        # Only the dispatcher renders email, so only its process compiles the templates
+        get_email_client().warm_up()
+        email_dispatcher.start()
+    health_monitor.start()
+    one_time_codes.start()
+    last_login_buffer.start()
+
+    yield
+
+    logger.info("Shutting down Lanceraa API")
+    await last_login_buffer.stop()
+    await one_time_codes.stop()
+    await refresh_sessions.stop()
+    await revocation_list.stop()
+    await health_monitor.stop()
+    await replica_pool.stop()
+    await email_dispatcher.stop()
+    await close_email_client()
+    await image_processor.stop()
+    password_hasher.shutdown()
+    await async_engine.dispose()
 
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     description="Backend API for Lanceraa freelancing platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
-# Alternative solution for main.py
-origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://localhost:8000").split(",")
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
@@ -38,15 +73,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Password hashing
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__rounds=12  # You can adjust this value (10-14 is common)
-)
+# Routes reads to replicas unless the client just wrote (read-your-writes)
+if replica_pool.enabled:
+    app.add_middleware(ReadRoutingMiddleware, window=settings.READ_YOUR_WRITES_SECONDS)
+
+if settings.SQL_AUDIT_MODE != "off" or settings.SQL_BUDGET_ENFORCE:
+    app.add_middleware(
+        SQLAuditMiddleware,
+        mode=settings.SQL_AUDIT_MODE,
+        sample_rate=settings.SQL_AUDIT_SAMPLE_RATE,
+        enforce=settings.SQL_BUDGET_ENFORCE,
+    )
 
-# Create database tables (comment out if using Alembic)
-Base.metadata.create_all(bind=engine)
+# Added last so it wraps everything, CORS included
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Moving all schemas to proper files in the schemas directory
 # Removed the UserCreate and UserResponse models from here
@@ -58,16 +99,11 @@ async def root():
 # Include routers with API prefix
 app.include_router(auth.router, prefix=settings.API_V1_STR)
 app.include_router(health.router, prefix=settings.API_V1_STR)
-
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Starting Lanceraa API")
-
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("Shutting down Lanceraa API")
+app.include_router(profile.router, prefix=settings.API_V1_STR)
+app.include_router(freelancers.router, prefix=settings.API_V1_STR)
+app.include_router(media.router, prefix=settings.API_V1_STR)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,3 +1,6 @@
 from ..core.database import Base
 from .user import User, UserProfile
-
+from .email import EmailOutbox
+from .otp import OneTimeCode
+from .token import RefreshToken, RevokedToken
+from .skill import Skill, UserSkill
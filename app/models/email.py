@@ -0,0 +1,29 @@
+from sqlalchemy import Column, String, Integer, Text, JSON, DateTime, Index
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+class EmailOutbox(Base):
+    """Outgoing email waiting for (or done with) background delivery"""
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    to_email = Column(String(100), nullable=False)
+    subject = Column(String(255), nullable=False)
+    template_name = Column(String(100), nullable=False)
+    context = Column(JSON, nullable=False, default=dict)
+
+    # Delivery state: pending -> sending -> sent, or dead after too many failures
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, server_default=func.now())
+    locked_at = Column(DateTime, nullable=True)  # When a dispatcher claimed the row
+    last_error = Column(Text, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime, server_default=func.now())
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # The dispatcher polls for due rows by status and time
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
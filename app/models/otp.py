@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Integer, DateTime, Index
+from ..core.database import Base
+
+class OneTimeCode(Base):
+    """Hashed one-time code (email verification etc.) for the table OTP backend"""
+    __tablename__ = "one_time_codes"
+
+    # "<purpose>:<subject>", e.g. "verify_email:<user id>"; one live code per key
+    key = Column(String(100), primary_key=True)
+    digest = Column(String(64), nullable=False)  # HMAC-SHA256 of the code, hex
+    attempts = Column(Integer, nullable=False, default=0)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Bulk expiry deletes by time
+        Index("ix_one_time_codes_expires_at", "expires_at"),
+    )
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from ..core.database import Base
+
+class Skill(Base):
+    """A normalized skill name (lowercase, single-spaced)"""
+    __tablename__ = "skills"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(50), unique=True, nullable=False)
+
+class UserSkill(Base):
+    """Which users list which skills; mirrors UserProfile.skills for searching"""
+    __tablename__ = "user_skills"
+
+    # (skill_id, user_id) order: one index range per skill, already sorted for keyset paging
+    skill_id = Column(Integer, ForeignKey("skills.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        # Replacing one user's skills on profile update
+        Index("ix_user_skills_user_id", "user_id"),
+    )
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from ..core.database import Base
+
+class RefreshToken(Base):
+    """One issued refresh token; each is good for a single rotation"""
+    __tablename__ = "refresh_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    # Every token rotated from the same login shares it; also the access tokens' "sid"
+    session_id = Column(String(32), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime, nullable=True)  # Set when rotated; a second use means it leaked
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_session_id", "session_id"),
+        Index("ix_refresh_tokens_user_id", "user_id"),
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
+
+class RevokedToken(Base):
+    """A revoked session or access token id, kept until the tokens it covers expire"""
+    __tablename__ = "revoked_tokens"
+
+    token_id = Column(String(32), primary_key=True)  # A "sid" or a "jti"
+    revoked_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Incremental sync into each process's revocation filter
+        Index("ix_revoked_tokens_revoked_at", "revoked_at"),
+        Index("ix_revoked_tokens_expires_at", "expires_at"),
+    )
@@ -1,8 +1,9 @@
 import uuid
-from sqlalchemy import Column, String, Boolean, ForeignKey, Text, JSON, DateTime, Integer, Float
+from sqlalchemy import Column, String, Boolean, ForeignKey, Text, JSON, DateTime, Integer, Float, Index, event, inspect, update
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Session, relationship
+from sqlalchemy.orm.util import identity_key
 from ..core.database import Base
 
 class User(Base):
@@ -25,19 +26,24 @@ class User(Base):
     profile_completed = Column(Boolean, default=False)  # Track if profile is completed
     is_client = Column(Boolean, nullable=False) # diffrent roles for different users
     
-    # For email verification
-    verification_code = Column(String(6), nullable=True)
-    verification_code_expires = Column(DateTime, nullable=True)
-    
     # Timestamps
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     last_login = Column(DateTime, nullable=True)  # Add if missing
 
+    # Bumped whenever the user or their profile changes; used for ETags on /auth/me
+    data_version = Column(Integer, nullable=False, default=1, server_default="1")
+
     
     # Relationship to profile
     profile = relationship("UserProfile", back_populates="user", uselist=False)
 
+# Case-insensitive login lookups hit exactly one of these
+Index("ix_users_email_lower", func.lower(User.email))
+Index("ix_users_username_lower", func.lower(User.username))
+# Lets Postgres serve the username prefix lookup used when allocating usernames
+Index("ix_users_username_pattern", User.username, postgresql_ops={"username": "varchar_pattern_ops"})
+
 class UserProfile(Base):
     """Extended user profile information"""
     __tablename__ = "user_profiles"
@@ -76,4 +82,49 @@ class UserProfile(Base):
     def get_full_address(self):
         if all([self.street, self.city, self.state, self.country, self.zip]):
             return f"{self.street}, {self.city}, {self.state}, {self.country}, {self.zip}"
-        return None
\ No newline at end of file
+        return None
+
+# Freelancer search filters by location case-insensitively and pages by user_id
+Index("ix_user_profiles_country_lower", func.lower(UserProfile.country), UserProfile.user_id)
+Index("ix_user_profiles_city_lower", func.lower(UserProfile.city), UserProfile.user_id)
+
+
+# Changes to these don't show up in anything we serve, so they keep ETags valid
+UNVERSIONED_FIELDS = {"last_login", "updated_at", "data_version"}
+
+def _has_versioned_changes(obj, skip=frozenset()) -> bool:
+    state = inspect(obj)
+    return any(
+        state.attrs[attr.key].history.has_changes()
+        for attr in state.mapper.column_attrs
+        if attr.key not in skip
+    )
+
+@event.listens_for(Session, "before_flush")
+def bump_user_data_version(session, flush_context, instances):
+    """Increment users.data_version in the same UPDATE as any user or profile change"""
+    user_ids = set()
+    for obj in session.dirty:
+        if isinstance(obj, User) and _has_versioned_changes(obj, UNVERSIONED_FIELDS):
+            user_ids.add(obj.id)
+        elif isinstance(obj, UserProfile) and _has_versioned_changes(obj):
+            user_ids.add(obj.user_id)
+    for obj in session.new:
+        if isinstance(obj, UserProfile) and obj.user_id is not None:
+            user_ids.add(obj.user_id)
+
+    for user_id in user_ids:
+        user = session.identity_map.get(identity_key(User, user_id))
+        if user is not None and user in session.new:
+            continue  # inserted with the default version
+        if user is not None and "data_version" not in inspect(user).unloaded:
+            # A plain value rides along in the user's UPDATE and stays loaded afterwards
+            # (async sessions can't lazy-load an expired attribute)
+            user.data_version += 1
+        else:
+            session.connection().execute(
+                update(User.__table__).where(User.__table__.c.id == user_id)
+                .values(data_version=User.__table__.c.data_version + 1)
+            )
+            if user is not None:
+                session.expire(user, ["data_version"])
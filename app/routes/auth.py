@@ -1,18 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from pydantic import TypeAdapter
+from datetime import datetime
 import random
 import string
+import uuid
 
-from ..core.database import get_db
-from ..core.security import verify_password, create_access_token, get_password_hash, get_current_user
+from ..core.database import get_async_db
+from ..core.replicas import get_read_db
+from ..core.security import (
+    cache_user_snapshot,
+    get_current_user,
+    get_token_claims,
+    invalidate_user_cache,
+)
+from ..core.hashing import password_hasher
 from ..core.config import settings
-from ..core.email import send_verification_email, send_welcome_email
+from ..core.logging import get_logger
+from ..core.sql_audit import query_budget
+from ..core.etag import conditional_get, make_etag
+from ..core import otp
+from ..core.otp import one_time_codes
+from ..core.revocation import revocation_list
+from ..services.login_lookup import find_user_by_login
+from ..services.usernames import add_user_with_unique_username, username_base_from_email
+from ..services.email_outbox import email_dispatcher, enqueue_verification_email, enqueue_welcome_email
+from ..services.last_login import last_login_buffer
+from ..services.sessions import refresh_sessions
+from ..utils.helpers import parse_uuid
 
 from ..models.user import User, UserProfile
-from ..schemas.auth import LoginResponse, TokenData
+from ..schemas.auth import LoginResponse, RefreshRequest, TokenData
 from ..schemas.user import (
+    CurrentUser,
     UserResponseData, 
     UserResponse, 
     UserCreate, 
@@ -22,9 +46,20 @@ from ..schemas.user import (
     StepCompletionResponse,
     ResendVerification,
     EmailCheck,
-    EmailExists
+    EmailExists,
+    MeAddress,
+    MeProfile,
+    MeResponse,
+    MeSocial,
+    MeUser,
 )
 
+logger = get_logger("auth")
+
+# Built once at import; /auth/me serializes through it directly instead of FastAPI's
+# jsonable_encoder + response_model validation pass
+me_response_adapter = TypeAdapter(MeResponse)
+
 router = APIRouter(
     prefix="/auth",
     tags=["Authentication"],
@@ -35,13 +70,17 @@ router = APIRouter(
     "/signup/initial", 
     response_model=StepCompletionResponse,
     status_code=status.HTTP_201_CREATED,
-    description="Step 1: Initial signup with email and password"
+    description="Step 1: Initial signup with email and password",
+    # email check, code (table OTP backend), username prefix query, savepoint + user insert,
+    # profile, outbox
+    dependencies=[Depends(query_budget(8))],
 )
-async def initial_signup(user_data: InitialSignup, db: Session = Depends(get_db)):
+async def initial_signup(user_data: InitialSignup, db: AsyncSession = Depends(get_async_db)):
     """First step: Create an account with just email and password"""
     try:
         # Check if email already exists
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
+        result = await db.execute(select(User).where(User.email == user_data.email))
+        existing_user = result.scalars().first()
         
         if existing_user:
             raise HTTPException(
@@ -49,24 +88,11 @@ async def initial_signup(user_data: InitialSignup, db: Session = Depends(get_db)
                 detail="Email already registered"
             )
         
-        # Extract username from email
-        email_parts = user_data.email.split('@')
-        username = email_parts[0]
-        
-        # Check if username already exists
-        username_count = 0
-        base_username = username
-        
-        while db.query(User).filter(User.username == username).first():
-            username_count += 1
-            username = f"{base_username}{username_count}"
-            
         # Create new user with minimal information
         user = User(
+            id=uuid.uuid4(),
             email=user_data.email,
-            username=username,
-            first_name=username,  # Default first name from email username
-            hashed_password=get_password_hash(user_data.password),
+            hashed_password=await password_hasher.hash(user_data.password),
             is_client=user_data.is_client,  # Set is_client based on input
 
             is_active=False,  # Will be true after OTP verification
@@ -74,39 +100,28 @@ async def initial_signup(user_data: InitialSignup, db: Session = Depends(get_db)
             profile_completed=False
         )
         
-        # Generate verification code
-        verification_code = ''.join(random.choices(string.digits, k=6))
-        user.verification_code = verification_code
-        user.verification_code_expires = datetime.utcnow() + timedelta(minutes=30)
-        
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-        
+        # Issued before this session writes anything: the table OTP backend commits on its
+        # own connection, which would wait on our write lock under SQLite
+        verification_code = await one_time_codes.issue("verify_email", str(user.id))
+
+        # Username comes from the email local part, with a numeric suffix if it is taken
         try:
-            print(f"Attempting to send verification email to: {user.email}")
-            print(f"Verification code: {verification_code}")
-            print(f"User ID: {str(user.id)}")
-            
-            # Check email configuration
-            print(f"Email settings:")
-            print(f"  HOST: {settings.EMAIL_HOST}")
-            print(f"  PORT: {settings.EMAIL_PORT}")
-            print(f"  USERNAME: {settings.EMAIL_USERNAME[:3]}...{settings.EMAIL_USERNAME[-8:] if len(settings.EMAIL_USERNAME) > 10 else ''}")  # Partial display for security
-            print(f"  PASSWORD SET: {'Yes' if settings.EMAIL_PASSWORD else 'No'}")
-            
-            result = await send_verification_email(user.email, verification_code, str(user.id))
-            
-            if result:
-                print(f"✅ Verification email successfully sent to {user.email}")
-            else:
-                print(f"❌ Failed to send verification email to {user.email} (send_email_async returned False)")
-        except Exception as email_error:
-            print(f"❌ Error sending verification email: {str(email_error)}")
-            import traceback
-            traceback.print_exc()
+            await add_user_with_unique_username(db, user, username_base_from_email(user_data.email))
+        except IntegrityError:
+            # A concurrent signup registered the same email first
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
+        user.first_name = user.username  # Default first name from email username
 
-        print(f"VERIFICATION CODE for {user.email}: {verification_code}")
+        # Queue the email in the same transaction as the user
+        enqueue_verification_email(db, user.email, verification_code, str(user.id))
+        await db.commit()
+
+        # Delivery happens in the background dispatcher, not in this request
+        email_dispatcher.wake()
+        logger.info("Verification email queued for %s", user.email, extra={"user_id": str(user.id)})
         
         return StepCompletionResponse(
             message="Account created. Please verify your email.",
@@ -115,74 +130,76 @@ async def initial_signup(user_data: InitialSignup, db: Session = Depends(get_db)
             user_id=str(user.id)
         )
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
-        print(f"Error in initial_signup: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        await db.rollback()
+        logger.exception("Error in initial_signup: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred: {str(e)}"
         )
 
-@router.post("/verify-email", response_model=StepCompletionResponse)
-async def verify_email(verification: VerifyEmail, db: Session = Depends(get_db)):
+# user, code lookup + delete (table OTP backend), profile, user update, profile insert, outbox
+@router.post("/verify-email", response_model=StepCompletionResponse, dependencies=[Depends(query_budget(7))])
+async def verify_email(verification: VerifyEmail, db: AsyncSession = Depends(get_async_db)):
     """Verify user's email with OTP code"""
-    user = db.query(User).filter(User.id == verification.user_id).first()
+    user_id = parse_uuid(verification.user_id)
+    user = await db.get(User, user_id) if user_id else None
     
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-        
-    if user.verification_code != verification.verification_code:
+
+    if user.is_active:
+        # A repeated submit after the code was used
+        return StepCompletionResponse(
+            message="User is already verified.",
+            success=True,
+            next_step="complete_profile",
+            user_id=str(user.id)
+        )
+
+    outcome = await one_time_codes.verify("verify_email", str(user.id), verification.verification_code)
+    if outcome == otp.INVALID:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid verification code"
         )
-        
-    if user.verification_code_expires and user.verification_code_expires < datetime.utcnow():
+    if outcome == otp.LOCKED:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many incorrect codes. Please request a new code.",
+            headers={"X-Error-Code": "TOO_MANY_ATTEMPTS"}
+        )
+    if outcome == otp.EXPIRED:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Verification code expired. Please request a new code.",
             headers={"X-Error-Code": "EXPIRED_CODE"}
         )
-        
-    # Mark user as active and clear verification code
+
+    # Mark user as active; the code was used up by the check above
     user.is_active = True
-    user.verification_code = None
-    user.verification_code_expires = None
-    
+
     # Create an empty profile record if one doesn't exist yet
-    profile = db.query(UserProfile).filter(UserProfile.user_id == user.id).first()
+    result = await db.execute(select(UserProfile).where(UserProfile.user_id == user.id))
+    profile = result.scalars().first()
     if not profile:
         profile = UserProfile(user_id=user.id)
         db.add(profile)
     
-    db.commit()
-    
-    # Send welcome email with a new OTP for additional security
-    try:
-        # Generate a welcome OTP
-        welcome_otp = ''.join(random.choices(string.digits, k=6))
-        
-        # Store the welcome OTP in the user's record 
-        # (optional - if you want to verify this later)
-        user.welcome_otp = welcome_otp
-        db.commit()
-        
-        user_name = user.first_name or user.username
-        await send_welcome_email(
-            user.email, 
-            user_name,
-            welcome_otp  # Pass the OTP to the welcome email function
-        )
-        print(f"Welcome email with OTP sent to {user.email}")
-    except Exception as e:
-        print(f"Failed to send welcome email: {str(e)}")
-        import traceback
-        traceback.print_exc()
+    # Queue a welcome email with a new OTP, committed together with the activation
+    welcome_otp = ''.join(random.choices(string.digits, k=6))
+    user_name = user.first_name or user.username
+    enqueue_welcome_email(db, user.email, user_name, welcome_otp)
+
+    await db.commit()
+    await invalidate_user_cache(user.username)
+    email_dispatcher.wake()
     
     return StepCompletionResponse(
         message="Email verified successfully.",
@@ -191,51 +208,43 @@ async def verify_email(verification: VerifyEmail, db: Session = Depends(get_db))
         user_id=str(user.id)
     )
 
-@router.post("/login", response_model=LoginResponse)
+# User lookup, refresh token row
+@router.post("/login", response_model=LoginResponse, dependencies=[Depends(query_budget(2))])
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        print(f"Attempting login for username: {form_data.username}")
-        
-        # Try to find user by username or email
-        user = db.query(User).filter(
-            (User.email == form_data.username) | 
-            (User.username == form_data.username)
-        ).first()
+        logger.debug("Attempting login for %s", form_data.username)
         
-        # If phone is provided, also check that
-        if not user and form_data.username.replace('+', '').isdigit():
-            user = db.query(User).filter(User.phone == form_data.username).first()
+        # Email, phone or username, each resolved through its own index
+        user = await find_user_by_login(db, form_data.username)
         
         if not user:
-            print(f"User not found: {form_data.username}")
+            logger.info("Login failed, user not found: %s", form_data.username)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
             
-        if not verify_password(form_data.password, user.hashed_password):
-            print(f"Password verification failed for: {form_data.username}")
+        valid, needs_update = await password_hasher.verify_and_check(form_data.password, user.hashed_password)
+        if not valid:
+            logger.info("Login failed, wrong password for %s", form_data.username)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        if needs_update and settings.PASSWORD_REHASH_ON_LOGIN:
+            # Older scheme or cost: redo it under the current policy once we've answered
+            password_hasher.rehash_later(user.id, form_data.password, user.hashed_password)
         
-        # Update last login time
-        user.last_login = datetime.utcnow()
-        db.commit()
+        # Written behind in batches, so a login never waits on a commit
+        last_login_buffer.record(user.id)
         
-        # Create access token (without referencing role which doesn't exist in your model)
-        access_token = create_access_token(
-            data={
-                "sub": user.username,
-                "email": user.email
-            }
-        )
+        # Short-lived access token plus the refresh token that renews it
+        tokens = await refresh_sessions.open(user.id, user.username, user.email)
         
         # Create full name from first and last name if both exist
         full_name = None
@@ -244,15 +253,17 @@ async def login(
             last_name = user.last_name or ""
             full_name = f"{first_name} {last_name}".strip() or None
         
-        print(f"Login successful for user: {user.username}")
+        logger.info("Login successful for %s", user.username, extra={"user_id": str(user.id)})
         
         # Return user information based on your actual model
         return LoginResponse(
             message="Login successful",
             token=TokenData(
-                access_token=access_token,
+                access_token=tokens.access_token,
                 token_type="bearer",
-                username=user.username
+                username=user.username,
+                refresh_token=tokens.refresh_token,
+                expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
             ),
             user={
                 "id": str(user.id),
@@ -271,73 +282,134 @@ async def login(
     except HTTPException as e:
         raise e
     except Exception as e:
-        print(f"Login error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Login error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred during login"
         )
 
-@router.get("/me", response_model=dict)
-async def get_current_user_info(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+# Spend the token (returning its user), user lookup, next token row; a reused token
+# instead costs a lookup, the revocation and the session's rows
+@router.post("/refresh", response_model=TokenData, dependencies=[Depends(query_budget(4))])
+async def refresh(body: RefreshRequest):
+    """Trade a refresh token for a new access and refresh token pair"""
+    tokens = await refresh_sessions.refresh(body.refresh_token)
+    if tokens is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token is invalid, expired or already used",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return TokenData(
+        access_token=tokens.access_token,
+        token_type="bearer",
+        username=tokens.username,
+        refresh_token=tokens.refresh_token,
+        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    )
+
+# The user snapshot usually comes from cache; ending sessions costs the rest
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    everywhere: bool = False,
+    claims: dict = Depends(get_token_claims),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    # Get profile data
-    profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-    
-    # Construct full_name from first_name and last_name
+    """
+    End this session, or with everywhere=true every session of the user. Its access
+    tokens stop working at once here and within REVOCATION_SYNC_SECONDS elsewhere.
+    """
+    if everywhere:
+        ended = await refresh_sessions.end_all(current_user.id)
+        logger.info("Logged out %d sessions of %s", ended, current_user.username, extra={"user_id": str(current_user.id)})
+    if claims.get("sid"):
+        await refresh_sessions.end(claims["sid"])
+    elif claims.get("jti"):
+        # Issued before sessions existed: only this token can be revoked
+        await revocation_list.revoke(claims["jti"], datetime.utcfromtimestamp(claims["exp"]))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+def build_me_response(user: User) -> MeResponse:
+    """Shape a User (with its profile loaded) into the /auth/me payload"""
     full_name = None
-    if current_user.first_name or current_user.last_name:
-        full_name = f"{current_user.first_name or ''} {current_user.last_name or ''}".strip()
-    
-    user_data = {
-        "id": str(current_user.id),
-        "username": current_user.username,
-        "email": current_user.email,
-        "first_name": current_user.first_name,
-        "last_name": current_user.last_name,
-        "full_name": full_name,  # Calculate the full_name instead of trying to access it
-        "role": current_user.role,
-        "phone": current_user.phone,
-        "is_active": current_user.is_active,
-        "is_verified": current_user.is_verified,
-        "profile_completed": current_user.profile_completed,
-    }
-    
-    # Add profile data if available
-    if profile:
-        user_data["profile"] = {
-            "bio": profile.bio,
-            "skills": profile.skills,
-            "years_experience": profile.years_experience,
-            "education": profile.education,
-            "address": {
-                "street": profile.street,
-                "city": profile.city,
-                "state": profile.state,
-                "country": profile.country,
-                "zip": profile.zip,
-                "full_address": profile.full_address
-            } if profile.street else None,
-            "social": {
-                "website": profile.website,
-                "linkedin": profile.linkedin,
-                "github": profile.github
-            },
-            "languages": profile.languages,
-            "availability": profile.availability
-        }
-    
-    # Return in the same format as login endpoint for consistency
-    return {
-        "user": user_data
-    }
-@router.post("/resend-verification", response_model=StepCompletionResponse)
-async def resend_verification(resend_data: ResendVerification, db: Session = Depends(get_db)):
+    if user.first_name or user.last_name:
+        full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
+
+    profile = None
+    if user.profile is not None:
+        p = user.profile
+        profile = MeProfile(
+            bio=p.bio,
+            skills=p.skills,
+            profile_image=p.profile_image,
+            address=MeAddress(
+                street=p.street,
+                city=p.city,
+                state=p.state,
+                country=p.country,
+                zip=p.zip,
+                full_address=p.get_full_address(),
+            ) if any((p.street, p.city, p.state, p.country, p.zip)) else None,
+            social=MeSocial(website=p.website, linkedin=p.linkedin, github=p.github, twitter=p.twitter),
+        )
+
+    return MeResponse(user=MeUser(
+        id=str(user.id),
+        username=user.username,
+        email=user.email,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        full_name=full_name,
+        role="client" if user.is_client else "freelancer",
+        phone=user.phone,
+        is_active=user.is_active,
+        is_verified=user.is_verified,
+        profile_completed=user.profile_completed,
+        profile=profile,
+    ))
+
+async def me_etag(current_user: CurrentUser = Depends(get_current_user)) -> str:
+    """/auth/me's ETag from the cached user snapshot, so a 304 costs no queries"""
+    return make_etag("me", current_user.id.hex, current_user.data_version)
+
+@router.get("/me", response_model=MeResponse, dependencies=[Depends(query_budget(2))])
+async def get_current_user_info(
+    current_user: CurrentUser = Depends(get_current_user),
+    etag: str = Depends(conditional_get(me_etag)),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # The client's copy is stale (or missing): user and profile in one round-trip
+    result = await db.execute(
+        select(User).options(joinedload(User.profile)).where(User.id == current_user.id)
+    )
+    user = result.scalars().first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # The row may differ from the cached snapshot; the ETag must describe this body
+    if user.data_version != current_user.data_version:
+        etag = make_etag("me", user.id.hex, user.data_version)
+        # Only a primary read may refresh the shared snapshot; a replica's can be behind it
+        if not db.info.get("read_only"):
+            await cache_user_snapshot(CurrentUser.model_validate(user))
+
+    # Serialize straight to JSON bytes, skipping FastAPI's jsonable_encoder pass
+    return Response(
+        content=me_response_adapter.dump_json(build_me_response(user)),
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"},
+    )
+
+# user, code (table OTP backend), outbox; the users row isn't written
+@router.post("/resend-verification", response_model=StepCompletionResponse, dependencies=[Depends(query_budget(3))])
+async def resend_verification(resend_data: ResendVerification, db: AsyncSession = Depends(get_async_db)):
     """Resend verification code to the user's email"""
-    user = db.query(User).filter(User.id == resend_data.user_id).first()
+    user_id = parse_uuid(resend_data.user_id)
+    user = await db.get(User, user_id) if user_id else None
     
     if not user:
         raise HTTPException(
@@ -354,20 +426,13 @@ async def resend_verification(resend_data: ResendVerification, db: Session = Dep
             user_id=str(user.id)
         )
     
-    # Generate new verification code
-    verification_code = ''.join(random.choices(string.digits, k=6))
-    user.verification_code = verification_code
-    user.verification_code_expires = datetime.utcnow() + timedelta(minutes=30)
-    
-    db.commit()
-    
-    # Print the verification code to terminal (for development purposes)
-    print("=" * 50)
-    print(f"RESENT VERIFICATION CODE for {user.email}: {verification_code}")
-    print("=" * 50)
+    # Replaces the previous code and its attempt count
+    verification_code = await one_time_codes.issue("verify_email", str(user.id))
+    enqueue_verification_email(db, user.email, verification_code, str(user.id))
     
-    # In a real implementation, you would send an email here
-    # send_email(user.email, "Your verification code", f"Your code is {verification_code}")
+    await db.commit()
+    email_dispatcher.wake()
+    logger.info("Verification email re-queued for %s", user.email, extra={"user_id": str(user.id)})
     
     return StepCompletionResponse(
         message="Verification code resent. Please check your email.",
@@ -376,12 +441,13 @@ async def resend_verification(resend_data: ResendVerification, db: Session = Dep
         user_id=str(user.id)
     )
 
-@router.post("/check-email", response_model=EmailExists)
-async def check_email_exists(data: EmailCheck, db: Session = Depends(get_db)):
+@router.post("/check-email", response_model=EmailExists, dependencies=[Depends(query_budget(1))])
+async def check_email_exists(data: EmailCheck, db: AsyncSession = Depends(get_read_db)):
     """Check if an email is already registered"""
     try:
         # Check if email already exists
-        existing_user = db.query(User).filter(User.email == data.email).first()
+        result = await db.execute(select(User).where(User.email == data.email))
+        existing_user = result.scalars().first()
         
         if existing_user:
             return EmailExists(
@@ -396,9 +462,7 @@ async def check_email_exists(data: EmailCheck, db: Session = Depends(get_db)):
             is_active=None  # No account, so no activation status
         )
     except Exception as e:
-        print(f"Error in check_email_exists: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in check_email_exists: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred: {str(e)}"
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal, Optional
+from ..core.replicas import get_read_db
+from ..core.security import get_current_user
+from ..core.sql_audit import query_budget
+from ..schemas.freelancer import FreelancerSearchResponse
+from ..schemas.user import CurrentUser
+from ..services.freelancer_search import resolve_filters, search_facets, search_freelancers
+from ..utils.helpers import parse_uuid
+
+router = APIRouter(
+    prefix="/freelancers",
+    tags=["Freelancers"],
+    responses={401: {"description": "Unauthorized"}}
+)
+
+search_response_adapter = TypeAdapter(FreelancerSearchResponse)
+
+
+@router.get(
+    "/search",
+    response_model=FreelancerSearchResponse,
+    # user (on a cache miss), skill names, the page, and four facet queries on a cold cache
+    dependencies=[Depends(query_budget(7))],
+)
+async def search(
+    skills: Optional[str] = Query(None, description="Comma-separated skill names"),
+    match: Literal["all", "any"] = Query("all", description="Require every skill, or any of them"),
+    city: Optional[str] = Query(None, max_length=50),
+    country: Optional[str] = Query(None, max_length=50),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    facets: bool = Query(True, description="Include facet counts (first page only)"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Search active freelancers by skills and location, paged by cursor"""
+    after = None
+    if cursor is not None:
+        after = parse_uuid(cursor)
+        if after is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    filters = await resolve_filters(db, skills, match == "all", city, country)
+    results, next_cursor = await search_freelancers(db, filters, after, limit)
+    response = FreelancerSearchResponse(
+        results=results,
+        next_cursor=next_cursor,
+        facets=await search_facets(db, filters) if facets and after is None else None,
+    )
+    return Response(content=search_response_adapter.dump_json(response), media_type="application/json")
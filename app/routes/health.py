@@ -1,37 +1,37 @@
-from fastapi import APIRouter, HTTPException
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import OperationalError
+from fastapi import APIRouter, Response, status
 from ..core.config import settings
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import os
+from ..core.hashing import password_hasher
+from ..core.email import peek_email_client
+from ..core.replicas import replica_pool
+from ..core.revocation import revocation_list
+from ..services.health_monitor import health_monitor
+from ..services.images import image_processor
 
 router = APIRouter(
     prefix="/health",
     tags=["Health"],
 )
 
-# Database connection check
-def check_database_connection():
-    try:
-        engine = create_engine(settings.DATABASE_URL)
-        with engine.connect() as connection:
-            connection.execute(text("SELECT 1"))  # Use `text()` for raw SQL execution
-        return True, None
-    except OperationalError as e:
-        return False, str(e)
+# Settings don't change at runtime, so this only needs computing once
+missing_env_vars = [key for key, value in settings.model_dump().items() if value is None]
 
+@router.get("/live")
+async def liveness():
+    """
+    Liveness probe: the process is up and serving requests. Touches no dependencies.
+    """
+    return {"status": "alive"}
 
-# Email server connection check
-def check_email_server():
-    try:
-        with smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT) as server:
-            server.starttls()  # Start TLS encryption
-            server.login(settings.EMAIL_USERNAME, settings.EMAIL_PASSWORD)  # Attempt login
-        return True
-    except Exception as e:
-        return False, str(e)
+@router.get("/ready")
+async def readiness(response: Response):
+    """
+    Readiness probe: cached dependency checks; 503 while the database is unreachable.
+    """
+    checks = await health_monitor.get()
+    ready = health_monitor.ready
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "ready" if ready else "not_ready", "checks": checks}
 
 @router.get("")
 async def health_check():
@@ -39,23 +39,17 @@ async def health_check():
     Health check endpoint that verifies the API is running, checks database,
     email server, and environment variables.
     """
+    checks = await health_monitor.get()
     health_status = {
         "status": "healthy",
         "version": "1.0.0",
         "app_name": settings.APP_NAME,
         "environment": settings.ENVIRONMENT,
+        "database": checks.get("database"),
+        "email_server": checks.get("email_server"),
     }
 
-    # Check Database connection
-    db_status, db_error = check_database_connection()
-    health_status["database"] = {"status": "healthy" if db_status else "unhealthy", "error": db_error if not db_status else None}
-
-    # Check Email server
-    email_status, email_error = check_email_server()
-    health_status["email_server"] = {"status": "healthy" if email_status else "unhealthy", "error": email_error if not email_status else None}
-
     # Check environment variables (example)
-    missing_env_vars = [key for key, value in settings.dict().items() if value is None]
     if missing_env_vars:
         health_status["environment_variables"] = {
             "status": "unhealthy",
@@ -64,4 +58,22 @@ async def health_check():
     else:
         health_status["environment_variables"] = {"status": "healthy"}
 
+    # Password hashing pool queue depth and wait times
+    health_status["password_hasher"] = password_hasher.stats()
+
+    # Thumbnail process pool
+    health_status["image_processor"] = image_processor.stats()
+
+    # Pooled SMTP connections used for outgoing email, where this process sends any
+    email_client = peek_email_client()
+    if email_client is not None:
+        health_status["email_pool"] = email_client.pool.stats()
+
+    # In-memory token revocation list: size, filter shape, last sync
+    health_status["token_revocations"] = revocation_list.stats()
+
+    # Read replicas and their last measured lag
+    if replica_pool.enabled:
+        health_status["replicas"] = replica_pool.stats()
+
     return health_status
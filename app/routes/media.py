@@ -0,0 +1,43 @@
+import re
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse, StreamingResponse
+from ..core.etag import conditional_get, make_etag
+from ..core.storage import IMMUTABLE_CACHE_CONTROL, get_storage
+
+router = APIRouter(
+    prefix="/media",
+    tags=["Media"],
+)
+
+# Only content-addressed keys: originals and their thumbnails
+MEDIA_KEY = re.compile(r"images/[0-9a-f]{64}(\.(jpg|png|webp|gif)|/[0-9]+\.webp)")
+
+
+async def media_etag(key: str) -> str:
+    """A key names its content, so it is the ETag; no storage lookup for a 304"""
+    if not MEDIA_KEY.fullmatch(key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return make_etag("media", key)
+
+@router.get("/{key:path}")
+async def get_media(key: str, etag: str = Depends(conditional_get(media_etag, IMMUTABLE_CACHE_CONTROL))):
+    """
+    Uploaded images, cacheable for good (a new image gets a new URL). When
+    MEDIA_BASE_URL points elsewhere, clients fetch from there instead.
+    """
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    storage = get_storage()
+
+    path = storage.local_path(key)
+    if path is not None:
+        return FileResponse(path, headers=headers)
+
+    stored = await storage.get(key)
+    if stored is None:
+        # Thumbnails appear a moment after their upload; don't let a 404 stick
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Not found", headers={"Cache-Control": "no-store"}
+        )
+    return StreamingResponse(
+        stored.chunks, media_type=stored.content_type, headers={**headers, "Content-Length": str(stored.size)}
+    )
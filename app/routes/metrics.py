@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Response
+from ..core.email import peek_email_client
+from ..core.hashing import password_hasher
+from ..core.metrics import email_pool_open, password_hash_pending, registry
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus scrape endpoint (text exposition format).
+    """
+    # Point-in-time gauges are read from their owners at scrape time
+    password_hash_pending.set(password_hasher.stats()["pending"])
+    # Processes without the outbox dispatcher never build the email client
+    email_client = peek_email_client()
+    email_pool_open.set(email_client.pool.stats()["open"] if email_client is not None else 0)
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
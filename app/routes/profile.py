@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
-from sqlalchemy.orm import Session
-from ..core.database import get_db
-from ..core.security import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Request, status, File, UploadFile
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..core.database import get_async_db
+from ..core.logging import get_logger
+from ..core.security import get_current_user, invalidate_user_cache
+from ..core.sql_audit import query_budget
+from ..core.storage import get_storage
 from ..models.user import User, UserProfile
-from ..schemas.profile import ProfileUpdate, ProfileResponse
+from ..schemas.profile import ProfileImageResponse, ProfileUpdate, ProfileResponse
+from ..schemas.user import CurrentUser
+from ..services.images import image_key, image_processor, media_url, receive_upload, thumbnail_key
+from ..services.skills import parse_skills, sync_user_skills
 from typing import Optional
 import os
 
@@ -13,29 +21,42 @@ router = APIRouter(
     responses={401: {"description": "Unauthorized"}}
 )
 
-@router.put("/update", response_model=ProfileResponse)
+logger = get_logger("profile")
+
+# current user (on a cache miss), user, profile, two UPDATEs; changed skills add up to five more
+@router.put("/update", response_model=ProfileResponse, dependencies=[Depends(query_budget(10))])
 async def update_profile(
     profile_data: ProfileUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Update user profile information"""
+    # The dependency returns a cached snapshot; load the row we are going to modify
+    user = await db.get(User, current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
     # Find the user profile or create if it doesn't exist
-    profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
+    result = await db.execute(select(UserProfile).where(UserProfile.user_id == user.id))
+    profile = result.scalars().first()
     
     if not profile:
-        profile = UserProfile(user_id=current_user.id)
+        profile = UserProfile(user_id=user.id)
         db.add(profile)
+    previous_skills = parse_skills(profile.skills)
     
     # Update user info
     if profile_data.first_name:
-        current_user.first_name = profile_data.first_name
+        user.first_name = profile_data.first_name
     
     if profile_data.last_name:
-        current_user.last_name = profile_data.last_name
+        user.last_name = profile_data.last_name
     
     if profile_data.phone:
-        current_user.phone = profile_data.phone
+        user.phone = profile_data.phone
     
     # Update profile fields if provided
     for field in [
@@ -48,17 +69,79 @@ async def update_profile(
     
     # Mark profile as completed if we have the minimum required fields
     if all([
-        current_user.first_name,
-        current_user.last_name,
+        user.first_name,
+        user.last_name,
         profile.bio,
         profile.skills
     ]):
-        current_user.profile_completed = True
+        user.profile_completed = True
+
+    # Keep the normalized skills index in step with the comma-separated column
+    skills = parse_skills(profile.skills)
+    if set(skills) != set(previous_skills):
+        await sync_user_skills(db, user.id, skills)
     
-    db.commit()
+    await db.commit()
+    await invalidate_user_cache(user.username)
     
     return ProfileResponse(
         message="Profile updated successfully",
         success=True,
-        user_id=str(current_user.id)
-    )
\ No newline at end of file
+        user_id=str(user.id)
+    )
+
+# current user (on a cache miss), profile, data_version bump, profile UPDATE or INSERT
+@router.post(
+    "/image",
+    response_model=ProfileImageResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(query_budget(4))],
+)
+async def upload_profile_image(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Set the profile image: a multipart "file" field or a raw JPEG/PNG/WebP/GIF body.
+    Stored once per distinct content; thumbnails are made in the background.
+    """
+    storage = get_storage()
+    upload = await receive_upload(request, storage, settings.IMAGE_MAX_BYTES)
+    try:
+        info = await image_processor.inspect(upload.path)
+        if info is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Upload a JPEG, PNG, WebP or GIF image of at most "
+                       f"{settings.IMAGE_MAX_PIXELS // 1_000_000} megapixels",
+            )
+
+        # Content-addressed: the same image uploaded again (by anyone) is stored once
+        key = image_key(upload.digest, info.extension)
+        if not await storage.exists(key):
+            await storage.put_file(key, upload.path, info.content_type)
+
+        result = await db.execute(select(UserProfile).where(UserProfile.user_id == current_user.id))
+        profile = result.scalars().first()
+        if not profile:
+            profile = UserProfile(user_id=current_user.id)
+            db.add(profile)
+        image_url = media_url(key)
+        profile.profile_image = image_url
+        await db.commit()
+        await invalidate_user_cache(current_user.username)
+    except BaseException:
+        os.unlink(upload.path)
+        raise
+
+    # Hands the spooled file over; it is deleted once the thumbnails are stored
+    image_processor.thumbnail_later(storage, upload.path, upload.digest)
+    logger.info("Profile image %s stored (%d bytes)", key, upload.size, extra={"user_id": str(current_user.id)})
+
+    return ProfileImageResponse(
+        message="Profile image updated",
+        success=True,
+        image_url=image_url,
+        thumbnails={size: media_url(thumbnail_key(upload.digest, size)) for size in image_processor.sizes},
+    )
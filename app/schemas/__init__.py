@@ -1,2 +1,4 @@
-from .user import UserCreate, UserResponse, UserUpdate, UserInDB, UserResponseData, ResendVerification, EmailCheck, EmailExists
-from .auth import Token, TokenData, LoginResponse, InitialSignupRequest, InitialSignupResponse, VerificationRequest, VerificationResponse
\ No newline at end of file
+from .user import CurrentUser, MeResponse, UserCreate, UserResponse, UserUpdate, UserInDB, UserResponseData, ResendVerification, EmailCheck, EmailExists
+from .auth import Token, TokenData, RefreshRequest, LoginResponse, InitialSignupRequest, InitialSignupResponse, VerificationRequest, VerificationResponse
+from .profile import ProfileUpdate, ProfileResponse
+from .freelancer import FreelancerSearchResponse, FreelancerSummary, SearchFacets
@@ -10,6 +10,12 @@ class TokenData(BaseModel):
     access_token: str
     token_type: str = "bearer"
     username: str
+    # Single use: trade it at /auth/refresh for a new pair before the access token expires
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # Seconds the access token is valid for
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class LoginResponse(BaseModel):
     message: str
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from uuid import UUID
+
+class FreelancerSummary(BaseModel):
+    """One freelancer in search results"""
+    id: UUID
+    username: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    bio: Optional[str] = None
+    skills: List[str] = []
+    city: Optional[str] = None
+    country: Optional[str] = None
+    profile_image: Optional[str] = None
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class SearchFacets(BaseModel):
+    """Counts over every match, not just the current page (cached, so approximate)"""
+    total: int
+    skills: List[FacetCount]
+    countries: List[FacetCount]
+    cities: List[FacetCount]
+
+class FreelancerSearchResponse(BaseModel):
+    results: List[FreelancerSummary]
+    # Pass back as ?cursor= for the next page; None on the last page
+    next_cursor: Optional[str] = None
+    # Only on the first page
+    facets: Optional[SearchFacets] = None
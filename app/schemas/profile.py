@@ -0,0 +1,37 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+
+class ProfileUpdate(BaseModel):
+    """Fields a user can update on their profile"""
+    first_name: Optional[str] = Field(None, max_length=50)
+    last_name: Optional[str] = Field(None, max_length=50)
+    phone: Optional[str] = Field(None, pattern=r"^\+?[1-9][0-9]{7,14}$")
+
+    # Professional details
+    bio: Optional[str] = Field(None, max_length=500)
+    skills: Optional[str] = Field(None, max_length=500)  # Comma-separated values
+
+    # Address
+    street: Optional[str] = Field(None, max_length=100)
+    city: Optional[str] = Field(None, max_length=50)
+    state: Optional[str] = Field(None, max_length=50)
+    country: Optional[str] = Field(None, max_length=50)
+    zip: Optional[str] = Field(None, max_length=20)
+
+    # Social links
+    website: Optional[str] = Field(None, max_length=255)
+    linkedin: Optional[str] = Field(None, max_length=255)
+    github: Optional[str] = Field(None, max_length=255)
+    twitter: Optional[str] = Field(None, max_length=255)
+
+class ProfileResponse(BaseModel):
+    message: str
+    success: bool
+    user_id: Optional[str] = None
+
+class ProfileImageResponse(BaseModel):
+    message: str
+    success: bool
+    image_url: str
+    # Square thumbnails by edge length; they appear shortly after the upload returns
+    thumbnails: Dict[int, str]
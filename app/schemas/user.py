@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr, Field, validator
 from typing import Optional, List, Dict, Any
 import re
+import uuid
 
 class AddressCreate(BaseModel):
     street: str
@@ -124,6 +125,62 @@ class UserResponse(BaseModel):
     user: Optional[UserResponseData] = None
     error: Optional[str] = None
 
+class CurrentUser(BaseModel):
+    """Compact snapshot of the authenticated user, safe to cache between requests"""
+    id: uuid.UUID
+    username: str
+    email: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    phone: Optional[str] = None
+    is_client: bool
+    is_active: bool
+    is_verified: bool
+    profile_completed: bool
+    data_version: int = 1
+
+    class Config:
+        from_attributes = True
+
+class MeAddress(BaseModel):
+    street: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    country: Optional[str] = None
+    zip: Optional[str] = None
+    full_address: Optional[str] = None
+
+class MeSocial(BaseModel):
+    website: Optional[str] = None
+    linkedin: Optional[str] = None
+    github: Optional[str] = None
+    twitter: Optional[str] = None
+
+class MeProfile(BaseModel):
+    bio: Optional[str] = None
+    skills: Optional[str] = None  # Comma-separated values
+    profile_image: Optional[str] = None
+    address: Optional[MeAddress] = None
+    social: MeSocial
+
+class MeUser(BaseModel):
+    id: str
+    username: str
+    email: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    full_name: Optional[str] = None
+    role: str  # "client" or "freelancer", derived from is_client
+    phone: Optional[str] = None
+    is_active: bool
+    is_verified: bool
+    profile_completed: bool
+    profile: Optional[MeProfile] = None
+
+class MeResponse(BaseModel):
+    """GET /auth/me, in the same shape as the login response's user"""
+    user: MeUser
+
 class UserUpdate(BaseModel):
     firstName: Optional[str] = None
     lastName: Optional[str] = None
@@ -0,0 +1,313 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal, async_engine
+from ..core.email import get_email_client
+from ..core.logging import logger
+from ..models.email import EmailOutbox
+
+# A row stuck in "sending" this long belongs to a dispatcher that died mid-send
+LOCK_TIMEOUT = timedelta(minutes=5)
+# Context keys holding one-time codes; cleared once a row is sent or dead so the
+# outbox never keeps a usable code (the OTP store itself only has HMACs)
+SECRET_CONTEXT_KEYS = ("code", "otp")
+# Templates that are no use without their code; a dead one is never replayed, since its
+# code is gone (and long expired). Others, like the welcome email, render without theirs
+SECRET_TEMPLATES = ("verification_code",)
+
+
+def scrub_context(context: Optional[dict]) -> dict:
+    return {key: value for key, value in (context or {}).items() if key not in SECRET_CONTEXT_KEYS}
+
+
+def enqueue_email(db: AsyncSession, to_email: str, subject: str, template_name: str, **context) -> EmailOutbox:
+    """Add an email to the outbox; it is delivered once the caller commits"""
+    email = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        template_name=template_name,
+        context=context,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(email)
+    return email
+
+def enqueue_verification_email(db: AsyncSession, to_email: str, code: str, user_id: Optional[str] = None) -> EmailOutbox:
+    """Queue the verification code email"""
+    return enqueue_email(
+        db,
+        to_email=to_email,
+        subject="Your Lanceraa Verification Code",
+        template_name="verification_code",
+        code=code,
+        user_id=user_id,
+        app_name="Lanceraa",
+        support_email=settings.SUPPORT_EMAIL
+    )
+
+def enqueue_welcome_email(db: AsyncSession, to_email: str, user_name: str, otp: Optional[str] = None) -> EmailOutbox:
+    """Queue the welcome email sent after verification"""
+    return enqueue_email(
+        db,
+        to_email=to_email,
+        subject="Welcome to Lanceraa!",
+        template_name="welcome",
+        user_name=user_name,
+        app_name=settings.APP_NAME,
+        support_email=settings.SUPPORT_EMAIL,
+        otp=otp
+    )
+
+
+class EmailDispatcher:
+    """Background worker that delivers outbox rows with retry and dead-lettering"""
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        client=None,
+        concurrency: int = 4,
+        batch_size: int = 20,
+        poll_interval: float = 5,
+        max_attempts: int = 6,
+        backoff_base: float = 30,
+        backoff_max: float = 3600,
+        retention: timedelta = timedelta(days=7),
+        purge_seconds: float = 3600,
+    ):
+        self.session_factory = session_factory
+        # None: the shared client, looked up on first delivery
+        self._client = client
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retention = retention
+        self.purge_seconds = purge_seconds
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._purge_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def client(self):
+        return self._client if self._client is not None else get_email_client()
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="email-dispatcher")
+            self._purge_task = asyncio.create_task(self._purge_forever(), name="email-outbox-purge")
+
+    async def stop(self, timeout: float = 10):
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+            try:
+                await self._purge_task
+            except asyncio.CancelledError:
+                pass
+            self._purge_task = None
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self._task = None
+
+    def wake(self):
+        """Skip the rest of the poll interval, e.g. right after enqueueing"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        logger.info("Email dispatcher started")
+        while not self._stopping:
+            try:
+                sent = await self.dispatch_once()
+            except Exception as e:
+                logger.exception("Email dispatcher error: %s", e)
+                sent = 0
+
+            # Keep draining while there is work, otherwise sleep until woken or polled
+            if sent == 0 and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+        logger.info("Email dispatcher stopped")
+
+    async def dispatch_once(self) -> int:
+        """Claim and deliver one batch of due emails; returns how many were claimed"""
+        emails = await self._claim()
+        if not emails:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._deliver(email, semaphore) for email in emails))
+        await self._record(zip(emails, results))
+        return len(emails)
+
+    async def _claim(self):
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            query = (
+                select(EmailOutbox)
+                .where(or_(
+                    and_(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now),
+                    and_(EmailOutbox.status == "sending", EmailOutbox.locked_at < now - LOCK_TIMEOUT),
+                ))
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(self.batch_size)
+                # Lets several workers share the outbox on Postgres; ignored by SQLite
+                .with_for_update(skip_locked=True)
+            )
+            emails = (await db.execute(query)).scalars().all()
+            for email in emails:
+                email.status = "sending"
+                email.locked_at = now
+            await db.commit()
+            return emails
+
+    async def _deliver(self, email: EmailOutbox, semaphore: asyncio.Semaphore) -> Optional[str]:
+        async with semaphore:
+            try:
+                await self.client.deliver(email.to_email, email.subject, email.template_name, **(email.context or {}))
+                return None
+            except Exception as e:
+                return f"{type(e).__name__}: {e}"
+
+    def _backoff(self, attempts: int) -> timedelta:
+        # Exponential backoff with jitter so failed batches don't retry in lockstep
+        delay = min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    async def _record(self, results: Iterable):
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            for email, error in results:
+                values = {"locked_at": None, "attempts": email.attempts + 1}
+                if error is None:
+                    values.update(status="sent", sent_at=now, last_error=None, context=scrub_context(email.context))
+                elif values["attempts"] >= self.max_attempts:
+                    # A replayed dead email would carry an unusable code anyway; the user asks for a new one
+                    values.update(status="dead", last_error=error, context=scrub_context(email.context))
+                    logger.error("Email %s to %s dead-lettered: %s", email.id, email.to_email, error)
+                else:
+                    values.update(
+                        status="pending",
+                        last_error=error,
+                        next_attempt_at=now + self._backoff(values["attempts"]),
+                    )
+                    logger.warning("Email %s attempt %s failed: %s", email.id, values["attempts"], error)
+                await db.execute(update(EmailOutbox).where(EmailOutbox.id == email.id).values(**values))
+            await db.commit()
+
+    async def requeue_dead(self, ids: Optional[list] = None) -> int:
+        """
+        Move dead-lettered emails back to pending so they are replayed. Emails whose
+        template needs a one-time code (SECRET_TEMPLATES) stay dead: the code was scrubbed
+        when they died, so the user has to ask for a new one instead.
+        """
+        dead = [EmailOutbox.status == "dead"]
+        if ids:
+            dead.append(EmailOutbox.id.in_(ids))
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(EmailOutbox)
+                .where(*dead, EmailOutbox.template_name.notin_(SECRET_TEMPLATES))
+                .values(status="pending", attempts=0, next_attempt_at=datetime.utcnow(), last_error=None)
+            )
+            skipped = (await db.execute(
+                select(func.count()).select_from(EmailOutbox)
+                .where(*dead, EmailOutbox.template_name.in_(SECRET_TEMPLATES))
+            )).scalar()
+            await db.commit()
+        if skipped:
+            logger.warning("Left %d dead emails unreplayed: their one-time codes are gone", skipped)
+        self.wake()
+        return result.rowcount
+
+    async def purge_finished(self) -> int:
+        """Delete sent and dead rows older than the retention period; returns how many went"""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                delete(EmailOutbox).where(
+                    EmailOutbox.status.in_(("sent", "dead")),
+                    EmailOutbox.created_at < datetime.utcnow() - self.retention,
+                )
+            )
+            await db.commit()
+        return result.rowcount
+
+    async def _purge_forever(self):
+        while True:
+            await asyncio.sleep(self.purge_seconds)
+            try:
+                purged = await self.purge_finished()
+                if purged:
+                    logger.info("Purged %d finished outbox emails", purged)
+            except Exception as e:
+                logger.exception("Email outbox purge failed: %s", e)
+
+    async def stats(self) -> dict:
+        """Number of outbox rows in each status"""
+        async with self.session_factory() as db:
+            rows = await db.execute(
+                select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+            )
+            return {status: count for status, count in rows.all()}
+
+
+email_dispatcher = EmailDispatcher(
+    concurrency=settings.EMAIL_OUTBOX_CONCURRENCY,
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    poll_interval=settings.EMAIL_OUTBOX_POLL_SECONDS,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    backoff_base=settings.EMAIL_OUTBOX_BACKOFF_SECONDS,
+    backoff_max=settings.EMAIL_OUTBOX_BACKOFF_MAX_SECONDS,
+    retention=timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS),
+    purge_seconds=settings.EMAIL_OUTBOX_PURGE_SECONDS,
+)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or replay the email outbox")
+    parser.add_argument("command", choices=["stats", "requeue", "drain", "purge"])
+    parser.add_argument(
+        "ids", nargs="*", type=int, help="Outbox ids to requeue (default: all dead, except verification codes)"
+    )
+    args = parser.parse_args()
+
+    async def main():
+        if args.command == "stats":
+            print(await email_dispatcher.stats())
+        elif args.command == "requeue":
+            print(f"Requeued {await email_dispatcher.requeue_dead(args.ids or None)} emails")
+        elif args.command == "purge":
+            print(f"Purged {await email_dispatcher.purge_finished()} finished emails")
+        else:
+            # Deliver everything that is currently due, then exit
+            while await email_dispatcher.dispatch_once():
+                pass
+            print(await email_dispatcher.stats())
+
+        # Close pooled connections so the driver threads let the process exit
+        await async_engine.dispose()
+
+    asyncio.run(main())
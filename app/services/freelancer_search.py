@@ -0,0 +1,161 @@
+import hashlib
+import uuid
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.cache import cache
+from ..core.config import settings
+from ..models.skill import Skill, UserSkill
+from ..models.user import User, UserProfile
+from .skills import find_skill_ids, parse_skills
+
+FACET_LIMIT = 20
+
+user_skills = UserSkill.__table__
+
+
+class SearchFilters:
+    """Normalized search parameters; `skill_ids` is None when a required skill doesn't exist"""
+
+    def __init__(self, skill_ids: Optional[List[int]], match_all: bool, city: Optional[str], country: Optional[str]):
+        self.skill_ids = skill_ids
+        self.match_all = match_all
+        self.city = city.strip().lower() if city else None
+        self.country = country.strip().lower() if country else None
+
+    @property
+    def matches_nothing(self) -> bool:
+        return self.skill_ids is None
+
+    def cache_key(self) -> str:
+        skills = ",".join(str(skill_id) for skill_id in sorted(self.skill_ids or []))
+        # all/any only matters once there are skills; unfiltered searches share one entry
+        mode = ("all" if self.match_all else "any") if skills else ""
+        raw = f"{mode}|{skills}|{self.city or ''}|{self.country or ''}"
+        return "search:facets:" + hashlib.sha1(raw.encode()).hexdigest()
+
+
+async def resolve_filters(
+    db: AsyncSession, skills: Optional[str], match_all: bool, city: Optional[str], country: Optional[str]
+) -> SearchFilters:
+    names = parse_skills(skills)
+    ids = await find_skill_ids(db, names)
+    if match_all and len(ids) < len(names):
+        # Nobody can have a skill nobody has listed
+        return SearchFilters(None, match_all, city, country)
+    if not match_all and names and not ids:
+        return SearchFilters(None, match_all, city, country)
+
+    ordered = [ids[name] for name in names if name in ids]
+    if match_all:
+        ordered = await _rarest_first(ordered, ids)
+    return SearchFilters(ordered, match_all, city, country)
+
+async def _rarest_first(skill_ids: List[int], ids_by_name: Dict[str, int]) -> List[int]:
+    """
+    AND queries walk the first skill's index range and probe the others, so start from
+    the rarest one. Popularity comes from the cached unfiltered facets when available:
+    skills outside the top FACET_LIMIT are rarer than any inside it.
+    """
+    facets = await cache.get(SearchFilters([], True, None, None).cache_key())
+    if not facets or len(skill_ids) < 2:
+        return skill_ids
+    popularity = {entry["value"]: entry["count"] for entry in facets["skills"]}
+    name_by_id = {skill_id: name for name, skill_id in ids_by_name.items()}
+    return sorted(skill_ids, key=lambda skill_id: popularity.get(name_by_id[skill_id], 0))
+
+
+def _filtered(columns, filters: SearchFilters):
+    """SELECT `columns` over active freelancers matching `filters`, plus the keyset column"""
+    stmt = select(*columns)
+    key = UserProfile.user_id
+
+    if filters.skill_ids and filters.match_all and not (filters.city or filters.country):
+        # Drive from the first skill's (skill_id, user_id) range; it is already in user_id order
+        first, *rest = filters.skill_ids
+        driver = user_skills.alias("driver")
+        key = driver.c.user_id
+        stmt = stmt.select_from(driver).join(UserProfile, UserProfile.user_id == driver.c.user_id)
+        stmt = stmt.where(driver.c.skill_id == first)
+        for skill_id in rest:
+            stmt = stmt.where(exists().where(user_skills.c.user_id == key, user_skills.c.skill_id == skill_id))
+    else:
+        # With a location the (location, user_id) index supplies the order and skills are probed
+        stmt = stmt.select_from(UserProfile)
+        if filters.skill_ids and filters.match_all:
+            for skill_id in filters.skill_ids:
+                stmt = stmt.where(exists().where(
+                    user_skills.c.user_id == UserProfile.user_id, user_skills.c.skill_id == skill_id
+                ))
+        elif filters.skill_ids:
+            stmt = stmt.where(exists().where(
+                user_skills.c.user_id == UserProfile.user_id, user_skills.c.skill_id.in_(filters.skill_ids)
+            ))
+
+    stmt = stmt.join(User, User.id == UserProfile.user_id).where(
+        User.is_client.is_(False), User.is_active.is_(True)
+    )
+    if filters.city:
+        stmt = stmt.where(func.lower(UserProfile.city) == filters.city)
+    if filters.country:
+        stmt = stmt.where(func.lower(UserProfile.country) == filters.country)
+    return stmt, key
+
+
+async def search_freelancers(
+    db: AsyncSession, filters: SearchFilters, after: Optional[uuid.UUID], limit: int
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of matches in user_id order, and the cursor for the next page"""
+    if filters.matches_nothing:
+        return [], None
+
+    columns = (
+        UserProfile.user_id.label("id"), User.username, User.first_name, User.last_name, UserProfile.bio,
+        UserProfile.skills, UserProfile.city, UserProfile.country, UserProfile.profile_image,
+    )
+    stmt, key = _filtered(columns, filters)
+    if after is not None:
+        stmt = stmt.where(key > after)
+    # One extra row tells us whether there is a next page
+    rows = (await db.execute(stmt.order_by(key).limit(limit + 1))).mappings().all()
+
+    results = [{**row, "skills": parse_skills(row["skills"])} for row in rows[:limit]]
+    next_cursor = str(results[-1]["id"]) if len(rows) > limit else None
+    return results, next_cursor
+
+
+async def search_facets(db: AsyncSession, filters: SearchFilters) -> dict:
+    """Total and top skills/countries/cities over every match, cached per filter set"""
+    if filters.matches_nothing:
+        return {"total": 0, "skills": [], "countries": [], "cities": []}
+
+    key = filters.cache_key()
+    cached = await cache.get(key)
+    if cached is not None:
+        return cached
+
+    matching = _filtered(
+        (UserProfile.user_id.label("user_id"), UserProfile.city, UserProfile.country), filters
+    )[0].subquery()
+
+    def top(column, stmt):
+        count = func.count().label("count")
+        stmt = stmt.add_columns(count).where(column.isnot(None)).group_by(column)
+        return stmt.order_by(count.desc(), column).limit(FACET_LIMIT)
+
+    async def counts(stmt) -> List[dict]:
+        return [{"value": value, "count": count} for value, count in (await db.execute(stmt)).all()]
+
+    facets = {
+        "total": (await db.execute(select(func.count()).select_from(matching))).scalar(),
+        "skills": await counts(top(
+            Skill.name,
+            select(Skill.name).select_from(user_skills)
+            .join(matching, matching.c.user_id == user_skills.c.user_id)
+            .join(Skill, Skill.id == user_skills.c.skill_id),
+        )),
+        "countries": await counts(top(matching.c.country, select(matching.c.country))),
+        "cities": await counts(top(matching.c.city, select(matching.c.city))),
+    }
+    await cache.set(key, facets, ttl=settings.SEARCH_FACET_CACHE_SECONDS)
+    return facets
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from typing import Optional
+from sqlalchemy import text
+from ..core.config import settings
+from ..core.database import async_engine
+from ..core.email import get_email_client
+from ..core.logging import logger
+
+
+async def check_database_connection():
+    """SELECT 1 over the shared async engine pool"""
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+async def check_email_server():
+    """NOOP on a pooled SMTP connection; only logs in again if the pool has none open"""
+    async with get_email_client().pool.connection() as conn:
+        await conn.smtp.noop()
+
+
+class HealthMonitor:
+    """Runs dependency checks with timeouts and serves the last result from cache"""
+
+    def __init__(self, checks: dict, required: tuple, cache_seconds: float = 10, timeout: float = 3):
+        self.checks = checks
+        self.required = required
+        self.cache_seconds = cache_seconds
+        self.timeout = timeout
+        self.results: dict = {}
+        self.checked_at: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run_check(self, name, check):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(), self.timeout)
+            error = None
+        except asyncio.TimeoutError:
+            error = f"timed out after {self.timeout}s"
+        except Exception as e:
+            error = str(e)
+        return name, {
+            "status": "healthy" if error is None else "unhealthy",
+            "error": error,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    async def refresh(self) -> dict:
+        results = await asyncio.gather(*(self._run_check(name, check) for name, check in self.checks.items()))
+        self.results = dict(results)
+        self.checked_at = time.time()
+        return self.results
+
+    async def get(self) -> dict:
+        """Cached results, refreshed at most once per cache interval even under concurrent probes"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        if self.checked_at is None or time.time() - self.checked_at > self.cache_seconds:
+            async with self._lock:
+                if self.checked_at is None or time.time() - self.checked_at > self.cache_seconds:
+                    await self.refresh()
+        return self.results
+
+    @property
+    def ready(self) -> bool:
+        return all(self.results.get(name, {}).get("status") == "healthy" for name in self.required)
+
+    async def _refresh_forever(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.exception("Health refresh failed: %s", e)
+            await asyncio.sleep(self.cache_seconds)
+
+    def start(self):
+        """Keep results warm in the background so probes never wait on a check"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_forever(), name="health-monitor")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._lock = None
+
+
+health_monitor = HealthMonitor(
+    checks={
+        "database": check_database_connection,
+        # Only the outbox dispatcher's process sends email, so only it keeps an SMTP pool to probe
+        **({"email_server": check_email_server} if settings.EMAIL_OUTBOX_ENABLED else {}),
+    },
+    # Email goes through the outbox, so a slow SMTP server shouldn't pull us out of rotation
+    required=("database",),
+    cache_seconds=settings.HEALTH_CACHE_SECONDS,
+    timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,275 @@
+import asyncio
+import contextvars
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+from fastapi import HTTPException, Request, status
+from ..core.config import settings
+from ..core.logging import get_logger
+from ..core.storage import CONTENT_TYPES, ObjectStorage
+
+logger = get_logger("images")
+
+# Pillow format name -> stored extension; anything else is refused
+FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+# Multipart field the image is read from, as with FastAPI's UploadFile = File(...)
+FILE_FIELD = b"file"
+
+
+def image_key(digest: str, extension: str) -> str:
+    return f"images/{digest}.{extension}"
+
+def thumbnail_key(digest: str, size: int) -> str:
+    return f"images/{digest}/{size}.webp"
+
+def media_url(key: str) -> str:
+    return f"{settings.MEDIA_BASE_URL.rstrip('/') or settings.API_V1_STR + '/media'}/{key}"
+
+
+class ImageInfo(NamedTuple):
+    extension: str
+    width: int
+    height: int
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES[self.extension]
+
+
+# Worker functions live at module level so they can be pickled for the process pool.
+# Pillow is imported inside them: only processes that handle images pay for it.
+def _inspect_job(path: str, max_pixels: int) -> Optional[ImageInfo]:
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        # Reads the header only; the pixels are decoded later, in the pool
+        with Image.open(path) as image:
+            if image.format not in FORMATS or image.width * image.height > max_pixels:
+                return None
+            return ImageInfo(FORMATS[image.format], image.width, image.height)
+    except (UnidentifiedImageError, OSError):
+        return None
+
+def _thumbnail_job(path: str, sizes: List[int], out_dir: str) -> Dict[int, str]:
+    from PIL import Image, ImageOps
+
+    results = {}
+    with Image.open(path) as image:
+        # JPEG can decode straight at a fraction of full size, well above the largest thumbnail
+        image.draft("RGB", (max(sizes) * 2, max(sizes) * 2))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        # Largest first, each cut from the one before: less to resample every time
+        for size in sorted(sizes, reverse=True):
+            image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            fd, out = tempfile.mkstemp(dir=out_dir, suffix=".webp")
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, "WEBP", quality=82, method=4)
+            results[size] = out
+    return results
+
+
+class _FileFieldParser:
+    """Feeds the bytes of one multipart field to `write` as they arrive"""
+
+    def __init__(self, content_type: str, write: Callable[[bytes], None]):
+        from python_multipart.multipart import MultipartParser, parse_options_header
+
+        self._parse_options_header = parse_options_header
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing multipart boundary")
+        self.write = write
+        self.found = False
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_file = False
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._disposition = b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_field.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, params = self._parse_options_header(self._disposition)
+        # Only the first file field counts; other fields are skipped unbuffered
+        self._in_file = params.get(b"name") == FILE_FIELD and not self.found
+        self.found = self.found or self._in_file
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self.write(data[start:end])
+
+    def _on_part_end(self):
+        self._in_file = False
+
+    def feed(self, chunk: bytes):
+        self.parser.write(chunk)
+
+    def finish(self):
+        self.parser.finalize()
+
+
+class SpooledUpload(NamedTuple):
+    path: str
+    digest: str  # SHA-256 of the content, hex
+    size: int
+
+
+async def receive_upload(request: Request, storage: ObjectStorage, max_bytes: int) -> SpooledUpload:
+    """
+    Stream the request's image to a temporary file, hashing it on the way, so only one
+    chunk is ever in memory. Takes a multipart "file" field or a raw image body; a body
+    over `max_bytes` is refused as soon as it gets there.
+    """
+    declared = request.headers.get("content-length")
+    # Multipart framing adds a little on top of the file itself
+    if declared and declared.isdigit() and int(declared) > max_bytes + 16 * 1024:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Image is too large")
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(dir=storage.temp_dir(), suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            def write(data: bytes):
+                nonlocal size
+                size += len(data)
+                if size > max_bytes:
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Image is too large")
+                digest.update(data)
+                # One chunk into the page cache costs less than a hop to a thread
+                spool.write(data)
+
+            content_type = request.headers.get("content-type", "")
+            parser = _FileFieldParser(content_type, write) if content_type.startswith("multipart/form-data") else None
+            async for chunk in request.stream():
+                if parser is not None:
+                    parser.feed(chunk)
+                else:
+                    write(chunk)
+            if parser is not None:
+                parser.finish()
+                if not parser.found:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No 'file' field in the upload")
+        if size == 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The upload is empty")
+    except BaseException:
+        os.unlink(path)
+        raise
+    return SpooledUpload(path, digest.hexdigest(), size)
+
+
+class ImageProcessor:
+    """
+    Decodes and resizes images on a bounded process pool: Pillow holds the GIL for
+    much of a resize, so threads would stall the event loop's process.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 16, sizes: Optional[List[int]] = None,
+                 max_pixels: int = 40_000_000):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.sizes = sizes or [64, 256, 512]
+        self.max_pixels = max_pixels
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._tasks: Set[asyncio.Task] = set()
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the app never spawns workers
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def inspect(self, path: str) -> Optional[ImageInfo]:
+        """Format and dimensions from the file header, or None if it isn't an allowed image"""
+        # Header parsing is quick; a thread avoids queueing behind resizes
+        return await asyncio.to_thread(_inspect_job, path, self.max_pixels)
+
+    def thumbnail_later(self, storage: ObjectStorage, path: str, digest: str):
+        """
+        Make and store the thumbnails of a spooled upload after the response is sent, then
+        delete the spooled file. Shed (thumbnails skipped) when the pool is backed up.
+        """
+        if self._pending >= self.workers + self.max_queue:
+            logger.warning("Image pool busy, no thumbnails for %s", digest)
+            os.unlink(path)
+            return
+        self._pending += 1
+        # A fresh context: the request's SQL audit and read routing end with the response
+        task = asyncio.create_task(self._thumbnail(storage, path, digest), context=contextvars.Context())
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _thumbnail(self, storage: ObjectStorage, path: str, digest: str):
+        made: Dict[int, str] = {}
+        try:
+            missing = [size for size in self.sizes if not await storage.exists(thumbnail_key(digest, size))]
+            if not missing:
+                return  # Same image uploaded before
+            loop = asyncio.get_running_loop()
+            made = await loop.run_in_executor(self.executor, _thumbnail_job, path, missing, storage.temp_dir())
+            for size, thumbnail in made.items():
+                await storage.put_file(thumbnail_key(digest, size), thumbnail, CONTENT_TYPES["webp"])
+            self.completed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.exception("Thumbnails failed for %s: %s", digest, e)
+        finally:
+            self._pending -= 1
+            for leftover in (path, *made.values()):
+                try:
+                    os.unlink(leftover)
+                except FileNotFoundError:
+                    pass
+
+    async def stop(self, timeout: float = 10):
+        """Let running thumbnail jobs finish, then stop the pool"""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+image_processor = ImageProcessor(
+    workers=settings.IMAGE_WORKERS,
+    max_queue=settings.IMAGE_MAX_QUEUE,
+    sizes=settings.IMAGE_THUMBNAIL_SIZES,
+    max_pixels=settings.IMAGE_MAX_PIXELS,
+)
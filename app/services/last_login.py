@@ -0,0 +1,116 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import DateTime, bindparam, column, or_, update, values
+from ..core.config import settings
+from ..core.database import async_engine
+from ..core.logging import get_logger
+from ..models.user import User
+
+logger = get_logger("last_login")
+
+users = User.__table__
+
+
+class LastLoginBuffer:
+    """
+    Write-behind for users.last_login: logins record a timestamp in memory and a
+    background task writes the latest one per user in a single UPDATE every
+    `flush_interval` seconds (the most a value can lag), as soon as `max_entries`
+    users are waiting, and once more on shutdown.
+    """
+
+    def __init__(self, engine=async_engine, flush_interval: float = 10, max_entries: int = 1000):
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self._pending: Dict[uuid.UUID, datetime] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def record(self, user_id: uuid.UUID, at: Optional[datetime] = None):
+        """Note a login; repeated logins before the next flush collapse into one row"""
+        at = at or datetime.utcnow()
+        previous = self._pending.get(user_id)
+        if previous is None or previous < at:
+            self._pending[user_id] = at
+        if len(self._pending) >= self.max_entries and self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="last-login-flush")
+
+    async def stop(self, timeout: float = 10):
+        """Stop the task, then write whatever is still buffered"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.exception("Dropped %d last_login updates at shutdown: %s", len(self._pending), e)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception("last_login flush failed, retrying next interval: %s", e)
+
+    async def flush(self) -> int:
+        """Write the buffered timestamps; returns how many users were updated"""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        try:
+            for start in range(0, len(batch), self.max_entries):
+                await self._write(list(batch.items())[start:start + self.max_entries])
+        except Exception:
+            # Put them back unless a newer login arrived meanwhile
+            for user_id, at in batch.items():
+                if self._pending.get(user_id, at) <= at:
+                    self._pending[user_id] = at
+            raise
+        return len(batch)
+
+    async def _write(self, rows):
+        async with self.engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # UPDATE users ... FROM (VALUES (id, ts), ...) AS v: one statement for the batch
+                latest = values(column("id", users.c.id.type), column("ts", DateTime), name="v").data(rows)
+                await conn.execute(
+                    update(users)
+                    .where(users.c.id == latest.c.id)
+                    .where(or_(users.c.last_login.is_(None), users.c.last_login < latest.c.ts))
+                    .values(last_login=latest.c.ts)
+                )
+            else:
+                # SQLite can't name VALUES columns in FROM; executemany is still one round trip
+                await conn.execute(
+                    update(users)
+                    .where(users.c.id == bindparam("user_id"))
+                    .where(or_(users.c.last_login.is_(None), users.c.last_login < bindparam("ts")))
+                    .values(last_login=bindparam("ts")),
+                    [{"user_id": user_id, "ts": at} for user_id, at in rows],
+                )
+
+
+last_login_buffer = LastLoginBuffer(
+    flush_interval=settings.LAST_LOGIN_FLUSH_SECONDS,
+    max_entries=settings.LAST_LOGIN_FLUSH_MAX_ENTRIES,
+)
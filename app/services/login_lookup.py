@@ -0,0 +1,48 @@
+import re
+from typing import Optional
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.user import User
+
+EMAIL = "email"
+PHONE = "phone"
+USERNAME = "username"
+
+PHONE_PATTERN = re.compile(r"^\+?[0-9]{7,15}$")
+
+
+def classify_login_identifier(identifier: str) -> str:
+    """Decide up front which single column a login identifier should be matched against"""
+    if "@" in identifier:
+        return EMAIL
+    if PHONE_PATTERN.match(identifier):
+        return PHONE
+    return USERNAME
+
+async def _first_by_lower(db: AsyncSession, column, identifier: str) -> Optional[User]:
+    # Uniqueness is case-sensitive, so several rows can differ only by case; the exact one
+    # sorts first. The index still finds the candidates; only those few are sorted
+    result = await db.execute(
+        select(User)
+        .where(func.lower(column) == identifier.lower())
+        .order_by((column == identifier).desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+async def find_user_by_login(db: AsyncSession, identifier: str) -> Optional[User]:
+    """Resolve an email, phone number or username to a user with one indexed lookup"""
+    identifier = identifier.strip()
+    kind = classify_login_identifier(identifier)
+
+    if kind == EMAIL:
+        return await _first_by_lower(db, User.email, identifier)
+
+    if kind == PHONE:
+        result = await db.execute(select(User).where(User.phone == identifier))
+        user = result.scalars().first()
+        # All-digit usernames are allowed, so a bare number that isn't a phone may still be one
+        if user is not None or identifier.startswith("+"):
+            return user
+
+    return await _first_by_lower(db, User.username, identifier)
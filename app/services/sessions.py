@@ -0,0 +1,162 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from sqlalchemy import delete, insert, select, update
+from ..core.config import settings
+from ..core.database import async_engine
+from ..core.logging import get_logger
+from ..core.revocation import RevocationList, revocation_list
+from ..core.security import create_access_token, create_refresh_token, decode_refresh_token
+from ..models.token import RefreshToken
+from ..models.user import User
+
+logger = get_logger("sessions")
+
+refresh_tokens = RefreshToken.__table__
+users = User.__table__
+
+
+class SessionTokens(NamedTuple):
+    access_token: str
+    refresh_token: str
+    username: str
+
+
+class RefreshSessions:
+    """
+    Login sessions kept alive by refresh-token rotation. A login opens a session; each
+    refresh spends the current refresh token and issues the next one. A token spent
+    twice was copied, so the whole session is revoked. Only opening, refreshing and
+    ending a session touch the database; access tokens are checked against the
+    in-memory revocation list.
+    """
+
+    def __init__(self, engine=async_engine, revocations: RevocationList = revocation_list,
+                 lifetime: timedelta = timedelta(days=14), purge_seconds: float = 600):
+        self.engine = engine
+        self.revocations = revocations
+        self.lifetime = lifetime
+        self.purge_seconds = purge_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def _issue(self, conn, user_id: uuid.UUID, username: str, email: str, session_id: str) -> SessionTokens:
+        jti = uuid.uuid4().hex
+        expires_at = datetime.utcnow() + self.lifetime
+        await conn.execute(insert(refresh_tokens).values(
+            jti=jti, session_id=session_id, user_id=user_id, expires_at=expires_at
+        ))
+        return SessionTokens(
+            access_token=create_access_token(data={"sub": username, "email": email, "sid": session_id}),
+            refresh_token=create_refresh_token(str(user_id), session_id, jti, expires_at),
+            username=username,
+        )
+
+    async def open(self, user_id: uuid.UUID, username: str, email: str) -> SessionTokens:
+        """Start a session at login"""
+        async with self.engine.begin() as conn:
+            return await self._issue(conn, user_id, username, email, uuid.uuid4().hex)
+
+    async def refresh(self, token: str) -> Optional[SessionTokens]:
+        """The next token pair for a refresh token, or None if it can't be used"""
+        claims = decode_refresh_token(token)
+        session_id = claims["sid"]
+        if self.revocations.is_revoked(session_id):
+            return None
+
+        revoked = None
+        async with self.engine.begin() as conn:
+            now = datetime.utcnow()
+            # Spending is a compare-and-set, so of two concurrent uses only one succeeds
+            user_id = (await conn.execute(
+                update(refresh_tokens)
+                .where(
+                    refresh_tokens.c.jti == claims["jti"],
+                    refresh_tokens.c.used_at.is_(None),
+                    refresh_tokens.c.expires_at > now,
+                )
+                .values(used_at=now)
+                .returning(refresh_tokens.c.user_id)
+            )).scalar()
+
+            if user_id is None:
+                spent = (await conn.execute(
+                    select(refresh_tokens.c.used_at).where(refresh_tokens.c.jti == claims["jti"])
+                )).scalar()
+                if spent is not None:
+                    logger.warning("Refresh token reused, revoking session %s", session_id)
+                    revoked = await self._revoke(conn, session_id)
+            else:
+                user = (await conn.execute(
+                    select(users.c.username, users.c.email, users.c.is_active).where(users.c.id == user_id)
+                )).first()
+                if user is None or not user.is_active:
+                    revoked = await self._revoke(conn, session_id)
+                else:
+                    return await self._issue(conn, user_id, user.username, user.email, session_id)
+
+        if revoked is not None:
+            self.revocations.remember(session_id, revoked)
+        return None
+
+    async def _revoke(self, conn, session_id: str) -> datetime:
+        """
+        Revoke a session on `conn`. Returns its revocation's expiry; the caller passes it
+        to revocations.remember() once the transaction has committed.
+        """
+        # Covers the session's refresh tokens and every access token minted from them
+        expires_at = datetime.utcnow() + self.lifetime
+        await self.revocations.revoke(session_id, expires_at, conn=conn)
+        # Other processes may not have synced the revocation yet; without rows nothing rotates
+        await conn.execute(delete(refresh_tokens).where(refresh_tokens.c.session_id == session_id))
+        return expires_at
+
+    async def end(self, session_id: str):
+        """Log out one session"""
+        async with self.engine.begin() as conn:
+            expires_at = await self._revoke(conn, session_id)
+        self.revocations.remember(session_id, expires_at)
+
+    async def end_all(self, user_id: uuid.UUID) -> int:
+        """Log out every live session of a user; returns how many were ended"""
+        async with self.engine.begin() as conn:
+            session_ids = (await conn.execute(
+                select(refresh_tokens.c.session_id)
+                .where(refresh_tokens.c.user_id == user_id, refresh_tokens.c.expires_at > datetime.utcnow())
+                .distinct()
+            )).scalars().all()
+            revoked = {session_id: await self._revoke(conn, session_id) for session_id in session_ids}
+        for session_id, expires_at in revoked.items():
+            self.revocations.remember(session_id, expires_at)
+        return len(session_ids)
+
+    async def purge_expired(self) -> int:
+        async with self.engine.begin() as conn:
+            result = await conn.execute(delete(refresh_tokens).where(refresh_tokens.c.expires_at < datetime.utcnow()))
+        return result.rowcount
+
+    async def _purge_forever(self):
+        while True:
+            await asyncio.sleep(self.purge_seconds)
+            try:
+                purged = await self.purge_expired()
+                if purged:
+                    logger.info("Purged %d expired refresh tokens", purged)
+            except Exception as e:
+                logger.exception("Refresh token purge failed: %s", e)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._purge_forever(), name="refresh-token-purge")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+refresh_sessions = RefreshSessions(lifetime=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
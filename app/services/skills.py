@@ -0,0 +1,76 @@
+from typing import Dict, Iterable, List
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.skill import Skill, UserSkill
+
+SKILL_NAME_MAX_LENGTH = Skill.__table__.c.name.type.length
+
+
+def normalize_skill(name: str) -> str:
+    """Lowercase with single spaces, e.g. "  Machine   Learning " -> "machine learning" """
+    return " ".join(name.split()).lower()[:SKILL_NAME_MAX_LENGTH]
+
+def parse_skills(value) -> List[str]:
+    """Distinct normalized names from a comma-separated string, in first-seen order"""
+    if not value:
+        return []
+    names = (normalize_skill(part) for part in value.split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+def insert_ignoring_conflicts(table, dialect_name: str):
+    """INSERT ... ON CONFLICT DO NOTHING for the dialects we run on (Postgres, SQLite)"""
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    return dialect.insert(table).on_conflict_do_nothing()
+
+
+async def find_skill_ids(db: AsyncSession, names: Iterable[str]) -> Dict[str, int]:
+    names = list(names)
+    if not names:
+        return {}
+    result = await db.execute(select(Skill.name, Skill.id).where(Skill.name.in_(names)))
+    return dict(result.all())
+
+async def sync_user_skills(db: AsyncSession, user_id, names: List[str]):
+    """Make the user's user_skills rows match `names`, creating skills on first use"""
+    dialect = db.bind.dialect.name
+    ids = await find_skill_ids(db, names)
+    missing = [name for name in names if name not in ids]
+    if missing:
+        ids.update((await db.execute(
+            insert_ignoring_conflicts(Skill.__table__, dialect).returning(Skill.name, Skill.id),
+            [{"name": name} for name in missing],
+        )).all())
+        # Skills a concurrent request created first come back from neither query above
+        raced = [name for name in missing if name not in ids]
+        if raced:
+            ids.update(await find_skill_ids(db, raced))
+
+    table = UserSkill.__table__
+    await db.execute(
+        delete(table).where(table.c.user_id == user_id, table.c.skill_id.not_in(list(ids.values())))
+    )
+    if ids:
+        await db.execute(
+            insert_ignoring_conflicts(table, dialect),
+            [{"user_id": user_id, "skill_id": skill_id} for skill_id in ids.values()],
+        )
+
+
+def ensure_skill_ids(conn, names: Iterable[str]) -> Dict[str, int]:
+    """Sync-connection variant for bulk loaders: ids for `names`, creating missing skills"""
+    names = set(names)
+    if not names:
+        return {}
+    query = select(Skill.name, Skill.id)
+    ids = dict(conn.execute(query.where(Skill.name.in_(names))).all())
+    missing = names - ids.keys()
+    if missing:
+        ids.update(conn.execute(
+            insert_ignoring_conflicts(Skill.__table__, conn.dialect.name).returning(Skill.name, Skill.id),
+            [{"name": name} for name in sorted(missing)],
+        ).all())
+        raced = missing - ids.keys()
+        if raced:
+            ids.update(conn.execute(query.where(Skill.name.in_(raced))).all())
+    return ids
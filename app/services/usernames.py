@@ -0,0 +1,56 @@
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.user import User
+
+USERNAME_MAX_LENGTH = User.__table__.c.username.type.length
+# Room left for a numeric suffix such as "john1042"
+SUFFIX_DIGITS = 6
+
+
+def username_base_from_email(email: str) -> str:
+    """Default username base: the local part of the email address"""
+    return email.split('@')[0][:USERNAME_MAX_LENGTH - SUFFIX_DIGITS]
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+async def next_free_username(db: AsyncSession, base: str) -> str:
+    """Pick `base`, or `base` plus the smallest free number, from one prefix query"""
+    result = await db.execute(
+        select(User.username).where(User.username.like(f"{_escape_like(base)}%", escape="\\"))
+    )
+
+    # Only the exact base and base + canonical integer count as taken; "john_doe" doesn't
+    taken = set()
+    for (name,) in result:
+        if not name.startswith(base):
+            continue  # SQLite's LIKE is case-insensitive
+        suffix = name[len(base):]
+        if suffix == "":
+            taken.add(0)
+        elif suffix.isdigit() and str(int(suffix)) == suffix:
+            taken.add(int(suffix))
+
+    if 0 not in taken:
+        return base
+    number = 1
+    while number in taken:
+        number += 1
+    return f"{base}{number}"
+
+async def add_user_with_unique_username(db: AsyncSession, user: User, base: str, attempts: int = 5) -> User:
+    """Insert `user` under the next free username, retrying when a concurrent signup wins the race"""
+    for attempt in range(attempts):
+        user.username = await next_free_username(db, base)
+        try:
+            # The savepoint keeps the outer transaction usable if the insert collides
+            async with db.begin_nested():
+                db.add(user)
+                await db.flush()
+            return user
+        except IntegrityError:
+            # Only a username collision is worth retrying; anything else (e.g. email) is final
+            taken = await db.execute(select(User.id).where(User.username == user.username))
+            if attempt == attempts - 1 or taken.first() is None:
+                raise
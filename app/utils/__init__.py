@@ -1 +1 @@
-from .helpers import generate_verification_code, get_code_expiry, parse_full_name
\ No newline at end of file
+from .helpers import generate_verification_code, get_code_expiry, parse_full_name, parse_uuid
\ No newline at end of file
@@ -1,6 +1,8 @@
 import random
+import uuid
 import string
 from datetime import datetime, timedelta
+from typing import Optional
 
 def generate_verification_code(length: int = 6) -> str:
     """Generate a random verification code"""
@@ -15,4 +17,11 @@ def parse_full_name(full_name: str) -> tuple:
     parts = full_name.strip().split(' ', 1)
     first_name = parts[0]
     last_name = parts[1] if len(parts) > 1 else ""
-    return first_name, last_name
\ No newline at end of file
+    return first_name, last_name
+
+def parse_uuid(value: str) -> Optional[uuid.UUID]:
+    """Parse a UUID string, returning None if it is malformed"""
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
\ No newline at end of file
@@ -0,0 +1,325 @@
+"""Auth flow load test: drive app.main:app in-process through httpx's ASGI transport.
+
+Replays a weighted mix of user journeys with --concurrency workers:
+
+    signup     POST /auth/signup/initial -> POST /auth/verify-email -> POST /auth/login
+               -> GET /auth/me -> PUT /profile/update
+    returning  POST /auth/login -> GET /auth/me -> PUT /profile/update (seeded users)
+    browse     GET /auth/me (with a token from an earlier login)
+
+Verification codes are read from the emails the outbox delivers to an in-process
+SMTP sink, exactly as a user would. By default every run gets a fresh SQLite
+database; pass --database-url to target a local Postgres (never the one in .env).
+
+Writes throughput and p50/p95/p99 per route as JSON. --compare prints the
+difference against an earlier result (and can diff two saved files without running).
+
+Usage:
+    python -m benchmarks.auth_flow [--flows 200] [--concurrency 8] [--seed-users 1000]
+        [--mix signup=1,returning=3,browse=6] [--output result.json]
+        [--compare baseline.json [result.json]] [--fail-threshold 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from benchmarks.smtp_sink import SMTPSink
+
+SEED = 1337
+HTML_CODE_RE = re.compile(rb">\s*(\d{6})\s*<")
+TEXT_CODE_RE = re.compile(rb"(?m)^\s*(\d{6})\s*$")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+def summarize(samples, errors, duration):
+    if not samples:
+        return {"count": 0, "errors": errors}
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / duration, 2),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in FLOWS:
+            raise SystemExit(f"unknown flow {name!r}; choose from {', '.join(FLOWS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+class VerificationCodes:
+    """Futures resolved by the SMTP sink when a verification email arrives"""
+
+    def __init__(self):
+        self._futures = {}
+
+    def expect(self, email: str) -> asyncio.Future:
+        return self._futures.setdefault(email, asyncio.get_running_loop().create_future())
+
+    def on_message(self, recipients, message):
+        if "Verification" not in (message["Subject"] or ""):
+            return
+        for part in message.walk():
+            payload = part.get_payload(decode=True)
+            if not payload:
+                continue
+            pattern = HTML_CODE_RE if part.get_content_subtype() == "html" else TEXT_CODE_RE
+            match = pattern.search(payload)
+            if match:
+                for email in recipients:
+                    future = self._futures.pop(email, None)
+                    if future is not None and not future.done():
+                        future.set_result(match.group(1).decode())
+                return
+
+
+class Runner:
+    def __init__(self, client, prefix, codes, rng, seed_users, password):
+        self.client = client
+        self.prefix = prefix
+        self.codes = codes
+        self.rng = rng
+        self.seed_users = seed_users
+        self.password = password
+        self.run_tag = uuid.uuid4().hex[:8]
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.tokens = []
+
+    async def call(self, method, path, **kwargs):
+        name = f"{method} {path}"
+        started = time.perf_counter()
+        response = await self.client.request(method, self.prefix + path, **kwargs)
+        self.timings[name].append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+    def profile_payload(self):
+        from benchmarks.seed import CITIES, SKILLS
+        city, country = self.rng.choice(CITIES)
+        return {
+            "bio": f"Benchmark bio {self.rng.randrange(10**6)}",
+            "skills": ",".join(self.rng.sample(SKILLS, self.rng.randint(1, 5))),
+            "city": city,
+            "country": country,
+        }
+
+    async def login_me_update(self, identifier, password):
+        response = await self.call("POST", "/auth/login", data={"username": identifier, "password": password})
+        if response.status_code != 200:
+            return False
+        headers = {"Authorization": f"Bearer {response.json()['token']['access_token']}"}
+        self.tokens.append(headers)
+        await self.call("GET", "/auth/me", headers=headers)
+        response = await self.call("PUT", "/profile/update", headers=headers, json=self.profile_payload())
+        return response.status_code == 200
+
+    async def signup(self, i):
+        email = f"bench-{self.run_tag}-{i}@example.com"
+        password = "Benchmark1!"
+        code = self.codes.expect(email)
+        response = await self.call("POST", "/auth/signup/initial", json={
+            "email": email, "password": password, "confirm_password": password, "is_client": i % 3 == 0,
+        })
+        if response.status_code != 201:
+            return False
+        user_id = response.json()["user_id"]
+        # Waiting for the email isn't timed: it measures the dispatcher, not a request
+        response = await self.call("POST", "/auth/verify-email", json={
+            "user_id": user_id, "verification_code": await asyncio.wait_for(code, 30),
+        })
+        if response.status_code != 200:
+            return False
+        return await self.login_me_update(email, password)
+
+    async def returning(self, i):
+        if not self.seed_users:
+            return await self.signup(i)
+        return await self.login_me_update(f"user{self.rng.randrange(self.seed_users)}", self.password)
+
+    async def browse(self, i):
+        if not self.tokens:
+            return await self.returning(i)
+        response = await self.call("GET", "/auth/me", headers=self.rng.choice(self.tokens))
+        return response.status_code == 200
+
+
+FLOWS = {"signup": Runner.signup, "returning": Runner.returning, "browse": Runner.browse}
+
+
+async def run(args) -> dict:
+    codes = VerificationCodes()
+    sink = SMTPSink(on_message=codes.on_message)
+    port = await sink.start()
+
+    # Settings are read at import time, so configure the app before importing it
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='lanceraa-bench-')}/bench.db"
+    os.environ.update({
+        "DATABASE_URL": database_url,
+        "DATABASE_AUTO_MIGRATE": "true",
+        "EMAIL_HOST": "127.0.0.1",
+        "EMAIL_PORT": str(port),
+        "EMAIL_USE_STARTTLS": "false",
+        "EMAIL_USE_AUTH": "false",
+        "EMAIL_OUTBOX_ENABLED": "true",
+        "EMAIL_OUTBOX_POLL_SECONDS": "0.2",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        "LOG_FILE": os.environ.get("LOG_FILE", ""),
+    })
+    import logging
+    import httpx
+    from app.core.config import settings
+    from app.main import app
+    from benchmarks.seed import SEED_PASSWORD, seed
+
+    # httpx and alembic log at INFO per request/migration; keep the output to warnings
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.seed_users:
+        await asyncio.to_thread(seed, args.seed_users)
+
+    rng = random.Random(SEED)
+    mix = parse_mix(args.mix)
+    plan = rng.choices(list(mix), weights=list(mix.values()), k=args.flows)
+    flow_timings = defaultdict(list)
+    flow_errors = defaultdict(int)
+
+    async with app.router.lifespan_context(app):
+        # Count unhandled exceptions as 500s instead of aborting the flow
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            runner = Runner(client, settings.API_V1_STR, codes, rng, args.seed_users, SEED_PASSWORD)
+            work = asyncio.Queue()
+            for i, kind in enumerate(plan):
+                work.put_nowait((i, kind))
+
+            async def worker():
+                while not work.empty():
+                    i, kind = work.get_nowait()
+                    started = time.perf_counter()
+                    try:
+                        ok = await FLOWS[kind](runner, i)
+                    except Exception as e:
+                        print(f"flow {kind} #{i} failed: {type(e).__name__}: {e}", file=sys.stderr)
+                        ok = False
+                    flow_timings[kind].append((time.perf_counter() - started) * 1000)
+                    if not ok:
+                        flow_errors[kind] += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            duration = time.perf_counter() - started
+    await sink.stop()
+
+    total = sum(len(samples) for samples in runner.timings.values())
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": database_url.split(":", 1)[0],
+            "flows": args.flows,
+            "concurrency": args.concurrency,
+            "mix": mix,
+            "seed_users": args.seed_users,
+            "emails_delivered": len(sink.messages),
+        },
+        "total": {
+            "requests": total,
+            "errors": sum(runner.errors.values()),
+            "duration_s": round(duration, 3),
+            "rps": round(total / duration, 2),
+        },
+        "routes": {
+            name: summarize(samples, runner.errors[name], duration)
+            for name, samples in sorted(runner.timings.items())
+        },
+        "flows": {
+            name: summarize(samples, flow_errors[name], duration)
+            for name, samples in sorted(flow_timings.items())
+        },
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = None) -> bool:
+    """Print per-route deltas; returns False if any p95 regressed by more than threshold %"""
+    ok = True
+    print(f"{'route':<28}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}{'rps':>18}")
+    for name in sorted(set(baseline["routes"]) | set(current["routes"])):
+        old, new = baseline["routes"].get(name, {}), current["routes"].get(name, {})
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "rps"):
+            if key in old and key in new:
+                delta = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                cells.append(f"{new[key]:.1f} ({delta:+.0f}%)")
+                if key == "p95_ms" and threshold is not None and delta > threshold:
+                    ok = False
+            else:
+                cells.append(f"{new.get(key, '-')}")
+        print(f"{name:<28}" + "".join(f"{cell:>18}" for cell in cells))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed-users", type=int, default=1000)
+    parser.add_argument("--mix", default="signup=1,returning=3,browse=6")
+    parser.add_argument("--database-url", help="Defaults to a fresh SQLite file")
+    parser.add_argument("--output", help="Write the JSON result here instead of stdout")
+    parser.add_argument("--compare", nargs="+", metavar="FILE",
+                        help="Baseline result; with a second file, diff the two without running")
+    parser.add_argument("--fail-threshold", type=float,
+                        help="Exit 1 if any route's p95 is this many percent slower than the baseline")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as old, open(args.compare[1]) as new:
+            sys.exit(0 if compare(json.load(old), json.load(new), args.fail_threshold) else 1)
+
+    result = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            if not compare(json.load(f), result, args.fail_threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""/auth/me: the old two-query + hand-built dict path versus one joined query + TypeAdapter.
+
+Seeds DATABASE_URL with --users users and profiles (skipped if already present),
+then loads --lookups random users both ways and reports SQL round-trips per
+request, DB time and serialization time (p50/p95).
+
+Usage:
+    python -m benchmarks.auth_me [--users 10000] [--lookups 2000]
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from app.core.database import AsyncSessionLocal, async_engine
+from app.core.sql_audit import SQLAudit, audit_engine, current_sql_audit
+from app.models.user import User, UserProfile
+from app.routes.auth import build_me_response, me_response_adapter
+from benchmarks.seed import SEED, seed
+
+
+async def legacy_load(db, username):
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
+    result = await db.execute(select(UserProfile).where(UserProfile.user_id == user.id))
+    return user, result.scalars().first()
+
+def legacy_serialize(user, profile) -> bytes:
+    """The hand-built dict, then FastAPI's jsonable_encoder + JSONResponse rendering"""
+    full_name = None
+    if user.first_name or user.last_name:
+        full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
+    user_data = {
+        "id": str(user.id), "username": user.username, "email": user.email,
+        "first_name": user.first_name, "last_name": user.last_name, "full_name": full_name,
+        "role": "client" if user.is_client else "freelancer", "phone": user.phone,
+        "is_active": user.is_active, "is_verified": user.is_verified,
+        "profile_completed": user.profile_completed,
+    }
+    if profile:
+        user_data["profile"] = {
+            "bio": profile.bio, "skills": profile.skills,
+            "address": {
+                "street": profile.street, "city": profile.city, "state": profile.state,
+                "country": profile.country, "zip": profile.zip, "full_address": profile.get_full_address(),
+            },
+            "social": {"website": profile.website, "linkedin": profile.linkedin, "github": profile.github},
+        }
+    content = jsonable_encoder({"user": user_data})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+async def joined_load(db, username):
+    result = await db.execute(select(User).options(joinedload(User.profile)).where(User.username == username))
+    return result.scalars().first()
+
+def joined_serialize(user) -> bytes:
+    return me_response_adapter.dump_json(build_me_response(user))
+
+
+def summary(samples, scale=1000):
+    ordered = sorted(samples)
+    p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+    return statistics.median(samples) * scale, p95 * scale
+
+
+async def measure(users: int, lookups: int):
+    audit_engine(async_engine.sync_engine)
+    rng = random.Random(SEED + 2)
+    usernames = [f"user{rng.randrange(users)}" for _ in range(lookups)]
+
+    results = {}
+    for name in ("legacy", "joined"):
+        db_times, ser_times, queries = [], [], 0
+        async with AsyncSessionLocal() as db:
+            for username in usernames:
+                audit = SQLAudit()
+                token = current_sql_audit.set(audit)
+                started = time.perf_counter()
+                loaded = await (legacy_load(db, username) if name == "legacy" else joined_load(db, username))
+                db_times.append(time.perf_counter() - started)
+                current_sql_audit.reset(token)
+                queries += len(audit.statements)
+
+                started = time.perf_counter()
+                legacy_serialize(*loaded) if name == "legacy" else joined_serialize(loaded)
+                ser_times.append(time.perf_counter() - started)
+                db.expunge_all()
+        results[name] = (queries / lookups, summary(db_times), summary(ser_times, 1e6))
+
+    print(f"{'strategy':<10}{'queries':>9}{'db p50 ms':>11}{'db p95 ms':>11}{'ser p50 us':>12}{'ser p95 us':>12}")
+    for name, (per_request, (db50, db95), (ser50, ser95)) in results.items():
+        print(f"{name:<10}{per_request:>9.2f}{db50:>11.3f}{db95:>11.3f}{ser50:>12.1f}{ser95:>12.1f}")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    seed(args.users)
+    asyncio.run(measure(args.users, args.lookups))
+
+
+if __name__ == "__main__":
+    main()
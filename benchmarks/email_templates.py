@@ -0,0 +1,64 @@
+"""Per-template email rendering micro-benchmark.
+
+Compares the old path (Environment.get_template + render with a fresh `now`
+lambda on every call) with the warmed EmailClient, and reports the cost of
+building the full MIME message.
+
+Usage:
+    python -m benchmarks.email_templates [--iterations 2000]
+"""
+import argparse
+import datetime
+import time
+from jinja2 import Environment, FileSystemLoader
+from app.core.email import EmailClient
+
+CONTEXT = {
+    "code": "123456",
+    "user_id": "00000000-0000-0000-0000-000000000000",
+    "user_name": "Benchmark User",
+    "otp": "654321",
+    "reset_code": "112233",
+    "profile_url": "https://lanceraa.com/profile",
+    "app_name": "Lanceraa",
+    "support_email": "support@lanceraa.com",
+}
+
+
+def per_call_us(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    client = EmailClient()
+    started = time.perf_counter()
+    names = client.warm_up()
+    print(f"warm_up compiled {len(names)} templates in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    # The pre-warm-up behaviour: auto_reload on, no bytecode cache, new lambda per render
+    legacy_env = Environment(loader=FileSystemLoader(client.templates_dir))
+
+    def legacy_render(name):
+        context = dict(CONTEXT, now=lambda fmt: datetime.datetime.now().strftime(fmt))
+        return legacy_env.get_template(f"{name}.html").render(**context)
+
+    print(f"{'template':<20}{'legacy render':>16}{'warm render':>16}{'full message':>16}")
+    for name in names:
+        legacy = per_call_us(lambda: legacy_render(name), args.iterations)
+        warm = per_call_us(lambda: client.render_template(name, **CONTEXT), args.iterations)
+        message = per_call_us(
+            lambda: client.build_message("bench@example.com", "Benchmark", name, **CONTEXT).as_bytes(),
+            args.iterations,
+        )
+        print(f"{name:<20}{legacy:>13.1f} us{warm:>13.1f} us{message:>13.1f} us")
+
+
+if __name__ == "__main__":
+    main()
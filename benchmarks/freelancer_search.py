@@ -0,0 +1,133 @@
+"""Freelancer search latency at scale.
+
+Loads --profiles synthetic users (with profiles and skills) through the bulk
+importer if the database has fewer, then times the search service's queries
+directly, without HTTP in the way:
+
+    one skill, two skills (all), three skills (any), skill + country, city only,
+    20 pages deep by cursor, and facet counts with a cold and a warm cache.
+
+By default a fresh SQLite file is used; pass --database-url to target a local
+Postgres (never the one in .env). --explain prints each query plan on Postgres.
+
+Usage:
+    python -m benchmarks.freelancer_search [--profiles 1000000] [--repeat 50] [--explain]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+async def run(args):
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='lanceraa-search-')}/search.db"
+    # Settings are read at import time, so configure the app before importing it
+    os.environ.update({"DATABASE_URL": database_url, "LOG_LEVEL": "WARNING", "LOG_FILE": ""})
+    import logging
+    from sqlalchemy import func, select, text
+    from app.cli.bulk_import import Hasher, run as bulk_load, synthetic
+    from app.core.cache import cache
+    from app.core.database import AsyncSessionLocal, async_engine, engine
+    from app.core.migrations import upgrade_to_head
+    from app.models.user import User
+    from app.services.freelancer_search import _filtered, resolve_filters, search_facets, search_freelancers
+
+    logging.getLogger().setLevel(logging.WARNING)
+    upgrade_to_head()
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(User.__table__)).scalar()
+    if existing < args.profiles:
+        print(f"loading {args.profiles - existing} synthetic profiles...", file=sys.stderr)
+        hasher = Hasher(workers=1, rounds=4, reuse_hash=True)
+        try:
+            bulk_load(synthetic(args.profiles - existing, start=existing), 5000, hasher)
+        finally:
+            hasher.close()
+        if engine.dialect.name == "postgresql":
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text("VACUUM ANALYZE users, user_profiles, user_skills, skills"))
+        else:
+            with engine.begin() as conn:
+                conn.execute(text("ANALYZE"))
+
+    scenarios = {
+        "one skill": dict(skills="python"),
+        "two skills, all": dict(skills="python,docker"),
+        "three skills, any": dict(skills="rust,go,swift", match_all=False),
+        "skill + country": dict(skills="react", country="Nepal"),
+        "city only": dict(city="Pokhara"),
+    }
+
+    async with AsyncSessionLocal() as db:
+        async def filters_for(skills=None, match_all=True, city=None, country=None):
+            return await resolve_filters(db, skills, match_all, city, country)
+
+        # Warm the unfiltered facets first: AND queries use them to start from the rarest skill
+        await search_facets(db, await filters_for())
+
+        print(f"{'query':<22}{'p50 ms':>10}{'p95 ms':>10}{'rows':>7}")
+        for name, params in scenarios.items():
+            filters = await filters_for(**params)
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                results, _ = await search_freelancers(db, filters, None, args.limit)
+                timings.append((time.perf_counter() - started) * 1000)
+            print(f"{name:<22}{statistics.median(timings):>10.2f}{percentile(timings, 95):>10.2f}{len(results):>7}")
+
+            if args.explain and engine.dialect.name == "postgresql":
+                stmt, key = _filtered((text("1"),), filters)
+                compiled = stmt.order_by(key).limit(args.limit + 1).compile(
+                    engine, compile_kwargs={"literal_binds": True}
+                )
+                plan = await db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {compiled}"))
+                print("\n".join(f"    {line}" for (line,) in plan.all()))
+
+        # Deep pagination: keyset pages cost the same at page 20 as at page 1
+        filters = await filters_for(skills="python")
+        timings, cursor = [], None
+        for _ in range(20):
+            started = time.perf_counter()
+            results, next_cursor = await search_freelancers(db, filters, cursor, args.limit)
+            timings.append((time.perf_counter() - started) * 1000)
+            if next_cursor is None:
+                break
+            cursor = uuid.UUID(next_cursor)
+        print(f"{'20 pages (p50, max)':<22}{statistics.median(timings):>10.2f}{max(timings):>10.2f}{len(timings):>7}")
+
+        # Facets: the expensive aggregate runs once per filter set and TTL
+        filters = await filters_for(skills="python,docker")
+        await cache.delete(filters.cache_key())
+        started = time.perf_counter()
+        await search_facets(db, filters)
+        cold = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        await search_facets(db, filters)
+        warm = (time.perf_counter() - started) * 1000
+        print(f"facets cold {cold:.1f} ms, warm {warm:.3f} ms")
+
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--database-url", help="Defaults to a fresh SQLite file")
+    parser.add_argument("--explain", action="store_true", help="Print query plans (Postgres)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Import-time budget for app.main (what every new worker pays before serving).
+
+Imports app.main under `python -X importtime` in --runs fresh interpreters, each
+in an empty temporary directory, and fails (exit status 1) when:
+
+    the fastest run takes longer than --budget-ms,
+    a module that should only load on first use (alembic, jinja2, aiosmtplib,
+    smtplib, PIL, boto3) was imported, or
+    the import created files (logs, SQLite databases, caches).
+
+The slowest modules by cumulative time are printed either way, so a regression
+points at its cause. Run it in CI next to the test suite.
+
+Usage:
+    python -m benchmarks.import_time [--runs 5] [--budget-ms 1500] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# Loaded by lifespan handlers or on first use, never by the import itself
+LAZY_MODULES = ("alembic", "jinja2", "aiosmtplib", "smtplib", "PIL", "boto3")
+
+
+def import_once(workdir: str) -> dict:
+    """{module: (self_us, cumulative_us)} for one `import app.main` in a fresh interpreter"""
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(PROJECT_ROOT),
+        # Settings are read at import time; keep them away from real services
+        "DATABASE_URL": f"sqlite:///{workdir}/import-time.db",
+        "LOG_FILE": os.path.join(workdir, "logs", "app.log"),
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=workdir, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import app.main failed:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    failures = []
+    best = None
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory(prefix="lanceraa-import-") as workdir:
+            modules = import_once(workdir)
+            created = sorted(os.listdir(workdir))
+        if created:
+            failures.append(f"importing app.main created {', '.join(created)}")
+        if best is None or modules["app.main"][1] < best["app.main"][1]:
+            best = modules
+
+    total_ms = best["app.main"][1] / 1000
+    print(f"import app.main: {total_ms:.1f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    print(f"{'module':<40}{'self ms':>10}{'cumulative ms':>16}")
+    slowest = sorted(best.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us) in slowest[:args.top]:
+        print(f"{name:<40}{self_us / 1000:>10.1f}{cumulative_us / 1000:>16.1f}")
+
+    if total_ms > args.budget_ms:
+        failures.append(f"import took {total_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    eager = [name for name in LAZY_MODULES if name in best]
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+
+    for failure in dict.fromkeys(failures):
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Login lookup latency: the old OR query versus find_user_by_login.
+
+Seeds DATABASE_URL with --users synthetic users (skipped if already present),
+then resolves a random mix of emails, usernames and phone numbers with both
+strategies and prints p50/p95/p99 per identifier kind.
+
+Usage:
+    python -m benchmarks.login_lookup [--users 1000000] [--lookups 3000]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models.user import User
+from app.services.login_lookup import find_user_by_login
+from benchmarks.seed import SEED, seed
+
+# Any valid bcrypt hash works; lookups never verify it
+PASSWORD_HASH = "$2b$12$C6UzMDM.H6dfI/f/IKcEeO5dtvV6SwXK9DSTk9H4xFq7Hj6vd5qWm"
+
+
+async def legacy_lookup(db, identifier: str):
+    """The lookup login used before: OR across email/username, then a phone fallback"""
+    result = await db.execute(select(User).where(
+        (User.email == identifier) | (User.username == identifier)
+    ))
+    user = result.scalars().first()
+    if not user and identifier.replace('+', '').isdigit():
+        result = await db.execute(select(User).where(User.phone == identifier))
+        user = result.scalars().first()
+    return user
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+async def measure(users: int, lookups: int):
+    rng = random.Random(SEED + 1)
+    identifiers = []
+    for _ in range(lookups):
+        i = rng.randrange(users)
+        kind = rng.choice(["email", "username", "phone"])
+        value = {"email": f"user{i}@example.com", "username": f"user{i}", "phone": f"+977{9800000000 + i}"}[kind]
+        identifiers.append((kind, value))
+
+    results = {}
+    for name, lookup in (("legacy", legacy_lookup), ("resolver", find_user_by_login)):
+        timings = {}
+        async with AsyncSessionLocal() as db:
+            for kind, value in identifiers:
+                started = time.perf_counter()
+                user = await lookup(db, value)
+                timings.setdefault(kind, []).append((time.perf_counter() - started) * 1000)
+                assert user is not None, value
+                db.expunge_all()
+        results[name] = timings
+
+    print(f"{'strategy':<10}{'kind':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for name, timings in results.items():
+        for kind, samples in sorted(timings.items()):
+            print(f"{name:<10}{kind:<10}{percentile(samples, 50):>10.3f}{percentile(samples, 95):>10.3f}"
+                  f"{percentile(samples, 99):>10.3f}{statistics.mean(samples):>10.3f}")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=3000)
+    args = parser.parse_args()
+
+    seed(args.users, profiles=False, password_hash=PASSWORD_HASH)
+    asyncio.run(measure(args.users, args.lookups))
+
+
+if __name__ == "__main__":
+    main()
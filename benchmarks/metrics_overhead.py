@@ -0,0 +1,97 @@
+"""Per-request cost of the metrics layer (MetricsMiddleware + engine/pool instrumentation).
+
+Builds two identical FastAPI apps whose only route runs --queries `SELECT 1`
+statements on an in-memory SQLite engine. One app has no metrics, the other has
+the middleware and an instrumented engine and pool. Both are called straight
+through ASGI (no HTTP client in the way), alternating request by request so
+drift affects them equally. Prints p50/mean latency per app and the difference;
+--queries 0 isolates the middleware itself.
+
+Usage:
+    python -m benchmarks.metrics_overhead [--requests 5000] [--queries 3]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core.metrics import InstrumentedAsyncQueuePool, MetricsMiddleware, instrument_engine
+
+
+def build_app(instrumented: bool, queries: int):
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        poolclass=InstrumentedAsyncQueuePool if instrumented else AsyncAdaptedQueuePool,
+    )
+    if instrumented:
+        instrument_engine(engine.sync_engine, "bench")
+
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        async with engine.connect() as conn:
+            for _ in range(queries):
+                await conn.execute(text("SELECT 1"))
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app, engine
+
+
+async def call(app, path: str) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    return (time.perf_counter() - started) * 1e6
+
+
+async def measure(requests: int, queries: int):
+    apps = {"plain": build_app(False, queries), "metrics": build_app(True, queries)}
+    timings = {name: [] for name in apps}
+    for name, (app, _) in apps.items():
+        for i in range(200):  # warm up pools and route compilation
+            await call(app, f"/items/{i}")
+
+    # Alternate request by request: aiosqlite's thread hops are noisy, so both apps
+    # must see the same conditions
+    for i in range(requests):
+        for name, (app, _) in apps.items():
+            timings[name].append(await call(app, f"/items/{i}"))
+
+    print(f"{'app':<10}{'p50 us':>10}{'mean us':>10}")
+    for name, samples in timings.items():
+        print(f"{name:<10}{statistics.median(samples):>10.1f}{statistics.mean(samples):>10.1f}")
+    overhead = statistics.median(timings["metrics"]) - statistics.median(timings["plain"])
+    print(f"overhead: {overhead:.1f} us per request "
+          f"({overhead / statistics.median(timings['plain']) * 100:.1f}% of p50)")
+
+    for _, engine in apps.values():
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(measure(args.requests, args.queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Deterministic seeder: bulk-load N users (and optionally profiles) into DATABASE_URL.
+
+Rows are generated from a fixed random seed, so user{i} always has the same id,
+phone, skills and city. Every seeded user's password is SEED_PASSWORD. Rows that
+already exist are skipped, so re-running with a larger --users only tops up.
+
+Usage:
+    python -m benchmarks.seed [--users 100000] [--no-profiles]
+"""
+import argparse
+import random
+import sys
+import time
+import uuid
+from sqlalchemy import insert, select
+from app.core.database import engine
+from app.core.migrations import upgrade_to_head
+from app.models.skill import UserSkill
+from app.models.user import User, UserProfile
+from app.services.skills import ensure_skill_ids
+
+SEED = 1337
+BATCH = 10000
+SEED_PASSWORD = "Benchmark1!"
+
+SKILLS = [
+    "python", "django", "fastapi", "react", "vue", "node", "typescript", "go", "rust", "java",
+    "kotlin", "swift", "flutter", "sql", "postgres", "aws", "docker", "kubernetes", "figma",
+    "photoshop", "illustrator", "copywriting", "seo", "translation", "video-editing", "data-entry",
+]
+CITIES = [
+    ("Kathmandu", "Nepal"), ("Pokhara", "Nepal"), ("Lalitpur", "Nepal"), ("Biratnagar", "Nepal"),
+    ("Delhi", "India"), ("Bengaluru", "India"), ("Dhaka", "Bangladesh"), ("London", "United Kingdom"),
+]
+
+
+def synthetic_user(i: int, rng: random.Random, password_hash: str) -> dict:
+    return {
+        "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+        "username": f"user{i}",
+        "email": f"user{i}@example.com",
+        "phone": f"+977{9800000000 + i}",
+        "hashed_password": password_hash,
+        "first_name": f"First{i}",
+        "last_name": f"Last{i}",
+        "is_client": i % 3 == 0,
+        "is_active": True,
+        "is_verified": False,
+        "profile_completed": False,
+    }
+
+
+def synthetic_profile(user: dict, rng: random.Random) -> dict:
+    city, country = rng.choice(CITIES)
+    return {
+        "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+        "user_id": user["id"],
+        "bio": f"Hi, I'm {user['first_name']}.",
+        "skills": ",".join(rng.sample(SKILLS, rng.randint(1, 6))),
+        "city": city,
+        "country": country,
+    }
+
+
+def seed(users: int, profiles: bool = True, password_hash: str = None) -> int:
+    """Insert user0..user{users-1} that don't exist yet; returns how many were added"""
+    upgrade_to_head()
+    users_table = User.__table__
+    # Look the seeded usernames up rather than counting rows: the load tests sign up
+    # users of their own, so a row count says nothing about which user{i} exist
+    with engine.begin() as conn:
+        existing = set(conn.execute(
+            select(users_table.c.username).where(users_table.c.username.like("user%"))
+        ).scalars())
+    missing = sum(1 for i in range(users) if f"user{i}" not in existing)
+    if not missing:
+        print(f"user0..user{users - 1} already seeded", file=sys.stderr)
+        return 0
+
+    if password_hash is None:
+        from app.core.passwords import get_password_hash
+        password_hash = get_password_hash(SEED_PASSWORD)
+
+    # Replay the generator from the start so user{i} is identical no matter how often we top up
+    rng = random.Random(SEED)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for start in range(0, users, BATCH):
+            rows = [synthetic_user(i, rng, password_hash) for i in range(start, min(start + BATCH, users))]
+            profile_rows = [synthetic_profile(row, rng) for row in rows]
+            new = [(row, profile) for row, profile in zip(rows, profile_rows) if row["username"] not in existing]
+            if not new:
+                continue
+            conn.execute(insert(users_table), [row for row, _ in new])
+            if profiles:
+                profile_rows = [profile for _, profile in new]
+                conn.execute(insert(UserProfile.__table__), profile_rows)
+                # Link skills too, so freelancer search sees seeded profiles
+                skill_ids = ensure_skill_ids(conn, SKILLS)
+                conn.execute(insert(UserSkill.__table__), [
+                    {"skill_id": skill_ids[name], "user_id": row["user_id"]}
+                    for row in profile_rows for name in row["skills"].split(",")
+                ])
+    # stderr: callers such as the auth flow benchmark print their results on stdout
+    print(f"seeded {missing} users in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+    return missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--no-profiles", dest="profiles", action="store_false")
+    args = parser.parse_args()
+    seed(args.users, profiles=args.profiles)
+
+
+if __name__ == "__main__":
+    main()
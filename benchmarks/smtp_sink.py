@@ -0,0 +1,85 @@
+"""Minimal asyncio SMTP server that accepts every message and keeps it in memory.
+
+Enough of RFC 5321 for aiosmtplib and smtplib without STARTTLS or AUTH
+(EMAIL_USE_STARTTLS=false, EMAIL_USE_AUTH=false), so benchmarks measure the
+app rather than a mail provider.
+"""
+import asyncio
+from email import message_from_bytes
+from typing import Callable, List, Optional
+
+
+class SMTPSink:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, on_message: Optional[Callable] = None):
+        self.host = host
+        self.port = port
+        self.on_message = on_message
+        self.messages: List = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> int:
+        """Start listening; returns the bound port (an ephemeral one when port=0)"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        def reply(line: str):
+            writer.write(line.encode() + b"\r\n")
+
+        reply("220 sink ESMTP")
+        recipients = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                verb = line[:4].upper()
+                if verb == b"EHLO":
+                    reply("250-sink")
+                    reply("250 8BITMIME")
+                elif verb == b"HELO":
+                    reply("250 sink")
+                elif verb == b"MAIL":
+                    recipients = []
+                    reply("250 OK")
+                elif verb == b"RCPT":
+                    recipients.append(line.split(b":", 1)[1].strip().strip(b"<>").decode())
+                    reply("250 OK")
+                elif verb == b"DATA":
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    lines = []
+                    while True:
+                        data_line = await reader.readline()
+                        if data_line in (b".\r\n", b".\n", b""):
+                            break
+                        # Undo dot-stuffing
+                        lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                    self._deliver(recipients, b"".join(lines))
+                    reply("250 OK queued")
+                elif verb == b"QUIT":
+                    reply("221 Bye")
+                    await writer.drain()
+                    break
+                elif verb in (b"NOOP", b"RSET"):
+                    reply("250 OK")
+                else:
+                    reply("502 Command not implemented")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _deliver(self, recipients: List[str], raw: bytes):
+        message = message_from_bytes(raw)
+        self.messages.append((recipients, message))
+        if self.on_message is not None:
+            self.on_message(recipients, message)
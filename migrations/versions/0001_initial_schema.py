@@ -0,0 +1,72 @@
+"""Initial schema: users and user_profiles
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Databases that were created by Base.metadata.create_all before migrations
+existed already match this revision; run `alembic stamp 0001` on them once
+instead of upgrading from scratch.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("username", sa.String(50), nullable=False),
+        sa.Column("email", sa.String(100), nullable=False),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("first_name", sa.String(50), nullable=True),
+        sa.Column("last_name", sa.String(50), nullable=True),
+        sa.Column("phone", sa.String(20), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("is_verified", sa.Boolean(), nullable=True),
+        sa.Column("profile_completed", sa.Boolean(), nullable=True),
+        sa.Column("is_client", sa.Boolean(), nullable=False),
+        sa.Column("verification_code", sa.String(6), nullable=True),
+        sa.Column("verification_code_expires", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("last_login", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_phone", "users", ["phone"], unique=True)
+
+    op.create_table(
+        "user_profiles",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("profile_image", sa.String(255), nullable=True),
+        sa.Column("bio", sa.String(500), nullable=True),
+        sa.Column("skills", sa.String(500), nullable=True),
+        sa.Column("street", sa.String(100), nullable=True),
+        sa.Column("city", sa.String(50), nullable=True),
+        sa.Column("state", sa.String(50), nullable=True),
+        sa.Column("country", sa.String(50), nullable=True),
+        sa.Column("zip", sa.String(20), nullable=True),
+        sa.Column("website", sa.String(255), nullable=True),
+        sa.Column("linkedin", sa.String(255), nullable=True),
+        sa.Column("github", sa.String(255), nullable=True),
+        sa.Column("twitter", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("user_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("user_profiles")
+    op.drop_index("ix_users_phone", table_name="users")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_index("ix_users_username", table_name="users")
+    op.drop_table("users")
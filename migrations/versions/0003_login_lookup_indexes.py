@@ -0,0 +1,40 @@
+"""Case-insensitive login and username-prefix indexes on users
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+Built with CREATE INDEX CONCURRENTLY on Postgres so the users table stays
+writable while they build. CONCURRENTLY can't run inside a transaction, hence
+the autocommit block.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_email_lower", "users", [sa.text("lower(email)")],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            "ix_users_username_lower", "users", [sa.text("lower(username)")],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            "ix_users_username_pattern", "users", ["username"],
+            postgresql_ops={"username": "varchar_pattern_ops"},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in ("ix_users_username_pattern", "ix_users_username_lower", "ix_users_email_lower"):
+            op.drop_index(name, table_name="users", postgresql_concurrently=True, if_exists=True)
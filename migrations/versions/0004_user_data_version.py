@@ -0,0 +1,24 @@
+"""users.data_version for ETags on user and profile reads
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+A constant server default lets Postgres add the column without rewriting the table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("users", sa.Column("data_version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("data_version")
@@ -0,0 +1,127 @@
+"""Normalized skills and user_skills, backfilled from user_profiles.skills
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+The backfill walks user_profiles in primary-key batches so memory stays flat on
+large tables. Offline (alembic upgrade head --sql) there are no rows to read, so the
+script gets the same backfill as two set-based INSERT ... SELECT statements; that is
+Postgres only, other dialects get a note that it was skipped. The location indexes
+on user_profiles are built CONCURRENTLY on Postgres (outside the migration
+transaction) so profiles stay writable.
+"""
+import logging
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+BATCH = 5000
+SKILL_NAME_MAX_LENGTH = 50
+
+
+def _parse_skills(value):
+    # Frozen copy of app.services.skills.parse_skills as of this revision
+    names = (" ".join(part.split()).lower()[:SKILL_NAME_MAX_LENGTH] for part in (value or "").split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def _backfill(bind):
+    profiles = sa.table("user_profiles", sa.column("id"), sa.column("user_id"), sa.column("skills"))
+    skills = sa.table("skills", sa.column("id"), sa.column("name"))
+    user_skills = sa.table("user_skills", sa.column("skill_id"), sa.column("user_id"))
+
+    known = {}  # name -> id; distinct skills are few compared to profiles
+    last_id = None
+    while True:
+        query = (
+            sa.select(profiles.c.id, profiles.c.user_id, profiles.c.skills)
+            .where(profiles.c.user_id.isnot(None), profiles.c.skills.isnot(None))
+            .order_by(profiles.c.id)
+            .limit(BATCH)
+        )
+        if last_id is not None:
+            query = query.where(profiles.c.id > last_id)
+        rows = bind.execute(query).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        links = [(row.user_id, name) for row in rows for name in _parse_skills(row.skills)]
+        new = sorted({name for _, name in links} - known.keys())
+        if new:
+            bind.execute(skills.insert(), [{"name": name} for name in new])
+            known.update(bind.execute(sa.select(skills.c.name, skills.c.id).where(skills.c.name.in_(new))).all())
+        if links:
+            bind.execute(user_skills.insert(), [{"skill_id": known[name], "user_id": user_id} for user_id, name in links])
+
+
+# Offline equivalent of _backfill: _parse_skills in SQL (split on commas, collapse
+# whitespace, lowercase, truncate, drop empties), deduplicated per user
+_PARSED_SKILLS = f"""
+    SELECT DISTINCT p.user_id,
+           left(lower(btrim(regexp_replace(part, '\\s+', ' ', 'g'))), {SKILL_NAME_MAX_LENGTH}) AS name
+    FROM user_profiles p, unnest(string_to_array(p.skills, ',')) AS part
+    WHERE p.user_id IS NOT NULL AND p.skills IS NOT NULL
+"""
+
+def _backfill_offline():
+    migration_context = op.get_context()
+    if migration_context.dialect.name != "postgresql":
+        # Tables still get created; the script says plainly that skills need filling in
+        message = ("0005: skills backfill skipped, it is only emitted as SQL for Postgres; "
+                   "skill search finds a user only after their profile's skills are next saved")
+        migration_context.impl.static_output(f"-- {message}")
+        logging.getLogger("alembic.runtime.migration").warning(message)
+        return
+    op.execute(f"""
+        INSERT INTO skills (name)
+        SELECT DISTINCT name FROM ({_PARSED_SKILLS}) AS parsed WHERE name <> '' ORDER BY name
+    """)
+    op.execute(f"""
+        INSERT INTO user_skills (skill_id, user_id)
+        SELECT s.id, parsed.user_id FROM ({_PARSED_SKILLS}) AS parsed JOIN skills s ON s.name = parsed.name
+    """)
+
+
+def upgrade():
+    op.create_table(
+        "skills",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(SKILL_NAME_MAX_LENGTH), nullable=False, unique=True),
+    )
+    op.create_table(
+        "user_skills",
+        sa.Column("skill_id", sa.Integer(), sa.ForeignKey("skills.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    )
+    if context.is_offline_mode():
+        _backfill_offline()
+    else:
+        _backfill(op.get_bind())
+    # After the backfill: one index build instead of per-row maintenance
+    op.create_index("ix_user_skills_user_id", "user_skills", ["user_id"])
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_user_profiles_country_lower", "user_profiles", [sa.text("lower(country)"), "user_id"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            "ix_user_profiles_city_lower", "user_profiles", [sa.text("lower(city)"), "user_id"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in ("ix_user_profiles_city_lower", "ix_user_profiles_country_lower"):
+            op.drop_index(name, table_name="user_profiles", postgresql_concurrently=True, if_exists=True)
+    op.drop_index("ix_user_skills_user_id", table_name="user_skills")
+    op.drop_table("user_skills")
+    op.drop_table("skills")
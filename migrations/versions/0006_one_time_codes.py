@@ -0,0 +1,38 @@
+"""one_time_codes table; verification codes move off users
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+
+Outstanding plaintext codes on users are not carried over (the new ones are
+HMACs keyed by SECRET_KEY); anyone mid-signup asks for a new code. The columns
+are dropped with a plain ALTER TABLE, which SQLite supports since 3.35, rather
+than a batch copy of the users table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "one_time_codes",
+        sa.Column("key", sa.String(100), primary_key=True),
+        sa.Column("digest", sa.String(64), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_one_time_codes_expires_at", "one_time_codes", ["expires_at"])
+    op.drop_column("users", "verification_code")
+    op.drop_column("users", "verification_code_expires")
+
+
+def downgrade():
+    op.add_column("users", sa.Column("verification_code", sa.String(6), nullable=True))
+    op.add_column("users", sa.Column("verification_code_expires", sa.DateTime(), nullable=True))
+    op.drop_index("ix_one_time_codes_expires_at", table_name="one_time_codes")
+    op.drop_table("one_time_codes")